@@ -1,8 +1,23 @@
 """Gitingest: A package for ingesting data from Git repositories."""
 
 from gitingest.cloning import clone_repo
-from gitingest.entrypoint import ingest, ingest_async
-from gitingest.ingestion import ingest_query
+from gitingest.digest_container import DigestContainer
+from gitingest.digest_index import DigestIndex
+from gitingest.entrypoint import ingest, ingest_async, ingest_to_file, ingest_to_file_async
+from gitingest.ingestion import ingest_query, ingest_query_to_container, ingest_query_to_file, stream_ingest_query
 from gitingest.query_parsing import parse_query
 
-__all__ = ["ingest_query", "clone_repo", "parse_query", "ingest", "ingest_async"]
+__all__ = [
+    "ingest_query",
+    "stream_ingest_query",
+    "ingest_query_to_file",
+    "ingest_query_to_container",
+    "DigestContainer",
+    "DigestIndex",
+    "clone_repo",
+    "parse_query",
+    "ingest",
+    "ingest_async",
+    "ingest_to_file",
+    "ingest_to_file_async",
+]
@@ -0,0 +1,5 @@
+"""Découpage des contextes de dépôt et des digests en chunks bornés en tokens, répartis sur plusieurs appels."""
+
+from gitingest.chunking.chunker import Chunk, Document, chunk_digest, chunk_documents, chunk_repo_context
+
+__all__ = ["Chunk", "Document", "chunk_digest", "chunk_documents", "chunk_repo_context"]
@@ -0,0 +1,78 @@
+"""Frontières de découpe d'un fichier trop gros pour un chunk : définitions de premier niveau, puis lignes."""
+
+import re
+from typing import List, Tuple
+
+from gitingest.utils.tokens import language_for_path
+
+# Début d'une définition de premier niveau (fonction, classe, type, bloc d'implémentation...) dans les langages
+# courants ; seules les lignes non indentées sont considérées
+_DEFINITION = re.compile(
+    r"(?:export\s+(?:default\s+)?)?(?:pub(?:\([^)]*\))?\s+)?"
+    r"(?:(?:public|private|protected|internal|static|abstract|final|sealed|open|data|unsafe|const)\s+)*"
+    r"(?:async\s+)?"
+    r"(?:def|class|function|func|fn|struct|enum|trait|impl|interface|type|module|mod|object|record|namespace)\b"
+)
+# Lignes rattachées à la définition qui les suit : décorateurs, attributs et commentaires
+_PREAMBLE = re.compile(r"(?:@|#\[|#(?!\[)|//|/\*|\*|--)")
+_MARKDOWN_HEADING = re.compile(r"#{1,6}\s")
+
+
+def definition_starts(lines: List[str], path: str) -> List[int]:
+    """
+    Repère les lignes où commence une définition de premier niveau (ou une section, pour du Markdown).
+
+    Une définition précédée de décorateurs ou de commentaires commence au premier d'entre eux, pour qu'ils restent
+    avec elle. La première ligne du fichier est toujours un début de segment.
+
+    Paramètres
+    ----------
+    lines : List[str]
+        Lignes du fichier, avec leurs fins de ligne.
+    path : str
+        Chemin du fichier, dont l'extension indique le langage.
+
+    Retourne
+    -------
+    List[int]
+        Indices croissants des lignes de début de segment, en commençant par 0.
+    """
+    markdown = language_for_path(path) == "markdown"
+    starts = [0]
+    for i, line in enumerate(lines):
+        if not line or line[0].isspace():
+            continue
+        if markdown:
+            if _MARKDOWN_HEADING.match(line) and i > 0:
+                starts.append(i)
+            continue
+        if not _DEFINITION.match(line):
+            continue
+        start = i
+        while start > starts[-1] + 1 and lines[start - 1][:1].strip() and _PREAMBLE.match(lines[start - 1]):
+            start -= 1
+        if start > starts[-1]:
+            starts.append(start)
+    return starts
+
+
+def split_segments(lines: List[str], path: str) -> List[Tuple[int, int]]:
+    """
+    Découpe un fichier en segments contigus, chacun allant d'un début de définition au suivant.
+
+    Paramètres
+    ----------
+    lines : List[str]
+        Lignes du fichier, avec leurs fins de ligne.
+    path : str
+        Chemin du fichier, dont l'extension indique le langage.
+
+    Retourne
+    -------
+    List[Tuple[int, int]]
+        Bornes (début inclus, fin exclue) des segments, couvrant toutes les lignes dans l'ordre.
+    """
+    if not lines:
+        return []
+    starts = definition_starts(lines, path)
+    return list(zip(starts, starts[1:] + [len(lines)]))
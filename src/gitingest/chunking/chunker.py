@@ -0,0 +1,485 @@
+"""Découpage d'un contexte de dépôt ou d'un digest en chunks qui tiennent chacun dans un nombre de tokens donné."""
+
+import posixpath
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple, Union
+
+from gitingest.chunking.boundaries import split_segments
+from gitingest.config import CHUNK_DIRECTORY_BREAK_FILL, CHUNK_HEADER_MAX_TOKENS, TOKENIZER_THREADS
+from gitingest.digest_container import parse_text_digest
+from gitingest.digest_index import INDEX_SUFFIX, index_path_for
+from gitingest.schemas import RepoContext
+from gitingest.schemas.filesystem_schema import SEPARATOR
+from gitingest.utils.compression import open_digest_reader
+from gitingest.utils.tokens import DEFAULT_ENCODING, approximate_tokens, get_encoding, language_for_path
+
+if TYPE_CHECKING:
+    from tiktoken import Encoding
+
+_BLOCK_END = "\n\n"  # Fin de chaque bloc de fichier, comme dans le digest
+_HEADER_RESERVE_MARGIN = 2  # Tokens gardés en plus de l'en-tête le plus long d'une partie de fichier
+
+
+@dataclass(frozen=True)
+class Document:
+    """
+    Fichier à répartir dans les chunks.
+
+    Attributs
+    ----------
+    path : str
+        Chemin du fichier, avec des séparateurs `/`.
+    text : str
+        Contenu du fichier.
+    symlink_target : Optional[str]
+        Cible du lien, si le fichier est un lien symbolique.
+    """
+
+    path: str
+    text: str
+    symlink_target: Optional[str] = None
+
+
+@dataclass
+class Chunk:
+    """
+    Chunk produit par `chunk_documents`, prêt à être envoyé dans un appel au LLM.
+
+    Attributs
+    ----------
+    index : int
+        Numéro du chunk, à partir de 1.
+    text : str
+        Texte du chunk : en-tête (extrait de l'arborescence) puis blocs de fichiers au format du digest.
+    token_count : int
+        Nombre de tokens du chunk, en-tête compris.
+    paths : List[str]
+        Chemins des fichiers présents (en entier ou en partie) dans le chunk, dans l'ordre.
+    """
+
+    index: int
+    text: str
+    token_count: int
+    paths: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _Piece:
+    """Bloc d'un fichier entier, ou d'une partie de fichier, avec son nombre de tokens."""
+
+    path: str
+    label: str
+    text: str
+    token_count: int
+
+
+def chunk_documents(
+    documents: Iterable[Document],
+    max_tokens: int,
+    encoding_name: str = DEFAULT_ENCODING,
+    title: Optional[str] = None,
+) -> Iterator[Chunk]:
+    """
+    Répartit des fichiers dans des chunks d'au plus `max_tokens` tokens, produits au fur et à mesure.
+
+    Les fichiers sont placés dans l'ordre, sans être coupés tant qu'ils tiennent dans un chunk ; un chunk rempli à
+    `CHUNK_DIRECTORY_BREAK_FILL` est clos au changement de dossier plutôt qu'au milieu du suivant. Un fichier trop
+    gros pour un chunk est découpé en parties aux débuts de définitions de premier niveau, puis aux fins de ligne
+    (voir `gitingest.chunking.boundaries`), chaque partie indiquant ses lignes dans son en-tête. Chaque chunk commence
+    par un extrait de l'arborescence limité à ses fichiers, dans au plus `CHUNK_HEADER_MAX_TOKENS` tokens.
+
+    Chaque octet n'est encodé qu'une fois : le nombre de tokens d'un chunk est la somme de ceux de son en-tête et de
+    ses blocs, encodés séparément. Les coupes tombant en fin de ligne, cette somme majore en pratique le nombre de
+    tokens du texte du chunk encodé d'un seul tenant.
+
+    Paramètres
+    ----------
+    documents : Iterable[Document]
+        Fichiers à répartir, dans l'ordre voulu (celui du digest en général).
+    max_tokens : int
+        Nombre maximal de tokens d'un chunk, en-tête compris.
+    encoding_name : str
+        Encodage tiktoken utilisé pour compter les tokens (par défaut : cl100k_base).
+    title : Optional[str]
+        Titre repris dans l'en-tête de chaque chunk (nom du dépôt en général).
+
+    Retourne
+    -------
+    Iterator[Chunk]
+        Les chunks, numérotés à partir de 1.
+
+    Lève
+    ------
+    ValueError
+        Si `max_tokens` est trop petit pour contenir une ligne de fichier et son en-tête.
+    """
+    if max_tokens <= 0:
+        raise ValueError(f"max_tokens doit être positif : {max_tokens}")
+
+    encoding = get_encoding(encoding_name)
+    header_budget = min(CHUNK_HEADER_MAX_TOKENS, max_tokens // 4)
+    packer = _ChunkPacker(encoding, max_tokens - header_budget, header_budget, title)
+    for document in documents:
+        for piece in _document_pieces(document, packer.content_budget, encoding, encoding_name):
+            yield from packer.add(piece)
+    yield from packer.flush()
+
+
+def chunk_repo_context(
+    context: RepoContext,
+    max_tokens: int,
+    encoding_name: str = DEFAULT_ENCODING,
+) -> Iterator[Chunk]:
+    """
+    Répartit les fichiers d'un contexte extrait (`extract_repo_context`) dans des chunks d'au plus `max_tokens`
+    tokens.
+
+    Seuls les fichiers dont le contenu a été lu (`extra["content"]`) sont repris.
+
+    Paramètres
+    ----------
+    context : RepoContext
+        Contexte extrait du dépôt.
+    max_tokens : int
+        Nombre maximal de tokens d'un chunk, en-tête compris.
+    encoding_name : str
+        Encodage tiktoken utilisé pour compter les tokens (par défaut : cl100k_base).
+
+    Retourne
+    -------
+    Iterator[Chunk]
+        Les chunks, numérotés à partir de 1.
+    """
+    documents = (
+        Document(path=file.path.replace("\\", "/"), text=file.extra["content"])
+        for file in context.files
+        if file.extra and isinstance(file.extra.get("content"), str)
+    )
+    return chunk_documents(documents, max_tokens, encoding_name, title=context.repo_name)
+
+
+def chunk_digest(
+    digest_path: Union[str, Path],
+    max_tokens: int,
+    encoding_name: str = DEFAULT_ENCODING,
+) -> Iterator[Chunk]:
+    """
+    Répartit les fichiers d'un digest texte (éventuellement compressé) dans des chunks d'au plus `max_tokens`
+    tokens.
+
+    Le digest est lu en flux, bloc par bloc : il n'est jamais chargé en entier en mémoire.
+
+    Paramètres
+    ----------
+    digest_path : Union[str, Path]
+        Chemin du digest (`.txt`, `.txt.gz` ou `.txt.zst`).
+    max_tokens : int
+        Nombre maximal de tokens d'un chunk, en-tête compris.
+    encoding_name : str
+        Encodage tiktoken utilisé pour compter les tokens (par défaut : cl100k_base).
+
+    Retourne
+    -------
+    Iterator[Chunk]
+        Les chunks, numérotés à partir de 1.
+    """
+    title = index_path_for(digest_path).name[: -len(INDEX_SUFFIX)]
+    with open_digest_reader(digest_path, newline="") as text:
+        _, blocks = parse_text_digest(text)
+        documents = (_document_from_block(header, content) for header, content in blocks)
+        yield from chunk_documents(documents, max_tokens, encoding_name, title=title)
+
+
+def _document_from_block(header: str, content: str) -> Document:
+    if header.startswith("SYMLINK: "):
+        path, _, target = header[len("SYMLINK: ") :].partition(" -> ")
+        return Document(path=path, text="", symlink_target=target)
+    return Document(path=header[len("FILE: ") :], text=content)
+
+
+def _document_pieces(
+    document: Document,
+    budget: int,
+    encoding: "Encoding",
+    encoding_name: str,
+) -> Iterator[_Piece]:
+    """
+    Produit le bloc d'un fichier, ou les blocs de ses parties s'il dépasse `budget` tokens.
+
+    Un fichier dont l'estimation sans encodage tient largement dans le budget est encodé d'un bloc ; les autres
+    sont encodés ligne par ligne, en un seul lot, ce qui donne à la fois leur total et les comptes nécessaires au
+    découpage.
+
+    Paramètres
+    ----------
+    document : Document
+        Fichier à placer.
+    budget : int
+        Nombre maximal de tokens d'un bloc.
+    encoding : Encoding
+        Encodeur tiktoken.
+    encoding_name : str
+        Nom de l'encodage, pour l'estimation.
+
+    Retourne
+    -------
+    Iterator[_Piece]
+        Le bloc du fichier, ou ceux de ses parties dans l'ordre.
+    """
+    if document.symlink_target is not None:
+        header = f"SYMLINK: {document.path} -> {document.symlink_target}"
+    else:
+        header = f"FILE: {document.path}"
+    block = _format_block(header, document.text)
+
+    estimate = approximate_tokens(block, language_for_path(document.path), encoding_name)
+    if estimate.tokens + estimate.error <= budget:
+        token_count = len(encoding.encode_ordinary(block))
+        if token_count <= budget:
+            yield _Piece(document.path, "", block, token_count)
+            return
+        # Estimation trop optimiste : seul ce fichier est encodé une seconde fois, ligne par ligne
+
+    lines = document.text.splitlines(keepends=True)
+    line_tokens = encoding.encode_ordinary_batch(lines, num_threads=TOKENIZER_THREADS)
+    fixed_tokens = len(encoding.encode_ordinary(_format_block(header, "")))
+    total = fixed_tokens + sum(len(tokens) for tokens in line_tokens)
+    if total <= budget:
+        yield _Piece(document.path, "", block, total)
+        return
+
+    yield from _split_document(document.path, lines, line_tokens, budget, encoding)
+
+
+def _split_document(
+    path: str,
+    lines: List[str],
+    line_tokens: List[List[int]],
+    budget: int,
+    encoding: "Encoding",
+) -> Iterator[_Piece]:
+    """
+    Découpe un fichier trop gros en parties d'au plus `budget` tokens, aux débuts de définitions puis aux lignes.
+
+    Une ligne qui ne tient pas seule dans une partie (fichier minifié par exemple) est coupée entre deux tokens.
+
+    Paramètres
+    ----------
+    path : str
+        Chemin du fichier.
+    lines : List[str]
+        Lignes du fichier, avec leurs fins de ligne.
+    line_tokens : List[List[int]]
+        Tokens de chaque ligne.
+    budget : int
+        Nombre maximal de tokens d'une partie, en-tête compris.
+    encoding : Encoding
+        Encodeur tiktoken.
+
+    Retourne
+    -------
+    Iterator[_Piece]
+        Les parties du fichier, dans l'ordre.
+
+    Lève
+    ------
+    ValueError
+        Si le budget ne laisse pas de place au contenu après l'en-tête d'une partie.
+    """
+    widest = f"FILE: {path} (lines {len(lines)}-{len(lines)})"
+    room = budget - len(encoding.encode_ordinary(_format_block(widest, ""))) - _HEADER_RESERVE_MARGIN
+    if room <= 0:
+        raise ValueError(f"max_tokens est trop petit pour découper {path} ({budget} tokens par bloc)")
+
+    # Fragments à placer, (numéro de ligne, texte, nombre de tokens), et indices des débuts de segments
+    fragments: List[Tuple[int, str, int]] = []
+    segment_starts = set()
+    for start, end in split_segments(lines, path):
+        segment_starts.add(len(fragments))
+        for number in range(start, end):
+            if len(line_tokens[number]) <= room:
+                fragments.append((number + 1, lines[number], len(line_tokens[number])))
+            else:
+                pieces = _split_line(line_tokens[number], room, encoding)
+                fragments.extend((number + 1, text, count) for text, count in pieces)
+
+    part: List[Tuple[int, str, int]] = []
+    part_tokens = 0
+    segment_offset = 0  # Position dans la partie du début du segment en cours
+    for i, fragment in enumerate(fragments):
+        if i in segment_starts:
+            segment_offset = len(part)
+        if part and part_tokens + fragment[2] > room and segment_offset > 0:
+            # Le segment en cours passe en entier dans la partie suivante
+            yield _part_piece(path, part[:segment_offset], encoding)
+            part, segment_offset = part[segment_offset:], 0
+            part_tokens = sum(count for _, _, count in part)
+        if part and part_tokens + fragment[2] > room:
+            yield _part_piece(path, part, encoding)
+            part, part_tokens = [], 0
+        part.append(fragment)
+        part_tokens += fragment[2]
+    if part:
+        yield _part_piece(path, part, encoding)
+
+
+def _split_line(tokens: List[int], room: int, encoding: "Encoding") -> Iterator[Tuple[str, int]]:
+    """
+    Coupe une ligne trop longue en morceaux d'au plus `room` tokens, sans l'encoder à nouveau.
+
+    Les octets d'un caractère partagé entre deux morceaux sont reportés sur le suivant.
+
+    Paramètres
+    ----------
+    tokens : List[int]
+        Tokens de la ligne.
+    room : int
+        Nombre maximal de tokens d'un morceau.
+    encoding : Encoding
+        Encodeur tiktoken.
+
+    Retourne
+    -------
+    Iterator[Tuple[str, int]]
+        Texte et nombre de tokens de chaque morceau.
+    """
+    pending = b""
+    for start in range(0, len(tokens), room):
+        data = pending + encoding.decode_bytes(tokens[start : start + room])
+        try:
+            text, pending = data.decode("utf-8"), b""
+        except UnicodeDecodeError as exc:
+            text, pending = data[: exc.start].decode("utf-8"), data[exc.start :]
+        yield text, len(tokens[start : start + room])
+    if pending:
+        yield pending.decode("utf-8", errors="replace"), 0
+
+
+def _part_piece(path: str, part: List[Tuple[int, str, int]], encoding: "Encoding") -> _Piece:
+    first, last = part[0][0], part[-1][0]
+    label = f" (line {first})" if first == last else f" (lines {first}-{last})"
+    header = f"FILE: {path}{label}"
+    content = "".join(text for _, text, _ in part)
+    token_count = len(encoding.encode_ordinary(_format_block(header, ""))) + sum(count for _, _, count in part)
+    return _Piece(path, label, _format_block(header, content), token_count)
+
+
+def _format_block(header: str, content: str) -> str:
+    return f"{SEPARATOR}\n{header}\n{SEPARATOR}\n{content}{_BLOCK_END}"
+
+
+class _ChunkPacker:
+    """
+    Regroupe les blocs dans des chunks, dans l'ordre, en fermant un chunk quand le bloc suivant ne tient plus.
+
+    Paramètres
+    ----------
+    encoding : Encoding
+        Encodeur tiktoken, pour compter les en-têtes.
+    content_budget : int
+        Nombre maximal de tokens des blocs d'un chunk.
+    header_budget : int
+        Nombre maximal de tokens de l'en-tête d'un chunk.
+    title : Optional[str]
+        Titre repris dans l'en-tête de chaque chunk.
+    """
+
+    def __init__(self, encoding: "Encoding", content_budget: int, header_budget: int, title: Optional[str]) -> None:
+        self.content_budget = content_budget
+        self._encoding = encoding
+        self._header_budget = header_budget
+        self._title = title
+        self._pieces: List[_Piece] = []
+        self._tokens = 0
+        self._index = 0
+
+    def add(self, piece: _Piece) -> Iterator[Chunk]:
+        """Ajoute un bloc, en produisant d'abord le chunk en cours s'il doit être clos."""
+        if self._pieces and (self._tokens + piece.token_count > self.content_budget or self._directory_break(piece)):
+            yield self._close()
+        self._pieces.append(piece)
+        self._tokens += piece.token_count
+
+    def flush(self) -> Iterator[Chunk]:
+        """Produit le dernier chunk, s'il n'est pas vide."""
+        if self._pieces:
+            yield self._close()
+
+    def _directory_break(self, piece: _Piece) -> bool:
+        last = self._pieces[-1]
+        return (
+            last.path != piece.path
+            and posixpath.dirname(last.path) != posixpath.dirname(piece.path)
+            and self._tokens >= CHUNK_DIRECTORY_BREAK_FILL * self.content_budget
+        )
+
+    def _close(self) -> Chunk:
+        self._index += 1
+        header, header_tokens = self._header()
+        paths = list(dict.fromkeys(piece.path for piece in self._pieces))
+        chunk = Chunk(
+            index=self._index,
+            text=header + "".join(piece.text for piece in self._pieces),
+            token_count=header_tokens + self._tokens,
+            paths=paths,
+        )
+        self._pieces, self._tokens = [], 0
+        return chunk
+
+    def _header(self) -> Tuple[str, int]:
+        """
+        Construit l'en-tête du chunk en cours : son numéro, le titre et l'extrait de l'arborescence de ses fichiers.
+
+        L'extrait est raccourci, puis omis, s'il dépasse le budget de l'en-tête.
+
+        Retourne
+        -------
+        Tuple[str, int]
+            Texte et nombre de tokens de l'en-tête (vide si même le titre ne tient pas).
+        """
+        title = f"Chunk {self._index}" + (f" of {self._title}" if self._title else "")
+        entries = _tree_excerpt([(piece.path, piece.label) for piece in self._pieces])
+        kept = len(entries)
+        while True:
+            lines = [title, "Directory excerpt:", *entries[:kept]]
+            if kept < len(entries):
+                lines.append(f"... {len(entries) - kept} more entries")
+            header = "\n".join(lines) + "\n\n"
+            token_count = len(self._encoding.encode_ordinary(header))
+            if token_count <= self._header_budget:
+                return header, token_count
+            if kept == 0:
+                header = f"{title}\n\n"
+                token_count = len(self._encoding.encode_ordinary(header))
+                return (header, token_count) if token_count <= self._header_budget else ("", 0)
+            kept = min(kept - 1, kept * self._header_budget // token_count)
+
+
+def _tree_excerpt(entries: List[Tuple[str, str]]) -> List[str]:
+    """
+    Présente les fichiers d'un chunk sous forme d'arborescence indentée.
+
+    Paramètres
+    ----------
+    entries : List[Tuple[str, str]]
+        Chemin et précision (lignes d'une partie) de chaque bloc, dans l'ordre.
+
+    Retourne
+    -------
+    List[str]
+        Lignes de l'extrait : dossiers (terminés par `/`) et fichiers, indentés de quatre espaces par niveau.
+    """
+    lines: List[str] = []
+    opened: List[str] = []
+    for path, label in entries:
+        *directories, name = path.split("/")
+        common = 0
+        while common < min(len(opened), len(directories)) and opened[common] == directories[common]:
+            common += 1
+        opened = opened[:common]
+        for directory in directories[common:]:
+            lines.append("    " * len(opened) + directory + "/")
+            opened.append(directory)
+        lines.append("    " * len(opened) + name + label)
+    return lines
@@ -15,8 +15,8 @@ from gitingest.formatting.formatter import format_repo_context
 from gitingest.utils.filesystem_tree import build_filesystem_tree
 from gitingest.utils.exceptions import InvalidConfigError, UnreadableFileError, BinaryFileIgnored
 
-from gitingest.config import MAX_FILE_SIZE, OUTPUT_FILE_NAME
-from gitingest.entrypoint import ingest_async
+from gitingest.config import MAX_FILE_SIZE, OUTPUT_FILE_NAME, TOKENIZER_PROCESSES
+from gitingest.entrypoint import ingest_to_file_async
 from tqdm import tqdm
 import time
 import os
@@ -46,7 +46,37 @@ def create_cli():
         @click.option("--export-decisions", default=None, help="Chemin d'export des décisions de classification (JSON).")
         @click.option("--debug-log", default=None, help="Chemin du fichier de log debug (optionnel)")
         @click.option('--no-progress', is_flag=True, default=False, help='Désactive la barre de progression.')
-        def model_command(source, format, output, max_files, show_metadata, show_content, audit, dry_run, log_level, export_decisions, debug_log, no_progress, _model_name=model_name):
+        @click.option(
+            "--generated-files",
+            default="keep",
+            show_default=True,
+            type=click.Choice(["keep", "sample", "skip"]),
+            help="Fichiers générés (bundles, code généré, lockfiles) : gardés, échantillonnés ou ignorés.",
+        )
+        @click.option(
+            "--tokenizer-processes",
+            default=TOKENIZER_PROCESSES,
+            show_default=True,
+            type=click.IntRange(min=0),
+            help="Processus comptant les tokens des fichiers lus (0 : comptage dans les threads de lecture).",
+        )
+        def model_command(
+            source,
+            format,
+            output,
+            max_files,
+            show_metadata,
+            show_content,
+            audit,
+            dry_run,
+            log_level,
+            export_decisions,
+            debug_log,
+            no_progress,
+            generated_files,
+            tokenizer_processes,
+            _model_name=model_name,
+        ):
             """
             Extraction optimisée pour le modèle LLM preset : {model}
 
@@ -68,6 +98,8 @@ def create_cli():
               --export-decisions Exporter les décisions de classification (JSON)
               --debug-log        Chemin du fichier de log debug (optionnel)
               --no-progress      Désactive la barre de progression
+              --generated-files  Fichiers générés : keep, sample ou skip
+              --tokenizer-processes Processus comptant les tokens (0 : dans les threads de lecture)
             """.format(model=_model_name)
             import logging
             logger = None
@@ -112,6 +144,9 @@ def create_cli():
                 root_node,
                 model_config,
                 repo_name=root_path.name,
+                generated_file_policy=generated_files,
+                show_progress=not no_progress,
+                tokenizer_processes=tokenizer_processes,
             )
             click.echo(f"[DEBUG] Fin extract_repo_context en {time.time() - start_extract:.2f}s")
             existing_paths = {f.path for f in repo_context.files}
@@ -316,11 +351,51 @@ def create_cli():
 
     @cli.command()
     @click.argument("source", type=str, default=".")
-    @click.option("--output", "-o", default=None, help="Chemin du fichier de sortie (par défaut: <repo_name>.txt dans le dossier courant)")
+    @click.option(
+        "--output",
+        "-o",
+        default=None,
+        help=(
+            "Chemin du fichier de sortie, compressé s'il se termine par .gz ou .zst, conteneur indexé s'il se "
+            "termine par .gidx (par défaut: <repo_name>.txt dans le dossier courant)"
+        ),
+    )
     @click.option("--max-size", "-s", default=MAX_FILE_SIZE, help="Taille maximale d'un fichier à traiter (en octets)")
     @click.option("--exclude-pattern", "-e", multiple=True, help="Patterns à exclure (ex: *.md, tests/*)")
     @click.option("--include-pattern", "-i", multiple=True, help="Patterns à inclure (ex: *.py, src/*)")
     @click.option("--branch", "-b", default=None, help="Branche à cloner et analyser")
+    @click.option(
+        "--large-files",
+        default="skip",
+        show_default=True,
+        type=click.Choice(["skip", "sample"]),
+        help="Fichiers dépassant --max-size : ignorés ou échantillonnés (début et fin)",
+    )
+    @click.option(
+        "--generated-files",
+        default="keep",
+        show_default=True,
+        type=click.Choice(["keep", "sample", "skip"]),
+        help="Fichiers générés (bundles, code généré, lockfiles) : gardés, échantillonnés ou ignorés",
+    )
+    @click.option(
+        "--tokens",
+        default="exact",
+        show_default=True,
+        type=click.Choice(["exact", "approximate"]),
+        help=(
+            "Comptage des tokens du résumé : exact (encodage complet) ou approximatif (rapide, avec marge d'erreur)"
+        ),
+    )
+    @click.option(
+        "--index",
+        "write_index",
+        is_flag=True,
+        default=False,
+        help=(
+            "Écrit aussi l'index des positions du digest (<nom>.index.json), pour y lire un fichier sans le parcourir"
+        ),
+    )
     def main(
         source: str,
         output: str,
@@ -328,6 +403,10 @@ def create_cli():
         exclude_pattern,
         include_pattern,
         branch,
+        large_files,
+        generated_files,
+        tokens,
+        write_index,
     ):
         """
         Point d'entrée principal de la CLI (analyse classique).
@@ -339,13 +418,31 @@ def create_cli():
           gitingest ./src --include-pattern '*.py' --branch main
 
         Options principales :
-          --output           Chemin du fichier de sortie
+          --output           Chemin du fichier de sortie (.gz ou .zst pour le compresser,
+                             .gidx pour un conteneur indexé)
           --max-size         Taille maximale d'un fichier à traiter (en octets)
           --exclude-pattern  Patterns à exclure (ex: *.md, tests/*)
           --include-pattern  Patterns à inclure (ex: *.py, src/*)
           --branch           Branche à cloner et analyser
+          --large-files      Fichiers trop gros : skip (ignorés) ou sample (début et fin)
+          --generated-files  Fichiers générés : keep (gardés), sample (début et fin) ou skip (ignorés)
+          --tokens           Comptage des tokens : exact ou approximate (estimation rapide)
+          --index            Écrit aussi l'index des positions du digest (<nom>.index.json)
         """
-        asyncio.run(_async_main(source, output, max_size, exclude_pattern, include_pattern, branch))
+        asyncio.run(
+            _async_main(
+                source,
+                output,
+                max_size,
+                exclude_pattern,
+                include_pattern,
+                branch,
+                large_files,
+                generated_files,
+                tokens,
+                write_index,
+            )
+        )
 
     async def _async_main(
         source: str,
@@ -354,6 +451,10 @@ def create_cli():
         exclude_pattern,
         include_pattern,
         branch,
+        large_files="skip",
+        generated_files="keep",
+        tokens="exact",
+        write_index=False,
     ) -> None:
         try:
             from gitingest.config import OUTPUT_FILE_NAME
@@ -361,7 +462,19 @@ def create_cli():
             include_patterns = set(include_pattern)
             if not output:
                 output = OUTPUT_FILE_NAME
-            summary, _, _ = await ingest_async(source, max_size, include_patterns, exclude_patterns, branch, output=output)
+            # Le digest est écrit au fil de l'eau : seul le résumé est gardé en mémoire
+            summary = await ingest_to_file_async(
+                source,
+                output,
+                max_size,
+                include_patterns,
+                exclude_patterns,
+                branch,
+                large_file_policy=large_files,
+                generated_file_policy=generated_files,
+                token_count_mode=tokens,
+                write_index=write_index,
+            )
             click.echo(f"Analysis complete! Output written to: {output}")
             click.echo("\nSummary:")
             click.echo(summary)
@@ -369,6 +482,123 @@ def create_cli():
             click.echo(f"Error: {exc}", err=True)
             raise click.Abort()
 
+    @cli.command()
+    @click.argument("source", type=click.Path(exists=True, dir_okay=False))
+    @click.argument("destination", type=click.Path(dir_okay=False))
+    def convert(source, destination):
+        """
+        Convertit un digest texte en conteneur indexé (.gidx), ou l'inverse.
+
+        Le sens de la conversion dépend de l'extension de SOURCE : un fichier .gidx est converti en digest texte
+        (compressé si DESTINATION se termine par .gz ou .zst), tout autre fichier en conteneur indexé.
+
+        Exemples d'utilisation :
+          gitingest convert digest.txt digest.gidx
+          gitingest convert digest.gidx digest.txt.gz
+        """
+        from gitingest.digest_container import CONTAINER_SUFFIX, container_to_text, text_to_container
+        from gitingest.utils.compression import open_digest_writer
+        try:
+            if source.endswith(CONTAINER_SUFFIX):
+                with open_digest_writer(destination) as f:
+                    container_to_text(source, f)
+                click.echo(f"Digest texte écrit dans : {destination}")
+            else:
+                count = text_to_container(source, destination)
+                click.echo(f"Conteneur indexé écrit dans : {destination} ({count} fichiers)")
+        except (OSError, ValueError) as exc:
+            click.echo(f"Error: {exc}", err=True)
+            raise click.Abort()
+
+    @cli.command()
+    @click.argument("source", type=click.Path(exists=True, dir_okay=False))
+    @click.option(
+        "--max-tokens",
+        required=True,
+        type=click.IntRange(min=1),
+        help="Nombre maximal de tokens par chunk, en-tête compris",
+    )
+    @click.option(
+        "--encoding",
+        default="cl100k_base",
+        show_default=True,
+        help="Encodage tiktoken utilisé pour compter les tokens",
+    )
+    @click.option(
+        "--output-dir",
+        "-o",
+        default=None,
+        type=click.Path(file_okay=False),
+        help="Dossier où écrire les chunks (par défaut : celui de SOURCE)",
+    )
+    def chunk(source, max_tokens, encoding, output_dir):
+        """
+        Découpe un digest texte en chunks d'au plus --max-tokens tokens, à envoyer en plusieurs appels.
+
+        Les chunks sont écrits dans <nom>.chunk-001.txt, <nom>.chunk-002.txt, etc. Chacun commence par un extrait de
+        l'arborescence de ses fichiers ; les fichiers trop gros sont découpés aux définitions puis aux lignes.
+
+        Exemples d'utilisation :
+          gitingest chunk digest.txt --max-tokens 100000
+          gitingest chunk digest.txt.gz --max-tokens 32000 -o chunks/
+        """
+        from gitingest.chunking import chunk_digest
+        from gitingest.digest_index import INDEX_SUFFIX, index_path_for
+        stem = index_path_for(source).name[: -len(INDEX_SUFFIX)]
+        directory = Path(output_dir) if output_dir else Path(source).parent
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            for produced in chunk_digest(source, max_tokens, encoding):
+                path = directory / f"{stem}.chunk-{produced.index:03d}.txt"
+                path.write_text(produced.text, encoding="utf-8")
+                click.echo(f"{path} : {produced.token_count} tokens, {len(produced.paths)} fichiers")
+        except (OSError, ValueError) as exc:
+            click.echo(f"Error: {exc}", err=True)
+            raise click.Abort()
+
+    @cli.command(name="tokenizer-cache")
+    @click.option(
+        "--encoding",
+        "encodings",
+        multiple=True,
+        default=("cl100k_base", "o200k_base"),
+        show_default=True,
+        help="Encodages tiktoken à mettre en cache",
+    )
+    @click.option(
+        "--from",
+        "seed_dir",
+        default=None,
+        type=click.Path(exists=True, file_okay=False),
+        help="Dossier contenant des fichiers <encodage>.tiktoken à copier",
+    )
+    @click.option(
+        "--offline", is_flag=True, help="Ne rien télécharger : seuls les fichiers de --from sont utilisés"
+    )
+    def tokenizer_cache(encodings, seed_dir, offline):
+        """
+        Pré-remplit et vérifie le cache des fichiers BPE de tiktoken.
+
+        Une fois le cache rempli, le comptage des tokens fonctionne sans accès réseau.
+
+        Exemples d'utilisation :
+          gitingest tokenizer-cache
+          gitingest tokenizer-cache --from ./tiktoken-files --offline
+        """
+        from gitingest.utils.tiktoken_cache import configure_tiktoken_cache, seed_tiktoken_cache
+        try:
+            statuses = seed_tiktoken_cache(
+                encodings, seed_dir=Path(seed_dir) if seed_dir else None, download=not offline
+            )
+        except (OSError, ValueError) as exc:
+            click.echo(f"Error: {exc}", err=True)
+            raise click.Abort()
+        click.echo(f"Cache tiktoken : {configure_tiktoken_cache()}")
+        for name, status in statuses.items():
+            click.echo(f"  {name}: {status}")
+        if "missing" in statuses.values() or "unknown" in statuses.values():
+            raise click.Abort()
+
     return cli
 
 cli = create_cli()
@@ -5,4 +5,33 @@ from .config import (
     MAX_FILES,
     MAX_TOTAL_SIZE_BYTES,
     OUTPUT_FILE_NAME,
+    CONTENT_CACHE_MAX_BYTES,
+    MAX_READ_WORKERS,
+    READ_AHEAD_FILES,
+    LARGE_FILE_SAMPLE_HEAD,
+    LARGE_FILE_SAMPLE_TAIL,
+    DEDUP_MIN_SIZE,
+    TREE_MAX_CHILDREN,
+    TOKEN_BATCH_FILES,
+    TOKEN_BATCH_CHARS,
+    TOKENIZER_THREADS,
+    TIKTOKEN_CACHE_DIR,
+    TIKTOKEN_SEED_DIR,
+    GZIP_COMPRESSION_LEVEL,
+    ZSTD_COMPRESSION_LEVEL,
+    COMPRESSION_THREADS,
+    COMPRESSION_BLOCK_SIZE,
+    BUDGET_FILE_OVERHEAD_TOKENS,
+    BUDGET_MIN_TRUNCATED_TOKENS,
+    CHUNK_HEADER_MAX_TOKENS,
+    CHUNK_DIRECTORY_BREAK_FILL,
+    TOKEN_CACHE_PATH,
+    TOKEN_CACHE_MAX_ENTRIES,
+    TOKEN_CACHE_MIN_CHARS,
+    READER_MIN_WORKERS,
+    READER_MAX_WORKERS,
+    READER_ADJUST_INTERVAL,
+    PROGRESS_MIN_INTERVAL,
+    TOKENIZER_PROCESSES,
+    TOKENIZER_POOL_BATCH_CHARS,
 )
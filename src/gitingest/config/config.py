@@ -1,8 +1,46 @@
 # Constantes globales de configuration pour Gitingest
 
+import os
+
 MAX_FILE_SIZE = 2 * 1024 * 1024  # 2 Mo par défaut
 TMP_BASE_PATH = "/tmp/gitingest"
 MAX_DIRECTORY_DEPTH = 10
 MAX_FILES = 1000
 MAX_TOTAL_SIZE_BYTES = 100 * 1024 * 1024  # 100 Mo par défaut
-OUTPUT_FILE_NAME = "gitingest_output.txt" 
\ No newline at end of file
+OUTPUT_FILE_NAME = "gitingest_output.txt"
+CONTENT_CACHE_MAX_BYTES = 128 * 1024 * 1024  # 128 Mo de contenu décodé gardé en mémoire
+MAX_READ_WORKERS = 8  # Threads lisant les fichiers en avance lors de la génération du digest
+READ_AHEAD_FILES = 64  # Nombre maximal de fichiers lus en avance (borne la mémoire)
+LARGE_FILE_SAMPLE_HEAD = 32 * 1024  # Octets lus au début d'un fichier trop gros en mode "sample"
+LARGE_FILE_SAMPLE_TAIL = 16 * 1024  # Octets lus à la fin d'un fichier trop gros en mode "sample"
+DEDUP_MIN_SIZE = 128  # Taille minimale (octets) d'un fichier pour être remplacé par une référence à son doublon
+TREE_MAX_CHILDREN = 500  # Au-delà, les enfants d'un dossier sont résumés par "... N more files" dans l'arborescence
+TOKEN_BATCH_FILES = 64  # Nombre de fichiers encodés ensemble par tiktoken lors du comptage des tokens
+TOKEN_BATCH_CHARS = 4 * 1024 * 1024  # Taille maximale (caractères) d'un lot de fichiers à encoder
+TOKENIZER_THREADS = 8  # Threads utilisés par tiktoken pour encoder un lot
+# Cache des fichiers BPE de tiktoken (par défaut, tiktoken utilise un dossier temporaire, vidé à chaque conteneur)
+TIKTOKEN_CACHE_DIR = os.environ.get(
+    "GITINGEST_TIKTOKEN_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "gitingest", "tiktoken")
+)
+TIKTOKEN_SEED_DIR = os.environ.get("GITINGEST_TIKTOKEN_SEED_DIR")  # Fichiers <encodage>.tiktoken fournis hors ligne
+GZIP_COMPRESSION_LEVEL = 6  # Niveau de compression des digests .gz
+ZSTD_COMPRESSION_LEVEL = 3  # Niveau de compression des digests .zst (nécessite le paquet optionnel zstandard)
+COMPRESSION_THREADS = 4  # Threads compressant un digest en parallèle (1 pour une compression séquentielle)
+COMPRESSION_BLOCK_SIZE = 1024 * 1024  # Taille des blocs compressés indépendamment en gzip parallèle
+BUDGET_FILE_OVERHEAD_TOKENS = 40  # Tokens d'en-tête (chemin, métadonnées, balises) comptés par fichier extrait
+BUDGET_MIN_TRUNCATED_TOKENS = 256  # En deçà, un fichier qui dépasse le budget est écarté plutôt que tronqué
+CHUNK_HEADER_MAX_TOKENS = 256  # Tokens réservés dans chaque chunk à son en-tête (extrait de l'arborescence)
+CHUNK_DIRECTORY_BREAK_FILL = 0.75  # Remplissage à partir duquel un chunk est clos au changement de dossier
+# Cache persistant des nombres de tokens par contenu et par encodage (chaîne vide pour le désactiver)
+TOKEN_CACHE_PATH = os.environ.get(
+    "GITINGEST_TOKEN_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "gitingest", "token_counts.sqlite3")
+)
+# Environ 60 Mo sur disque ; au-delà, les entrées les plus anciennes sont évincées
+TOKEN_CACHE_MAX_ENTRIES = 500_000
+TOKEN_CACHE_MIN_CHARS = 2048  # En deçà, encoder un texte coûte moins cher que de consulter le cache
+READER_MIN_WORKERS = 8  # Lectures simultanées de l'extraction sur disque local (minimum de la concurrence adaptative)
+READER_MAX_WORKERS = 64  # Lectures simultanées au plus, quand les lectures attendent surtout (NFS, disque lent)
+READER_ADJUST_INTERVAL = 32  # Lectures entre deux ajustements de la concurrence
+PROGRESS_MIN_INTERVAL = 0.5  # Secondes minimales entre deux rafraîchissements d'une barre de progression
+TOKENIZER_PROCESSES = 0  # Processus encodant les contenus extraits (0 : encodage dans le processus principal)
+TOKENIZER_POOL_BATCH_CHARS = 256 * 1024  # Caractères envoyés ensemble à un processus d'encodage
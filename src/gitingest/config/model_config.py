@@ -34,6 +34,8 @@ class LLMModelConfig:
         Liste des fichiers de configuration à prioriser.
     additional_params : Optional[dict]
         Paramètres additionnels spécifiques au modèle.
+    encoding_name : Optional[str]
+        Encodage tiktoken du modèle ; s'il est absent, il est déduit du nom du modèle (cl100k_base par défaut).
     """
     max_tokens: int
     max_file_size: int
@@ -41,6 +43,7 @@ class LLMModelConfig:
     important_file_types: Optional[List[str]] = field(default_factory=lambda: IMPORTANT_FILE_TYPES)
     config_files_priority: Optional[List[str]] = field(default_factory=lambda: CONFIG_FILES_PRIORITY)
     additional_params: Optional[dict] = field(default_factory=dict)
+    encoding_name: Optional[str] = None
 
 
 DEFAULT_MODEL_CONFIGS: Dict[str, LLMModelConfig] = {
@@ -60,26 +63,32 @@ DEFAULT_MODEL_CONFIGS: Dict[str, LLMModelConfig] = {
     "gpt-4o": LLMModelConfig(
         max_tokens=128_000,
         max_file_size=20 * 1024 * 1024,  # 20 MB
+        encoding_name="o200k_base",
     ),
     "gpt-4o-mini": LLMModelConfig(
         max_tokens=128_000,
         max_file_size=20 * 1024 * 1024,  # 20 MB
+        encoding_name="o200k_base",
     ),
     "gpt-4.5": LLMModelConfig(
         max_tokens=128_000,
         max_file_size=20 * 1024 * 1024,  # 20 MB
+        encoding_name="o200k_base",
     ),
     "o1": LLMModelConfig(
         max_tokens=200_000,
         max_file_size=40 * 1024 * 1024,  # 40 MB
+        encoding_name="o200k_base",
     ),
     "o3-mini": LLMModelConfig(
         max_tokens=200_000,
         max_file_size=40 * 1024 * 1024,  # 40 MB
+        encoding_name="o200k_base",
     ),
     "o1-mini": LLMModelConfig(
         max_tokens=128_000,
         max_file_size=20 * 1024 * 1024,  # 20 MB
+        encoding_name="o200k_base",
     ),
     "gpt-3.5-turbo": LLMModelConfig(
         max_tokens=16_384,
@@ -183,7 +192,10 @@ def load_llm_model_configs() -> Dict[str, LLMModelConfig]:
             configs[key] = LLMModelConfig(
                 max_tokens=val["max_tokens"],
                 max_file_size=val["max_file_size"],
-                additional_params={k: v for k, v in val.items() if k not in ("max_tokens", "max_file_size")}
+                encoding_name=val.get("encoding_name"),
+                additional_params={
+                    k: v for k, v in val.items() if k not in ("max_tokens", "max_file_size", "encoding_name")
+                }
             )
         except Exception as e:
             logger.error(f"Erreur lors de la création du preset LLM '{key}': {e}")
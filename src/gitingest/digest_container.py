@@ -0,0 +1,575 @@
+"""Indexed binary container for digests, giving random access to the content of each file by its path."""
+
+import hashlib
+import json
+import mmap
+import re
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+from gitingest.schemas.filesystem_schema import SEPARATOR
+from gitingest.utils.compression import open_digest_reader
+
+CONTAINER_SUFFIX = ".gidx"
+
+# Layout of a container (all integers are little-endian):
+#   header   magic, format version
+#   records  for each file: path length (u32), path, content length (u64), content (UTF-8)
+#   metadata length (u64), then a JSON object holding the summary and the directory structure
+#   entries  one fixed-size entry per file, in digest order
+#   slots    open-addressing hash table mapping the hash of a path to its entry index + 1 (0 for an empty slot)
+#   trailer  offsets of the metadata, entries and slots, entry and slot counts, magic, format version
+_MAGIC = b"GIDX"
+_VERSION = 1
+_HEADER = struct.Struct("<4sH2x")
+_PATH_LENGTH = struct.Struct("<I")
+_LENGTH = struct.Struct("<Q")
+# Content offset and length, token count (-1 if unknown), record offset, path length, flags, index of the first
+# entry with the same content (for duplicates), content hash
+_ENTRY = struct.Struct("<QQqQIII4x16s")
+_SLOT = struct.Struct("<I")
+_TRAILER = struct.Struct("<QQQII4sH2x")
+
+_SYMLINK = 1  # The content of the entry is the target of the symlink
+_DUPLICATE = 2  # The entry shares the content of an earlier entry
+_NO_ENTRY = 0xFFFFFFFF
+
+# Content written in a text digest in place of a file already emitted in full (see `output_formatters._Deduplicator`)
+_DUPLICATE_MARKER = re.compile(r"\[Duplicate of (.+)\]")
+
+
+@dataclass(frozen=True)
+class DigestEntry:
+    """
+    Metadata of a file stored in a digest container.
+
+    Attributes
+    ----------
+    path : str
+        The path of the file, as shown in the digest (with `/` separators).
+    offset : int
+        The offset of the UTF-8 content of the file in the container.
+    length : int
+        The length in bytes of the content of the file.
+    token_count : int, optional
+        The number of tokens of the file's block in the text digest, if it was counted.
+    content_hash : str, optional
+        The hexadecimal hash of the raw content of the file, if it is known.
+    symlink_target : str, optional
+        The name of the target, if the file is a symlink.
+    duplicate_of : str, optional
+        The path of the first file with the same content, if the file is a duplicate.
+    """
+
+    path: str
+    offset: int
+    length: int
+    token_count: Optional[int] = None
+    content_hash: Optional[str] = None
+    symlink_target: Optional[str] = None
+    duplicate_of: Optional[str] = None
+
+
+class DigestContainerWriter:
+    """
+    Write a digest container one file at a time.
+
+    File records are written as they are added, so only the fixed-size index entries are kept in memory. The index
+    is written by `finish`; a container that was closed without being finished cannot be opened.
+
+    Parameters
+    ----------
+    path : Union[str, Path]
+        The path of the container file to write.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self._file: BinaryIO = open(path, "wb")  # pylint: disable=consider-using-with
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION))
+        self._offset = _HEADER.size
+        self._entries: List[List] = []
+        self._paths: List[bytes] = []
+        self._indices: Dict[str, int] = {}
+
+    def add(
+        self,
+        path: str,
+        content: str,
+        content_hash: Optional[str] = None,
+        symlink_target: Optional[str] = None,
+        token_count: Optional[int] = None,
+    ) -> int:
+        """
+        Add a file to the container.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file, as shown in the digest.
+        content : str
+            The content of the file (ignored for symlinks).
+        content_hash : str, optional
+            The hexadecimal hash of the raw content of the file.
+        symlink_target : str, optional
+            The name of the target, if the file is a symlink.
+        token_count : int, optional
+            The number of tokens of the file's block in the text digest.
+
+        Returns
+        -------
+        int
+            The index of the entry of the file, to set its token count later with `set_token_count`.
+        """
+        data = (symlink_target if symlink_target is not None else content).encode("utf-8")
+        record_offset, content_offset = self._write_record(path, data)
+        digest = bytes.fromhex(content_hash)[:16] if content_hash else b""
+        flags = _SYMLINK if symlink_target is not None else 0
+        return self._add_entry(path, [content_offset, len(data), token_count, record_offset, flags, _NO_ENTRY, digest])
+
+    def add_duplicate(self, path: str, first_path: str, token_count: Optional[int] = None) -> int:
+        """
+        Add a file whose content is the same as an earlier file, without storing the content again.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file, as shown in the digest.
+        first_path : str
+            The path of the earlier file with the same content.
+        token_count : int, optional
+            The number of tokens of the file's block in the text digest.
+
+        Returns
+        -------
+        int
+            The index of the entry of the file.
+
+        Raises
+        ------
+        KeyError
+            If `first_path` was not added before.
+        """
+        first_index = self._indices[first_path]
+        first = self._entries[first_index]
+        record_offset, _ = self._write_record(path, b"")
+        entry = [first[0], first[1], token_count, record_offset, _DUPLICATE, first_index, first[6]]
+        return self._add_entry(path, entry)
+
+    def set_token_count(self, index: int, token_count: Optional[int]) -> None:
+        """
+        Set the token count of an entry, once it is known.
+
+        Parameters
+        ----------
+        index : int
+            The index of the entry, as returned by `add` or `add_duplicate`.
+        token_count : int, optional
+            The number of tokens of the file's block in the text digest.
+        """
+        self._entries[index][2] = token_count
+
+    def finish(self, summary: str = "", tree: str = "") -> None:
+        """
+        Write the metadata and the index, and close the container.
+
+        Parameters
+        ----------
+        summary : str
+            The summary of the digest.
+        tree : str
+            The directory structure of the digest.
+        """
+        meta_offset = self._offset
+        meta = json.dumps({"summary": summary, "tree": tree}).encode("utf-8")
+        self._file.write(_LENGTH.pack(len(meta)))
+        self._file.write(meta)
+        entries_offset = meta_offset + _LENGTH.size + len(meta)
+
+        for path, entry in zip(self._paths, self._entries):
+            content_offset, length, token_count, record_offset, flags, first_index, digest = entry
+            token_count = -1 if token_count is None else token_count
+            self._file.write(
+                _ENTRY.pack(content_offset, length, token_count, record_offset, len(path), flags, first_index, digest)
+            )
+
+        # At most half of the slots are used, which keeps probe sequences short
+        slot_count = 1
+        while slot_count < 2 * len(self._entries):
+            slot_count *= 2
+        slots = bytearray(slot_count * _SLOT.size)
+        for index, path in enumerate(self._paths):
+            slot = _path_hash(path) & (slot_count - 1)
+            while _SLOT.unpack_from(slots, slot * _SLOT.size)[0]:
+                slot = (slot + 1) & (slot_count - 1)
+            _SLOT.pack_into(slots, slot * _SLOT.size, index + 1)
+        slots_offset = entries_offset + len(self._entries) * _ENTRY.size
+        self._file.write(slots)
+
+        self._file.write(
+            _TRAILER.pack(meta_offset, entries_offset, slots_offset, len(self._entries), slot_count, _MAGIC, _VERSION)
+        )
+        self._file.close()
+
+    def close(self) -> None:
+        """Close the container file, leaving it unusable if `finish` was not called."""
+        self._file.close()
+
+    def __enter__(self) -> "DigestContainerWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _write_record(self, path: str, data: bytes) -> Tuple[int, int]:
+        encoded_path = path.encode("utf-8")
+        record_offset = self._offset
+        self._file.write(_PATH_LENGTH.pack(len(encoded_path)))
+        self._file.write(encoded_path)
+        self._file.write(_LENGTH.pack(len(data)))
+        self._file.write(data)
+        content_offset = record_offset + _PATH_LENGTH.size + len(encoded_path) + _LENGTH.size
+        self._offset = content_offset + len(data)
+        return record_offset, content_offset
+
+    def _add_entry(self, path: str, entry: List) -> int:
+        index = len(self._entries)
+        self._entries.append(entry)
+        self._paths.append(path.encode("utf-8"))
+        self._indices.setdefault(path, index)
+        return index
+
+
+class DigestContainer:
+    """
+    Read-only view of a digest container, memory-mapped for random access.
+
+    Looking a file up costs one hash and usually a single probe in the index, whatever the size of the container, and
+    reading it only touches the pages holding its content.
+
+    Parameters
+    ----------
+    path : Union[str, Path]
+        The path of the container file.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a digest container, or was written by an unsupported version.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self._file = open(path, "rb")  # pylint: disable=consider-using-with
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as exc:
+            self._file.close()
+            raise ValueError(f"Not a digest container: {path}") from exc
+
+        if len(self._map) < _HEADER.size + _TRAILER.size or _HEADER.unpack_from(self._map)[0] != _MAGIC:
+            self.close()
+            raise ValueError(f"Not a digest container: {path}")
+        (
+            self._meta_offset,
+            self._entries_offset,
+            self._slots_offset,
+            self._count,
+            self._slot_count,
+            magic,
+            version,
+        ) = _TRAILER.unpack_from(self._map, len(self._map) - _TRAILER.size)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f"Incomplete digest container: {path}")
+        if version != _VERSION:
+            self.close()
+            raise ValueError(f"Unsupported digest container version {version}: {path}")
+        self._meta: Optional[dict] = None
+
+    @property
+    def summary(self) -> str:
+        """The summary of the digest."""
+        return self._metadata()["summary"]
+
+    @property
+    def tree(self) -> str:
+        """The directory structure of the digest."""
+        return self._metadata()["tree"]
+
+    def entry(self, path: str) -> DigestEntry:
+        """
+        Return the metadata of a file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file, as shown in the digest.
+
+        Returns
+        -------
+        DigestEntry
+            The metadata of the file.
+
+        Raises
+        ------
+        KeyError
+            If the container holds no file with this path.
+        """
+        return self._entry(self._find(path))
+
+    def read(self, path: str) -> str:
+        """
+        Return the content of a file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file, as shown in the digest.
+
+        Returns
+        -------
+        str
+            The content of the file (the target name for a symlink).
+
+        Raises
+        ------
+        KeyError
+            If the container holds no file with this path.
+        """
+        return self.read_bytes(path).decode("utf-8")
+
+    def read_bytes(self, path: str) -> bytes:
+        """
+        Return the UTF-8 encoded content of a file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file, as shown in the digest.
+
+        Returns
+        -------
+        bytes
+            The encoded content of the file.
+
+        Raises
+        ------
+        KeyError
+            If the container holds no file with this path.
+        """
+        offset, length = _ENTRY.unpack_from(self._map, self._entries_offset + self._find(path) * _ENTRY.size)[:2]
+        return self._map[offset : offset + length]
+
+    def entries(self) -> Iterator[DigestEntry]:
+        """
+        Yield the metadata of every file, in digest order.
+
+        Yields
+        ------
+        DigestEntry
+            The metadata of each file.
+        """
+        for index in range(self._count):
+            yield self._entry(index)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, path: object) -> bool:
+        if not isinstance(path, str):
+            return False
+        try:
+            self._find(path)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._count):
+            yield self._path(index)
+
+    def close(self) -> None:
+        """Unmap and close the container file."""
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "DigestContainer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _find(self, path: str) -> int:
+        encoded_path = path.encode("utf-8")
+        mask = self._slot_count - 1
+        slot = _path_hash(encoded_path) & mask
+        while True:
+            index = _SLOT.unpack_from(self._map, self._slots_offset + slot * _SLOT.size)[0] - 1
+            if index < 0:
+                raise KeyError(path)
+            record_offset, path_length = _ENTRY.unpack_from(self._map, self._entries_offset + index * _ENTRY.size)[3:5]
+            start = record_offset + _PATH_LENGTH.size
+            if path_length == len(encoded_path) and self._map[start : start + path_length] == encoded_path:
+                return index
+            slot = (slot + 1) & mask
+
+    def _path(self, index: int) -> str:
+        record_offset, path_length = _ENTRY.unpack_from(self._map, self._entries_offset + index * _ENTRY.size)[3:5]
+        start = record_offset + _PATH_LENGTH.size
+        return self._map[start : start + path_length].decode("utf-8")
+
+    def _entry(self, index: int) -> DigestEntry:
+        offset, length, token_count, _, _, flags, first_index, digest = _ENTRY.unpack_from(
+            self._map, self._entries_offset + index * _ENTRY.size
+        )
+        return DigestEntry(
+            path=self._path(index),
+            offset=offset,
+            length=length,
+            token_count=None if token_count < 0 else token_count,
+            content_hash=digest.hex() if any(digest) else None,
+            symlink_target=self._map[offset : offset + length].decode("utf-8") if flags & _SYMLINK else None,
+            duplicate_of=self._path(first_index) if flags & _DUPLICATE else None,
+        )
+
+    def _metadata(self) -> dict:
+        if self._meta is None:
+            (length,) = _LENGTH.unpack_from(self._map, self._meta_offset)
+            start = self._meta_offset + _LENGTH.size
+            self._meta = json.loads(self._map[start : start + length].decode("utf-8"))
+        return self._meta
+
+
+def text_to_container(text_path: Union[str, Path], container_path: Union[str, Path]) -> int:
+    """
+    Convert a text digest (as written by `write_digest`, optionally compressed) to a digest container.
+
+    The text is parsed one line at a time, so only the content of one file is held in memory. Duplicate references
+    to an earlier file are stored as duplicates of it, as in containers written by `write_digest_container`. The
+    summary is not part of a text digest and is left empty; token counts are unknown.
+
+    Parameters
+    ----------
+    text_path : Union[str, Path]
+        The path of the text digest.
+    container_path : Union[str, Path]
+        The path of the container to write.
+
+    Returns
+    -------
+    int
+        The number of files in the container.
+    """
+    with open_digest_reader(text_path, newline="") as text, DigestContainerWriter(container_path) as writer:
+        tree, blocks = parse_text_digest(text)
+        count = 0
+        paths = set()
+        for header, content in blocks:
+            kind, _, path = header.partition(": ")
+            duplicate = _DUPLICATE_MARKER.fullmatch(content)
+            if kind == "SYMLINK":
+                path, _, target = path.partition(" -> ")
+                writer.add(path, "", symlink_target=target)
+            elif duplicate is not None and duplicate.group(1) in paths:
+                writer.add_duplicate(path, duplicate.group(1))
+            else:
+                writer.add(path, content)
+            paths.add(path)
+            count += 1
+        writer.finish(tree=tree())
+    return count
+
+
+def container_to_text(container_path: Union[str, Path], output: TextIO) -> None:
+    """
+    Write the text digest (directory structure, then file contents) of a digest container to a stream.
+
+    Duplicates are written as references to their first occurrence, as in digests written by `write_digest`.
+
+    Parameters
+    ----------
+    container_path : Union[str, Path]
+        The path of the container.
+    output : TextIO
+        The text stream to write the digest to.
+    """
+    with DigestContainer(container_path) as container:
+        output.write(container.tree)
+        output.write("\n")
+        for index, entry in enumerate(container.entries()):
+            if index:
+                output.write("\n")
+            if entry.symlink_target is not None:
+                header, content = f"SYMLINK: {entry.path} -> {entry.symlink_target}", ""
+            elif entry.duplicate_of is not None:
+                header, content = f"FILE: {entry.path}", f"[Duplicate of {entry.duplicate_of}]"
+            else:
+                header, content = f"FILE: {entry.path}", container.read(entry.path)
+            output.write(f"{SEPARATOR}\n{header}\n{SEPARATOR}\n{content}\n\n")
+
+
+def parse_text_digest(text: TextIO) -> Tuple[Callable[[], str], Iterator[Tuple[str, str]]]:
+    """
+    Split a text digest into its directory structure and file blocks.
+
+    A block starts with a three-line header: a separator line, `FILE: <path>` (or `SYMLINK: <path> -> <target>`),
+    and another separator line. Its content runs until the next header, minus the two newlines ending every block
+    and the newline separating it from the next one.
+
+    Parameters
+    ----------
+    text : TextIO
+        The text digest, opened without newline translation.
+
+    Returns
+    -------
+    Tuple[Callable[[], str], Iterator[Tuple[str, str]]]
+        A function returning the directory structure once the first block was reached, and an iterator over the
+        header line and content of each block.
+    """
+    prefix: List[str] = []
+
+    def _blocks() -> Iterator[Tuple[str, str]]:
+        window: List[str] = []
+        header: Optional[str] = None
+        body: List[str] = prefix
+        for line in text:
+            window.append(line)
+            if len(window) < 3:
+                continue
+            if _is_block_header(window):
+                if header is not None:
+                    yield header, _strip_block_end("".join(body), last=False)
+                header, body, window = window[1].rstrip("\r\n"), [], []
+                continue
+            body.append(window.pop(0))
+        body.extend(window)
+        if header is not None:
+            yield header, _strip_block_end("".join(body), last=True)
+
+    def _tree() -> str:
+        tree = "".join(prefix)
+        return tree[:-1] if tree.endswith("\n") else tree
+
+    return _tree, _blocks()
+
+
+def _is_block_header(lines: List[str]) -> bool:
+    return (
+        lines[0].rstrip("\r\n") == SEPARATOR
+        and lines[2].rstrip("\r\n") == SEPARATOR
+        and lines[1].startswith(("FILE: ", "SYMLINK: "))
+    )
+
+
+def _strip_block_end(body: str, last: bool) -> str:
+    end = "\n\n" if last else "\n\n\n"
+    if body.endswith(end):
+        return body[: -len(end)]
+    return body[:-2] if body.endswith("\n\n") else body
+
+
+def _path_hash(path: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(path, digest_size=8).digest(), "little")
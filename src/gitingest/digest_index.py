@@ -0,0 +1,381 @@
+"""Offset index of a plain-text digest, giving random access to the block of each file without parsing it."""
+
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from gitingest.schemas import FileSystemNode
+from gitingest.schemas.filesystem_schema import SEPARATOR
+from gitingest.utils.compression import COMPRESSION_SUFFIXES, compression_for_path, read_digest_range
+from gitingest.utils.file_utils import HASH_ALGORITHM
+from gitingest.utils.tokens import DEFAULT_ENCODING
+
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 1
+
+_HEADER_END = f"\n{SEPARATOR}\n"  # Closes the path header of a file block
+_BLOCK_END = 2  # Number of bytes ("\n\n") following the content of a file block
+
+
+@dataclass(frozen=True)
+class IndexedBlock:
+    """
+    Location and metadata of the block of a file in a plain-text digest.
+
+    Offsets and lengths are in bytes of the decompressed, UTF-8 encoded digest.
+
+    Attributes
+    ----------
+    path : str
+        The path of the file, as shown in the digest (with `/` separators).
+    type : str
+        The type of the node, "FILE" or "SYMLINK".
+    offset : int
+        The offset of the block, which starts with the path header.
+    length : int
+        The length of the block, including the path header and the two trailing newlines.
+    content_offset : int
+        The offset of the content of the file, right after the path header.
+    content_length : int
+        The length of the content of the file (or of the placeholder shown instead of it).
+    token_count : int, optional
+        The number of tokens of the block, if it was counted.
+    content_hash : str, optional
+        The hash of the raw content of the file, if it was read in full.
+    """
+
+    path: str
+    type: str
+    offset: int
+    length: int
+    content_offset: int
+    content_length: int
+    token_count: Optional[int] = None
+    content_hash: Optional[str] = None
+
+
+@dataclass
+class DigestIndex:  # pylint: disable=too-many-instance-attributes
+    """
+    Offset index of a plain-text digest, stored next to it as `<name>.index.json`.
+
+    Attributes
+    ----------
+    summary : str
+        The summary of the digest, which is not part of the digest file itself.
+    tree_offset : int
+        The offset of the directory structure in the digest.
+    tree_length : int
+        The length in bytes of the directory structure.
+    blocks : List[IndexedBlock]
+        The blocks of the files, in digest order.
+    token_count_mode : str
+        Whether the token counts are "exact" or "approximate".
+    token_encoding : str
+        The tiktoken encoding the token counts refer to.
+    hash_algorithm : str
+        The algorithm of the content hashes.
+    compression : str, optional
+        The compression of the digest file, if any.
+    block_size : int
+        The number of decompressed bytes in each gzip member, if `member_offsets` is set.
+    member_offsets : List[int]
+        The offsets of the gzip members of the digest file, used as a seek table (empty if there is none).
+    """
+
+    summary: str
+    tree_offset: int
+    tree_length: int
+    blocks: List[IndexedBlock]
+    token_count_mode: str = "exact"
+    token_encoding: str = DEFAULT_ENCODING
+    hash_algorithm: str = HASH_ALGORITHM
+    compression: Optional[str] = None
+    block_size: int = 0
+    member_offsets: List[int] = field(default_factory=list)
+    _by_path: Dict[str, IndexedBlock] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._by_path = {block.path: block for block in self.blocks}
+
+    def find(self, path: str) -> Optional[IndexedBlock]:
+        """
+        Look up the block of a file by its path.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file, as shown in the digest.
+
+        Returns
+        -------
+        IndexedBlock, optional
+            The block of the file, or `None` if the digest has no such file.
+        """
+        return self._by_path.get(path)
+
+    def read_range(self, digest_path: Union[str, Path], offset: int, length: int) -> bytes:
+        """
+        Read a range of bytes of the digest, seeking instead of reading it from the start when possible.
+
+        Parameters
+        ----------
+        digest_path : Union[str, Path]
+            The path of the digest file this index describes.
+        offset : int
+            The offset of the range in the decompressed digest.
+        length : int
+            The number of bytes to read.
+
+        Returns
+        -------
+        bytes
+            The bytes of the range, fewer than `length` if the digest ends before.
+        """
+        return read_digest_range(
+            digest_path,
+            offset,
+            length,
+            compression=self.compression,
+            member_offsets=self.member_offsets,
+            block_size=self.block_size,
+        )
+
+    def read(self, digest_path: Union[str, Path], path: str, content_only: bool = True) -> str:
+        """
+        Read the block of a file from the digest.
+
+        Parameters
+        ----------
+        digest_path : Union[str, Path]
+            The path of the digest file this index describes.
+        path : str
+            The path of the file, as shown in the digest.
+        content_only : bool
+            Whether to read only the content of the file, without its path header, by default True.
+
+        Returns
+        -------
+        str
+            The content (or the whole block) of the file.
+
+        Raises
+        ------
+        KeyError
+            If the digest has no such file.
+        """
+        block = self.find(path)
+        if block is None:
+            raise KeyError(path)
+        if content_only:
+            return self.read_range(digest_path, block.content_offset, block.content_length).decode("utf-8")
+        return self.read_range(digest_path, block.offset, block.length).decode("utf-8")
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Write the index to a JSON file.
+
+        Parameters
+        ----------
+        path : Union[str, Path]
+            The path of the index file, usually given by `index_path_for`.
+        """
+        data = {
+            "version": INDEX_VERSION,
+            "summary": self.summary,
+            "tree": {"offset": self.tree_offset, "length": self.tree_length},
+            "tokens": {"mode": self.token_count_mode, "encoding": self.token_encoding},
+            "hash_algorithm": self.hash_algorithm,
+            "compression": (
+                {"type": self.compression, "block_size": self.block_size, "member_offsets": self.member_offsets}
+                if self.compression
+                else None
+            ),
+            "files": [
+                {
+                    "path": block.path,
+                    "type": block.type,
+                    "offset": block.offset,
+                    "length": block.length,
+                    "content_offset": block.content_offset,
+                    "content_length": block.content_length,
+                    "tokens": block.token_count,
+                    "hash": block.content_hash,
+                }
+                for block in self.blocks
+            ],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "DigestIndex":
+        """
+        Read an index from a JSON file.
+
+        Parameters
+        ----------
+        path : Union[str, Path]
+            The path of the index file.
+
+        Returns
+        -------
+        DigestIndex
+            The index stored in the file.
+
+        Raises
+        ------
+        ValueError
+            If the file is not a digest index, or was written by an unsupported version.
+        """
+        with open(path, encoding="utf-8") as f:
+            data: Dict[str, Any] = json.load(f)
+
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported digest index: {path}")
+
+        compression = data.get("compression") or {}
+        return cls(
+            summary=data["summary"],
+            tree_offset=data["tree"]["offset"],
+            tree_length=data["tree"]["length"],
+            blocks=[
+                IndexedBlock(
+                    path=entry["path"],
+                    type=entry["type"],
+                    offset=entry["offset"],
+                    length=entry["length"],
+                    content_offset=entry["content_offset"],
+                    content_length=entry["content_length"],
+                    token_count=entry.get("tokens"),
+                    content_hash=entry.get("hash"),
+                )
+                for entry in data["files"]
+            ],
+            token_count_mode=data["tokens"]["mode"],
+            token_encoding=data["tokens"]["encoding"],
+            hash_algorithm=data["hash_algorithm"],
+            compression=compression.get("type"),
+            block_size=compression.get("block_size", 0),
+            member_offsets=compression.get("member_offsets", []),
+        )
+
+
+class DigestIndexBuilder:
+    """
+    Track the byte offsets of the chunks of a text digest as they are written, to build its index.
+
+    Chunks must be added in the order they are written, starting with the directory structure. Only the offsets of
+    file blocks are kept; token counts and hashes are read from the nodes when the index is built, so counters that
+    work in batches have time to store them. Offsets assume the digest is written without newline translation, as
+    `open_digest_writer` does.
+
+    Parameters
+    ----------
+    token_count_mode : str
+        Whether the token counts stored on the nodes are "exact" or "approximate", by default "exact".
+    """
+
+    def __init__(self, token_count_mode: str = "exact") -> None:
+        self.token_count_mode = token_count_mode
+        self._offset = 0
+        self._blocks: List[Tuple[FileSystemNode, int, int, int]] = []
+
+    def add(self, chunk: str, node: Optional[FileSystemNode] = None) -> None:
+        """
+        Advance past a chunk written to the digest.
+
+        Parameters
+        ----------
+        chunk : str
+            The text written.
+        node : FileSystemNode, optional
+            The file node the chunk is the content string of, if any.
+        """
+        length = _utf8_length(chunk)
+        if node is not None:
+            header_end = chunk.find(_HEADER_END, len(SEPARATOR))
+            header_length = _utf8_length(chunk[: header_end + len(_HEADER_END)]) if header_end >= 0 else 0
+            self._blocks.append((node, self._offset, length, header_length))
+        self._offset += length
+
+    def build(
+        self,
+        summary: str,
+        tree: str,
+        compression: Optional[str] = None,
+        member_offsets: Optional[List[int]] = None,
+        block_size: int = 0,
+    ) -> DigestIndex:
+        """
+        Build the index of the digest written so far.
+
+        Parameters
+        ----------
+        summary : str
+            The summary of the digest.
+        tree : str
+            The directory structure, written at the start of the digest.
+        compression : str, optional
+            The compression of the digest file, if any.
+        member_offsets : List[int], optional
+            The offsets of the gzip members of the digest file, as returned by `gzip_member_offsets`.
+        block_size : int
+            The number of decompressed bytes in each gzip member, required with `member_offsets`.
+
+        Returns
+        -------
+        DigestIndex
+            The index of the digest.
+        """
+        blocks = [
+            IndexedBlock(
+                path=node.path_str.replace(os.sep, "/"),
+                type=node.type.name,
+                offset=offset,
+                length=length,
+                content_offset=offset + header_length,
+                content_length=max(length - header_length - _BLOCK_END, 0),
+                token_count=node.token_count,
+                content_hash=node.content_hash,
+            )
+            for node, offset, length, header_length in self._blocks
+        ]
+        return DigestIndex(
+            summary=summary,
+            tree_offset=0,
+            tree_length=_utf8_length(tree),
+            blocks=blocks,
+            token_count_mode=self.token_count_mode,
+            compression=compression,
+            block_size=block_size if member_offsets else 0,
+            member_offsets=list(member_offsets or []),
+        )
+
+
+def index_path_for(digest_path: Union[str, Path]) -> Path:
+    """
+    Return the path of the index file of a digest: `repo.index.json` for `repo.txt` or `repo.txt.gz`.
+
+    Parameters
+    ----------
+    digest_path : Union[str, Path]
+        The path of the digest file.
+
+    Returns
+    -------
+    Path
+        The path of its index file, in the same directory.
+    """
+    path = Path(digest_path)
+    compression = compression_for_path(path)
+    name = path.name[: -len(COMPRESSION_SUFFIXES[compression])] if compression else path.name
+    if name.endswith(".txt"):
+        name = name[: -len(".txt")]
+    return path.with_name(name + INDEX_SUFFIX)
+
+
+def _utf8_length(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
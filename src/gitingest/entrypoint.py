@@ -2,13 +2,16 @@
 
 import asyncio
 import inspect
+import io
 import shutil
-from typing import Optional, Set, Tuple, Union
+from typing import Optional, Set, TextIO, Tuple, Union
 
 from gitingest.cloning import clone_repo
 from gitingest.config import TMP_BASE_PATH
-from gitingest.ingestion import ingest_query
+from gitingest.digest_container import CONTAINER_SUFFIX, container_to_text
+from gitingest.ingestion import ingest_query, ingest_query_to_container, ingest_query_to_file, stream_ingest_query
 from gitingest.query_parsing import IngestionQuery, parse_query
+from gitingest.utils.compression import open_digest_writer
 
 
 async def ingest_async(
@@ -18,6 +21,9 @@ async def ingest_async(
     exclude_patterns: Optional[Union[str, Set[str]]] = None,
     branch: Optional[str] = None,
     output: Optional[str] = None,
+    large_file_policy: str = "skip",
+    generated_file_policy: str = "keep",
+    token_count_mode: str = "exact",
 ) -> Tuple[str, str, str]:
     """
     Main entry point for ingesting a source and processing its contents.
@@ -41,6 +47,17 @@ async def ingest_async(
         The branch to clone and ingest. If `None`, the default branch is used.
     output : str, optional
         File path where the summary and content should be written. If `None`, the results are not written to a file.
+        Paths ending with `.gz` or `.zst` are compressed with gzip or zstd; paths ending with `.gidx` get an indexed
+        digest container (see `gitingest.digest_container`).
+    large_file_policy : str
+        What to do with files larger than `max_file_size`: "skip" them or "sample" their head and tail, by default
+        "skip".
+    generated_file_policy : str
+        What to do with files that look generated (bundles, codegen output, lockfiles): "keep" them, "sample" their
+        head and tail, or "skip" their content, by default "keep".
+    token_count_mode : str
+        How the summary counts tokens: "exact" encodes the digest, "approximate" estimates the count from character
+        statistics, which is much faster and reports an error bound, by default "exact".
 
     Returns
     -------
@@ -58,36 +75,31 @@ async def ingest_async(
     repo_cloned = False
 
     try:
-        query: IngestionQuery = await parse_query(
-            source=source,
-            max_file_size=max_file_size,
-            from_web=False,
-            include_patterns=include_patterns,
-            ignore_patterns=exclude_patterns,
+        query, repo_cloned = await _prepare_query(
+            source,
+            max_file_size,
+            include_patterns,
+            exclude_patterns,
+            branch,
+            large_file_policy,
+            generated_file_policy,
+            token_count_mode,
         )
 
-        if query.url:
-            selected_branch = branch if branch else query.branch  # prioritize branch argument
-            query.branch = selected_branch
-
-            clone_config = query.extract_clone_config()
-            clone_coroutine = clone_repo(clone_config)
-
-            if inspect.iscoroutine(clone_coroutine):
-                if asyncio.get_event_loop().is_running():
-                    await clone_coroutine
-                else:
-                    asyncio.run(clone_coroutine)
-            else:
-                raise TypeError("clone_repo did not return a coroutine as expected.")
-
-            repo_cloned = True
+        if output is not None and output.endswith(CONTAINER_SUFFIX):
+            # The container is written file by file; the returned content is read back from it
+            summary, tree = ingest_query_to_container(query, output)
+            digest = io.StringIO()
+            container_to_text(output, digest)
+            return summary, tree, digest.getvalue()[len(tree) + 1 :]
 
         summary, tree, content = ingest_query(query)
 
         if output is not None:
-            with open(output, "w", encoding="utf-8") as f:
-                f.write(tree + "\n" + content)
+            with open_digest_writer(output) as f:
+                f.write(tree)
+                f.write("\n")
+                f.write(content)
 
         return summary, tree, content
     finally:
@@ -96,6 +108,160 @@ async def ingest_async(
             shutil.rmtree(TMP_BASE_PATH, ignore_errors=True)
 
 
+async def ingest_to_file_async(
+    source: str,
+    output: Union[str, TextIO],
+    max_file_size: int = 10 * 1024 * 1024,  # 10 MB
+    include_patterns: Optional[Union[str, Set[str]]] = None,
+    exclude_patterns: Optional[Union[str, Set[str]]] = None,
+    branch: Optional[str] = None,
+    large_file_policy: str = "skip",
+    generated_file_policy: str = "keep",
+    token_count_mode: str = "exact",
+    write_index: bool = False,
+) -> str:
+    """
+    Ingest a source and stream its digest to a file, without holding the file contents in memory.
+
+    This function works like `ingest_async`, but writes the directory structure and the content of each file to
+    `output` as soon as it is produced. Memory use therefore does not grow with the size of the repository.
+
+    Parameters
+    ----------
+    source : str
+        The source to analyze, which can be a URL (for a Git repository) or a local directory path.
+    output : Union[str, TextIO]
+        The path of the file to write the digest to, or an open text stream (e.g. a socket wrapper). Paths ending with
+        `.gz` or `.zst` are compressed with gzip or zstd; paths ending with `.gidx` get an indexed digest container
+        (see `gitingest.digest_container`).
+    max_file_size : int
+        Maximum allowed file size for file ingestion. Files larger than this size are ignored, by default
+        10*1024*1024 (10 MB).
+    include_patterns : Union[str, Set[str]], optional
+        Pattern or set of patterns specifying which files to include. If `None`, all files are included.
+    exclude_patterns : Union[str, Set[str]], optional
+        Pattern or set of patterns specifying which files to exclude. If `None`, no files are excluded.
+    branch : str, optional
+        The branch to clone and ingest. If `None`, the default branch is used.
+    large_file_policy : str
+        What to do with files larger than `max_file_size`: "skip" them or "sample" their head and tail, by default
+        "skip".
+    generated_file_policy : str
+        What to do with files that look generated (bundles, codegen output, lockfiles): "keep" them, "sample" their
+        head and tail, or "skip" their content, by default "keep".
+    token_count_mode : str
+        How the summary counts tokens: "exact" encodes the digest, "approximate" estimates the count from character
+        statistics, which is much faster and reports an error bound, by default "exact".
+    write_index : bool
+        Whether to write the offset index of the digest next to it, as `<name>.index.json` (see
+        `gitingest.digest_index`), when `output` is the path of a text digest, by default False.
+
+    Returns
+    -------
+    str
+        The summary of the analyzed repository or directory.
+    """
+    repo_cloned = False
+
+    try:
+        query, repo_cloned = await _prepare_query(
+            source,
+            max_file_size,
+            include_patterns,
+            exclude_patterns,
+            branch,
+            large_file_policy,
+            generated_file_policy,
+            token_count_mode,
+        )
+
+        if isinstance(output, str) and output.endswith(CONTAINER_SUFFIX):
+            summary, _ = ingest_query_to_container(query, output)
+        elif isinstance(output, str):
+            summary, _ = ingest_query_to_file(query, output, write_index=write_index)
+        else:
+            summary, _ = stream_ingest_query(query, output)
+
+        return summary
+    finally:
+        # Clean up the temporary directory if it was created
+        if repo_cloned:
+            shutil.rmtree(TMP_BASE_PATH, ignore_errors=True)
+
+
+async def _prepare_query(
+    source: str,
+    max_file_size: int,
+    include_patterns: Optional[Union[str, Set[str]]],
+    exclude_patterns: Optional[Union[str, Set[str]]],
+    branch: Optional[str],
+    large_file_policy: str,
+    generated_file_policy: str,
+    token_count_mode: str = "exact",
+) -> Tuple[IngestionQuery, bool]:
+    """
+    Parse the source into a query and clone the repository it points to, if any.
+
+    Parameters
+    ----------
+    source : str
+        The source to analyze, which can be a URL (for a Git repository) or a local directory path.
+    max_file_size : int
+        Maximum allowed file size for file ingestion.
+    include_patterns : Union[str, Set[str]], optional
+        Pattern or set of patterns specifying which files to include.
+    exclude_patterns : Union[str, Set[str]], optional
+        Pattern or set of patterns specifying which files to exclude.
+    branch : str, optional
+        The branch to clone and ingest.
+    large_file_policy : str
+        What to do with files larger than `max_file_size`.
+    generated_file_policy : str
+        What to do with files that look generated.
+    token_count_mode : str
+        How the summary counts tokens.
+
+    Returns
+    -------
+    Tuple[IngestionQuery, bool]
+        The parsed query, and whether a repository was cloned to the temporary directory.
+
+    Raises
+    ------
+    TypeError
+        If `clone_repo` does not return a coroutine, or if the `source` is of an unsupported type.
+    """
+    query: IngestionQuery = await parse_query(
+        source=source,
+        max_file_size=max_file_size,
+        from_web=False,
+        include_patterns=include_patterns,
+        ignore_patterns=exclude_patterns,
+    )
+    query.large_file_policy = large_file_policy
+    query.generated_file_policy = generated_file_policy
+    query.token_count_mode = token_count_mode
+
+    if not query.url:
+        return query, False
+
+    selected_branch = branch if branch else query.branch  # prioritize branch argument
+    query.branch = selected_branch
+
+    clone_config = query.extract_clone_config()
+    clone_coroutine = clone_repo(clone_config)
+
+    if inspect.iscoroutine(clone_coroutine):
+        if asyncio.get_event_loop().is_running():
+            await clone_coroutine
+        else:
+            asyncio.run(clone_coroutine)
+    else:
+        raise TypeError("clone_repo did not return a coroutine as expected.")
+
+    return query, True
+
+
 def ingest(
     source: str,
     max_file_size: int = 10 * 1024 * 1024,  # 10 MB
@@ -103,6 +269,9 @@ def ingest(
     exclude_patterns: Optional[Union[str, Set[str]]] = None,
     branch: Optional[str] = None,
     output: Optional[str] = None,
+    large_file_policy: str = "skip",
+    generated_file_policy: str = "keep",
+    token_count_mode: str = "exact",
 ) -> Tuple[str, str, str]:
     """
     Synchronous version of ingest_async.
@@ -126,6 +295,17 @@ def ingest(
         The branch to clone and ingest. If `None`, the default branch is used.
     output : str, optional
         File path where the summary and content should be written. If `None`, the results are not written to a file.
+        Paths ending with `.gz` or `.zst` are compressed with gzip or zstd; paths ending with `.gidx` get an indexed
+        digest container (see `gitingest.digest_container`).
+    large_file_policy : str
+        What to do with files larger than `max_file_size`: "skip" them or "sample" their head and tail, by default
+        "skip".
+    generated_file_policy : str
+        What to do with files that look generated (bundles, codegen output, lockfiles): "keep" them, "sample" their
+        head and tail, or "skip" their content, by default "keep".
+    token_count_mode : str
+        How the summary counts tokens: "exact" encodes the digest, "approximate" estimates the count from character
+        statistics, which is much faster and reports an error bound, by default "exact".
 
     Returns
     -------
@@ -147,5 +327,76 @@ def ingest(
             exclude_patterns=exclude_patterns,
             branch=branch,
             output=output,
+            large_file_policy=large_file_policy,
+            generated_file_policy=generated_file_policy,
+            token_count_mode=token_count_mode,
+        )
+    )
+
+
+def ingest_to_file(
+    source: str,
+    output: Union[str, TextIO],
+    max_file_size: int = 10 * 1024 * 1024,  # 10 MB
+    include_patterns: Optional[Union[str, Set[str]]] = None,
+    exclude_patterns: Optional[Union[str, Set[str]]] = None,
+    branch: Optional[str] = None,
+    large_file_policy: str = "skip",
+    generated_file_policy: str = "keep",
+    token_count_mode: str = "exact",
+    write_index: bool = False,
+) -> str:
+    """
+    Synchronous version of ingest_to_file_async.
+
+    Parameters
+    ----------
+    source : str
+        The source to analyze, which can be a URL (for a Git repository) or a local directory path.
+    output : Union[str, TextIO]
+        The path of the file to write the digest to, or an open text stream (e.g. a socket wrapper). Paths ending with
+        `.gz` or `.zst` are compressed with gzip or zstd; paths ending with `.gidx` get an indexed digest container
+        (see `gitingest.digest_container`).
+    max_file_size : int
+        Maximum allowed file size for file ingestion. Files larger than this size are ignored, by default
+        10*1024*1024 (10 MB).
+    include_patterns : Union[str, Set[str]], optional
+        Pattern or set of patterns specifying which files to include. If `None`, all files are included.
+    exclude_patterns : Union[str, Set[str]], optional
+        Pattern or set of patterns specifying which files to exclude. If `None`, no files are excluded.
+    branch : str, optional
+        The branch to clone and ingest. If `None`, the default branch is used.
+    large_file_policy : str
+        What to do with files larger than `max_file_size`: "skip" them or "sample" their head and tail, by default
+        "skip".
+    generated_file_policy : str
+        What to do with files that look generated: "keep" them, "sample" their head and tail, or "skip" their
+        content, by default "keep".
+    token_count_mode : str
+        How the summary counts tokens: "exact" or "approximate", by default "exact".
+    write_index : bool
+        Whether to write the offset index of the digest next to it, by default False.
+
+    Returns
+    -------
+    str
+        The summary of the analyzed repository or directory.
+
+    See Also
+    --------
+    ingest_to_file_async : The asynchronous version of this function.
+    """
+    return asyncio.run(
+        ingest_to_file_async(
+            source=source,
+            output=output,
+            max_file_size=max_file_size,
+            include_patterns=include_patterns,
+            exclude_patterns=exclude_patterns,
+            branch=branch,
+            large_file_policy=large_file_policy,
+            generated_file_policy=generated_file_policy,
+            token_count_mode=token_count_mode,
+            write_index=write_index,
         )
     )
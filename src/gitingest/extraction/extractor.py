@@ -1,9 +1,9 @@
 """Extraction intelligente du contexte de dépôt pour l'optimisation LLM."""
 
+import io
 import os
 from pathlib import Path
-from typing import List, Optional
-from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from tqdm import tqdm
 import time
 
@@ -11,10 +11,71 @@ from gitingest.schemas.filesystem_schema import FileSystemNode, FileSystemNodeTy
 from gitingest.classification.classifier import classify_file, determine_importance, should_include_file
 from gitingest.schemas import FileNode, RepoContext, FileType, FileImportance
 from gitingest.config.model_config import LLMModelConfig
-from gitingest.utils.tokens import count_tokens, truncate_content
+from gitingest.config import (
+    BUDGET_FILE_OVERHEAD_TOKENS,
+    BUDGET_MIN_TRUNCATED_TOKENS,
+    LARGE_FILE_SAMPLE_HEAD,
+    LARGE_FILE_SAMPLE_TAIL,
+    PROGRESS_MIN_INTERVAL,
+    TOKENIZER_PROCESSES,
+)
+from gitingest.extraction.reader import AdaptiveReader
+from gitingest.extraction.tokenizer_pool import TokenizerPool
+from gitingest.utils.file_utils import MAGIC_NUMBER_SIZE, has_binary_extension, has_binary_magic, load_file_sample
+from gitingest.utils.generated_utils import detect_generated_file
+from gitingest.utils.tokens import (
+    DEFAULT_ENCODING,
+    approximate_tokens,
+    count_tokens,
+    estimate_tokens_from_size,
+    language_for_path,
+    truncate_content,
+)
 from gitingest.utils.exceptions import UnreadableFileError, BinaryFileIgnored
 from gitingest.utils.logging_utils import logger
 
+# Priorisation : config > doc > source > test > data > script > notebook > other
+_TYPE_PRIORITY = {
+    FileType.CONFIG: 0,
+    FileType.DOCUMENTATION: 1,
+    FileType.SOURCE: 2,
+    FileType.TEST: 3,
+    FileType.DATA: 4,
+    FileType.SCRIPT: 5,
+    FileType.NOTEBOOK: 6,
+    FileType.OTHER: 7,
+}
+# Poids de l'importance d'un fichier dans sa valeur, pour la sélection sous budget de tokens
+_IMPORTANCE_WEIGHTS = {FileImportance.HIGH: 4.0, FileImportance.MEDIUM: 2.0, FileImportance.LOW: 1.0}
+
+
+class _ReadResult(NamedTuple):
+    """
+    Résultat de la lecture d'un fichier retenu.
+
+    Attributs
+    ----------
+    file : FileNode
+        Le fichier lu.
+    content : str, optional
+        Contenu lu (éventuellement tronqué), `None` si le fichier est ignoré ou illisible.
+    tokens : int, optional
+        Nombre de tokens du contenu, `None` s'il reste à compter (par un `TokenizerPool`).
+    truncated : bool
+        Si le contenu a été tronqué ou échantillonné.
+    skipped : str, optional
+        Raison pour laquelle le fichier est ignoré (binaire, généré), le cas échéant.
+    error : str, optional
+        Erreur de lecture, le cas échéant.
+    """
+
+    file: FileNode
+    content: Optional[str] = None
+    tokens: Optional[int] = None
+    truncated: bool = False
+    skipped: Optional[str] = None
+    error: Optional[str] = None
+
 
 def _gather_files(node: FileSystemNode, model_config: LLMModelConfig) -> List[FileNode]:
     """
@@ -52,16 +113,172 @@ def _gather_files(node: FileSystemNode, model_config: LLMModelConfig) -> List[Fi
     return files
 
 
+def _file_value(file: FileNode) -> float:
+    """
+    Valeur d'un fichier pour la sélection sous budget : elle croît avec la priorité de son type et son importance.
+
+    Paramètres
+    ----------
+    file : FileNode
+        Fichier à évaluer.
+
+    Retourne
+    -------
+    float
+        Valeur du fichier (strictement positive).
+    """
+    rank = len(_TYPE_PRIORITY) - _TYPE_PRIORITY.get(file.file_type, len(_TYPE_PRIORITY) - 1)
+    return rank * _IMPORTANCE_WEIGHTS.get(file.importance, 1.0)
+
+
+def select_files_for_budget(
+    files: List[FileNode],
+    estimates: Dict[str, int],
+    budget: int,
+) -> Tuple[List[Tuple[FileNode, Optional[int]]], List[FileNode]]:
+    """
+    Choisit les fichiers qui tiennent dans un budget de tokens, avant toute lecture.
+
+    Sélection gloutonne du sac à dos : les fichiers sont pris par densité décroissante (valeur par token, en-tête
+    compris) tant qu'ils tiennent dans le budget restant. Le plus dense des fichiers écartés est ensuite tronqué
+    pour occuper le reste du budget, s'il en reste au moins `BUDGET_MIN_TRUNCATED_TOKENS`.
+
+    Paramètres
+    ----------
+    files : List[FileNode]
+        Fichiers candidats, dans l'ordre de sortie souhaité.
+    estimates : Dict[str, int]
+        Nombre de tokens estimé du contenu de chaque fichier, par chemin.
+    budget : int
+        Nombre maximal de tokens pour l'ensemble des fichiers.
+
+    Retourne
+    -------
+    Tuple[List[Tuple[FileNode, Optional[int]]], List[FileNode]]
+        Les fichiers retenus, dans l'ordre de `files`, chacun avec sa limite de tokens (`None` s'il est lu en
+        entier), et les fichiers écartés.
+    """
+    costs = {file.path: estimates[file.path] + BUDGET_FILE_OVERHEAD_TOKENS for file in files}
+    by_density = sorted(files, key=lambda file: _file_value(file) / max(costs[file.path], 1), reverse=True)
+
+    remaining = budget
+    limits: Dict[str, Optional[int]] = {}
+    left_out: List[FileNode] = []
+    for file in by_density:
+        if costs[file.path] <= remaining:
+            limits[file.path] = None
+            remaining -= costs[file.path]
+        else:
+            left_out.append(file)
+
+    if left_out and remaining - BUDGET_FILE_OVERHEAD_TOKENS >= BUDGET_MIN_TRUNCATED_TOKENS:
+        marginal = left_out.pop(0)
+        limits[marginal.path] = remaining - BUDGET_FILE_OVERHEAD_TOKENS
+
+    selected = [(file, limits[file.path]) for file in files if file.path in limits]
+    return selected, left_out
+
+
+class _TokenMeter:
+    """
+    Compte et tronque les contenus lus avec l'encodage du modèle.
+
+    Si l'encodage ne peut pas être chargé (fichier BPE absent et pas d'accès réseau), les comptes sont approchés
+    par `approximate_tokens` et les troncatures faites au prorata des caractères, pour le reste de l'extraction.
+    """
+
+    def __init__(self, encoding_name: str) -> None:
+        self.encoding_name = encoding_name
+        self.exact = True
+
+    def count(self, text: str, path: str) -> int:
+        if self.exact:
+            try:
+                return count_tokens(text, encoding_name=self.encoding_name)
+            except (ValueError, OSError, UnicodeEncodeError):
+                self.exact = False
+        return approximate_tokens(text, language_for_path(path), self.encoding_name).tokens
+
+    def truncate(self, text: str, max_tokens: int, path: str) -> str:
+        if self.exact:
+            try:
+                return truncate_content(text, max_tokens, encoding_name=self.encoding_name)
+            except (ValueError, OSError, UnicodeEncodeError):
+                self.exact = False
+        tokens = self.count(text, path)
+        return text if tokens <= max_tokens else text[: len(text) * max_tokens // tokens]
+
+
+def _fit_to_budget(
+    results: List[Tuple[FileNode, int]],
+    budget: int,
+    meter: _TokenMeter,
+) -> Tuple[List[Tuple[FileNode, int]], List[FileNode]]:
+    """
+    Ramène les fichiers lus dans le budget, quand leur nombre réel de tokens dépasse l'estimation.
+
+    Le fichier le moins dense est tronqué de l'excédent, ou écarté s'il lui resterait moins de
+    `BUDGET_MIN_TRUNCATED_TOKENS` tokens, jusqu'à ce que le total tienne dans le budget.
+
+    Paramètres
+    ----------
+    results : List[Tuple[FileNode, int]]
+        Fichiers lus (contenu dans `extra["content"]`) avec leur nombre de tokens.
+    budget : int
+        Nombre maximal de tokens pour l'ensemble des fichiers.
+    meter : _TokenMeter
+        Compteur utilisé pour tronquer et recompter les contenus.
+
+    Retourne
+    -------
+    Tuple[List[Tuple[FileNode, int]], List[FileNode]]
+        Les fichiers conservés avec leur nombre de tokens, et les fichiers écartés.
+    """
+    tokens = {file.path: count for file, count in results}
+    dropped: List[FileNode] = []
+    total = sum(tokens.values()) + BUDGET_FILE_OVERHEAD_TOKENS * len(tokens)
+    while total > budget and tokens:
+        victim = min(
+            (file for file, _ in results if file.path in tokens),
+            key=lambda file: _file_value(file) / max(tokens[file.path] + BUDGET_FILE_OVERHEAD_TOKENS, 1),
+        )
+        keep = tokens[victim.path] - (total - budget)
+        if keep >= BUDGET_MIN_TRUNCATED_TOKENS:
+            victim.extra["content"] = meter.truncate(victim.extra["content"], keep, victim.path)
+            victim.extra["truncated"] = True
+            count = min(meter.count(victim.extra["content"], victim.path), keep)
+            total -= tokens[victim.path] - count
+            tokens[victim.path] = count
+        else:
+            total -= tokens.pop(victim.path) + BUDGET_FILE_OVERHEAD_TOKENS
+            dropped.append(victim)
+    return [(file, tokens[file.path]) for file, _ in results if file.path in tokens], dropped
+
+
 def extract_repo_context(
     root_node: FileSystemNode,
     model_config: LLMModelConfig,
     repo_name: Optional[str] = None,
     branch: Optional[str] = None,
     commit: Optional[str] = None,
+    generated_file_policy: str = "keep",
+    token_budget: Optional[int] = None,
+    show_progress: bool = True,
+    tokenizer_processes: Optional[int] = None,
 ) -> RepoContext:
     """
     Extrait un contexte pertinent du dépôt en priorisant les fichiers importants et en respectant la limite de tokens.
 
+    Les fichiers sont choisis avant d'être lus, sur une estimation de leurs tokens tirée de leur taille (voir
+    `select_files_for_budget`) : les fichiers qui ne peuvent pas tenir dans le budget ne sont ni lus ni encodés.
+    Les fichiers retenus sont ensuite comptés exactement, et le total ramené dans le budget si l'estimation était
+    trop basse.
+
+    Les fichiers sont lus par un `AdaptiveReader`, dont la concurrence suit la latence des lectures, et leurs
+    résultats consommés dans l'ordre de priorité. Les fichiers ignorés et les erreurs sont détaillés dans le
+    journal (niveau debug) et résumés en une ligne en fin de lecture. Avec `tokenizer_processes`, les contenus lus
+    sont comptés (et le fichier marginal tronqué) par un `TokenizerPool`, pendant la lecture des fichiers suivants.
+
     Paramètres
     ----------
     root_node : FileSystemNode
@@ -74,6 +291,16 @@ def extract_repo_context(
         Branche analysée.
     commit : str, optional
         Commit analysé.
+    generated_file_policy : str
+        Traitement des fichiers détectés comme générés (bundles, code généré, lockfiles) : "keep" les garde,
+        "sample" n'en lit que le début et la fin, "skip" les écarte. Par défaut "keep".
+    token_budget : int, optional
+        Nombre maximal de tokens du contenu extrait ; par défaut `model_config.max_tokens`, 0 pour ne pas limiter.
+    show_progress : bool
+        Afficher une barre de progression pendant la lecture, par défaut True.
+    tokenizer_processes : int, optional
+        Nombre de processus comptant les tokens des contenus lus ; par défaut `TOKENIZER_PROCESSES`, 0 pour compter
+        dans les threads de lecture.
 
     Retourne
     -------
@@ -81,64 +308,158 @@ def extract_repo_context(
         Contexte extrait, prêt à être utilisé pour l'optimisation LLM.
     """
     files = _gather_files(root_node, model_config)
-    # Priorisation : config > doc > source > test > data > script > notebook > other
-    priority = {
-        FileType.CONFIG: 0,
-        FileType.DOCUMENTATION: 1,
-        FileType.SOURCE: 2,
-        FileType.TEST: 3,
-        FileType.DATA: 4,
-        FileType.SCRIPT: 5,
-        FileType.NOTEBOOK: 6,
-        FileType.OTHER: 7,
-    }
-    files.sort(key=lambda f: (priority.get(f.file_type, 99), f.importance.value, -f.size))
-
-    def _read_file_content(file):
+    files.sort(key=lambda f: (_TYPE_PRIORITY.get(f.file_type, 99), f.importance.value, -f.size))
+    encoding_name = model_config.encoding_name or DEFAULT_ENCODING
+    budget = model_config.max_tokens if token_budget is None else token_budget
+    meter = _TokenMeter(encoding_name)
+    if tokenizer_processes is None:
+        tokenizer_processes = TOKENIZER_PROCESSES
+
+    errors = []
+    candidates = []
+    for file in files:
         # Exclure les fichiers trop gros
         if model_config.max_file_size and file.size > model_config.max_file_size:
-            return None, None, f"Fichier trop gros ({file.size} > {model_config.max_file_size})"
+            info = f"Fichier trop gros ({file.size} > {model_config.max_file_size})"
+        # Les binaires connus sont écartés sur leur extension, sans lecture
+        elif has_binary_extension(Path(file.path)):
+            info = f"Fichier binaire ({file.path})"
+        else:
+            candidates.append(file)
+            continue
+        logger.debug(f"[IGNORÉ] {info}")
+        errors.append((None, info))
+
+    budget_skipped: List[FileNode] = []
+    if budget:
+        estimates = {
+            file.path: estimate_tokens_from_size(file.size, language_for_path(file.path), encoding_name).tokens
+            for file in candidates
+        }
+        selected, budget_skipped = select_files_for_budget(candidates, estimates, budget)
+    else:
+        selected = [(file, None) for file in candidates]
+
+    def _read_file_content(item):
+        file, max_tokens = item
+        # Les fichiers générés sont repérés sur leurs premiers Ko, avant la lecture complète
+        if generated_file_policy != "keep":
+            reason = detect_generated_file(Path(file.path))
+            if reason and generated_file_policy == "skip":
+                return _ReadResult(file, skipped=f"Fichier généré ({file.path} : {reason})")
+            if reason:
+                sample = load_file_sample(Path(file.path), LARGE_FILE_SAMPLE_HEAD, LARGE_FILE_SAMPLE_TAIL)
+                if not sample.is_text:
+                    return _ReadResult(file, skipped=f"Fichier binaire ({file.path})")
+                return _fit_file(file, sample.text, sample.sampled, max_tokens)
         try:
-            with open(file.path, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
+            with open(file.path, 'rb') as raw:
+                # Les binaires sans extension connue sont repérés sur leur signature (lecture de 16 octets)
+                if has_binary_magic(raw.read(MAGIC_NUMBER_SIZE)):
+                    return _ReadResult(file, skipped=f"Fichier binaire ({file.path})")
+                raw.seek(0)
+                content = io.TextIOWrapper(raw, encoding='utf-8', errors='replace').read()
             truncated = False
             if model_config.max_file_size and len(content.encode('utf-8')) > model_config.max_file_size:
-                content = truncate_content(content, model_config.max_file_size)
+                # max_file_size est une taille en octets : la coupe se fait en octets, sans encoder le texte
+                content = truncate_content(content, model_config.max_file_size, unit="bytes")
                 truncated = True
-            return file, content, truncated
+            return _fit_file(file, content, truncated, max_tokens)
         except Exception as e:
-            return file, None, str(e)
+            return _ReadResult(file, error=str(e))
+
+    def _fit_file(file, content, truncated, max_tokens):
+        # Le fichier marginal est tronqué à la part du budget qui lui revient ; chaque contenu est compté ici, en
+        # parallèle, pour vérifier le budget sans réencoder. Avec un pool, il est fait dans ses processus
+        if pool is not None:
+            return _ReadResult(file, content, truncated=truncated)
+        tokens, cut = _measure_locally(file, content, max_tokens)
+        if cut is not None:
+            content, truncated = content[:cut], True
+        return _ReadResult(file, content, tokens, truncated)
+
+    def _measure_locally(file, content, max_tokens):
+        kept = content if max_tokens is None else meter.truncate(content, max_tokens, file.path)
+        return meter.count(kept, file.path), (len(kept) if kept != content else None)
 
-    errors = []
     results = []
+    pool = None
+    if tokenizer_processes > 0:
+        try:
+            # Les contenus sont soumis au pool sous leur rang dans `results`
+            pool = TokenizerPool(
+                encoding_name,
+                tokenizer_processes,
+                fallback=lambda i, content, max_tokens: _measure_locally(results[i][0], content, max_tokens),
+            )
+        except (ValueError, OSError) as e:
+            # Encodeur indisponible : le comptage approché de `_TokenMeter` se fait dans les threads de lecture
+            logger.debug(f"Pool de tokenisation désactivé : {e}")
+
     start = time.time()
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        with tqdm(total=len(files), desc="Lecture des fichiers", miniters=1, mininterval=0, leave=True) as pbar:
-            for result in executor.map(_read_file_content, files):
-                file, content, info = result if isinstance(result, tuple) and len(result) == 3 else (None, None, None)
-                if file is None:
-                    # Fichier trop gros ou erreur
-                    if content is None and info:
-                        tqdm.write(f"[IGNORÉ] {info}")
-                        errors.append((None, info))
-                    pbar.update(1)
-                    continue
-                if isinstance(info, str):
-                    tqdm.write(f"[ERREUR] {getattr(file, 'path', file)}: {info}")
-                    errors.append((getattr(file, 'path', file), info))
+    reader = AdaptiveReader()
+    try:
+        with tqdm(
+            total=len(selected),
+            desc="Lecture des fichiers",
+            unit="fichier",
+            mininterval=PROGRESS_MIN_INTERVAL,
+            disable=not show_progress,
+            leave=True,
+        ) as pbar:
+            for (_, max_tokens), read in zip(selected, reader.map(_read_file_content, selected)):
+                file = read.file
+                if read.skipped is not None:
+                    logger.debug(f"[IGNORÉ] {read.skipped}")
+                    errors.append((None, read.skipped))
+                elif read.error is not None:
+                    logger.debug(f"[ERREUR] {file.path}: {read.error}")
+                    errors.append((file.path, read.error))
                 else:
                     file.extra = getattr(file, "extra", {}) or {}
-                    file.extra["content"] = content
-                    if info:
+                    file.extra["content"] = read.content
+                    if read.truncated:
                         file.extra["truncated"] = True
-                    results.append(file)
-                pbar.update(1)
+                    if pool is not None:
+                        pool.submit(len(results), read.content, max_tokens)
+                    results.append((file, read.tokens))
+                pbar.update()
+        if pool is not None:
+            # Les contenus sont envoyés au pool pendant la lecture : seules les dernières mesures restent à attendre
+            for i, tokens, cut in pool.results():
+                file = results[i][0]
+                if cut is not None:
+                    file.extra["content"] = file.extra["content"][:cut]
+                    file.extra["truncated"] = True
+                results[i] = (file, tokens)
+    finally:
+        if pool is not None:
+            pool.close()
+
+    if budget:
+        results, dropped = _fit_to_budget(results, budget, meter)
+        budget_skipped.extend(dropped)
+    total_tokens = sum(tokens for _, tokens in results) + BUDGET_FILE_OVERHEAD_TOKENS * len(results)
     elapsed = time.time() - start
-    tqdm.write(f"Lecture terminée en {elapsed:.2f}s, {len(errors)} erreurs.")
+    ignored = sum(1 for path, _ in errors if path is None)
+    tqdm.write(
+        f"Lecture terminée en {elapsed:.2f}s : {len(results)} fichiers lus, {ignored} ignorés, "
+        f"{len(errors) - ignored} erreurs (jusqu'à {reader.peak_limit} lectures simultanées)."
+    )
+    if budget_skipped:
+        tqdm.write(f"{len(budget_skipped)} fichiers écartés pour respecter le budget de {budget} tokens.")
     return RepoContext(
-        files=results,
+        files=[file for file, _ in results],
         repo_name=repo_name,
         branch=branch,
         commit=commit,
-        extra={"read_errors": errors, "read_time": elapsed}
-    ) 
\ No newline at end of file
+        extra={
+            "read_errors": errors,
+            "read_time": elapsed,
+            "read_concurrency": reader.peak_limit,
+            "tokenizer_processes": pool.processes if pool is not None else 0,
+            "total_tokens": total_tokens,
+            "token_budget": budget or None,
+            "budget_skipped": [file.path for file in budget_skipped],
+        }
+    )
@@ -0,0 +1,146 @@
+"""Lecture concurrente des fichiers en flux ordonné et borné, la concurrence suivant la latence observée."""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, TypeVar
+
+from gitingest.config import READER_ADJUST_INTERVAL, READER_MAX_WORKERS, READER_MIN_WORKERS
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_MIN_CPU_TIME = 1e-5  # Plancher du temps CPU d'une lecture, pour une attente d'E/S mesurée sur un temps CPU nul
+_MIN_SPEEDUP = 1.1  # Gain de débit minimal pour garder une hausse de la limite
+
+
+class AdaptiveReader:
+    """
+    Applique une fonction de lecture à des éléments sur un pool de threads, en rendant les résultats dans l'ordre.
+
+    Au plus `limit` lectures sont en cours à la fois, ce qui borne aussi le nombre de résultats gardés en attente du
+    consommateur. La limite est recalculée toutes les `adjust_interval` lectures (et au moins deux fois `limit`) à
+    partir de la part d'attente dans leur durée (temps écoulé moins temps CPU du thread) :
+    `min_workers * (1 + attente / CPU)`, bornée à `max_workers`. Sur un disque local, où les lectures sont surtout
+    du calcul (décodage, comptage des tokens), la limite reste proche de `min_workers` ; sur un système de fichiers
+    réseau, où elles attendent surtout, elle monte pour recouvrir la latence. L'attente mesurée comprend aussi celle
+    du GIL : une hausse de la limite qui n'améliore pas le débit (lectures par seconde) est donc annulée, et la
+    limite plafonnée à sa valeur précédente.
+
+    Paramètres
+    ----------
+    min_workers : int
+        Nombre minimal (et initial) de lectures simultanées, par défaut `READER_MIN_WORKERS`.
+    max_workers : int
+        Nombre maximal de lectures simultanées, par défaut `READER_MAX_WORKERS`.
+    adjust_interval : int
+        Nombre minimal de lectures entre deux ajustements de la limite, par défaut `READER_ADJUST_INTERVAL`.
+
+    Attributs
+    ----------
+    limit : int
+        Nombre de lectures simultanées autorisées actuellement.
+    peak_limit : int
+        Plus grande limite atteinte.
+    io_wait_ratio : float
+        Rapport attente / CPU mesuré sur le dernier intervalle d'ajustement.
+    """
+
+    def __init__(
+        self,
+        min_workers: int = READER_MIN_WORKERS,
+        max_workers: int = READER_MAX_WORKERS,
+        adjust_interval: int = READER_ADJUST_INTERVAL,
+    ) -> None:
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.adjust_interval = max(1, adjust_interval)
+        self.limit = self.min_workers
+        self.peak_limit = self.limit
+        self.io_wait_ratio = 0.0
+        self._lock = threading.Lock()
+        self._samples = 0
+        self._wait = 0.0
+        self._cpu = 0.0
+        self._ceiling = self.max_workers
+        self._interval_start = time.perf_counter()
+        self._previous = (self.limit, 0.0)  # Limite et débit de l'intervalle précédent
+
+    def map(self, func: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+        """
+        Lit les éléments en parallèle et produit les résultats dans l'ordre des éléments.
+
+        Les éléments sont consommés au fur et à mesure ; les lectures pas encore commencées sont annulées si le
+        consommateur s'arrête en route.
+
+        Paramètres
+        ----------
+        func : Callable[[T], R]
+            Fonction de lecture, appelée dans un thread du pool.
+        items : Iterable[T]
+            Éléments à lire.
+
+        Retourne
+        -------
+        Iterator[R]
+            Les résultats de `func`, dans l'ordre de `items`.
+        """
+        items = iter(items)
+        pending: Deque[Future] = deque()
+        with self._lock:
+            self._samples, self._wait, self._cpu, self._interval_start = 0, 0.0, 0.0, time.perf_counter()
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gitingest-read") as executor:
+            try:
+                while True:
+                    while not exhausted and len(pending) < self.limit:
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            exhausted = True
+                            break
+                        pending.append(executor.submit(self._timed, func, item))
+                    if not pending:
+                        return
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _timed(self, func: Callable[[T], R], item: T) -> R:
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            return func(item)
+        finally:
+            self._record(time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def _record(self, wall: float, cpu: float) -> None:
+        """Ajoute la mesure d'une lecture, et recalcule la limite à la fin de chaque intervalle d'ajustement."""
+        with self._lock:
+            self._samples += 1
+            self._wait += max(wall - cpu, 0.0)
+            self._cpu += cpu
+            # Un intervalle couvre au moins deux vagues de lectures, pour que le débit mesuré soit stable
+            if self._samples < max(self.adjust_interval, 2 * self.limit):
+                return
+
+            now = time.perf_counter()
+            throughput = self._samples / max(now - self._interval_start, 1e-9)
+            previous_limit, previous_throughput = self._previous
+            self._previous = (self.limit, throughput)
+            self.io_wait_ratio = self._wait / max(self._cpu, _MIN_CPU_TIME * self._samples)
+            self._samples, self._wait, self._cpu, self._interval_start = 0, 0.0, 0.0, now
+
+            if self.limit > previous_limit and throughput < previous_throughput * _MIN_SPEEDUP:
+                # Plus de lectures simultanées sans gain de débit : l'attente venait du GIL ou du disque saturé
+                self._ceiling = previous_limit
+                self.limit = previous_limit
+                self._previous = (self.limit, previous_throughput)
+                return
+
+            target = round(self.min_workers * (1 + self.io_wait_ratio))
+            # La limite au plus double ou diminue de moitié à chaque ajustement, pour amortir les mesures isolées
+            target = max(self.limit // 2, min(target, self.limit * 2))
+            self.limit = max(self.min_workers, min(target, self._ceiling))
+            self.peak_limit = max(self.peak_limit, self.limit)
@@ -0,0 +1,164 @@
+"""Comptage et troncature des contenus extraits dans un pool de processus, chacun avec son encodeur déjà chargé."""
+
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Callable, Hashable, Iterator, List, Optional, Tuple
+
+from gitingest.config import TOKEN_BATCH_FILES, TOKENIZER_POOL_BATCH_CHARS, TOKENIZER_PROCESSES
+from gitingest.utils import token_cache, tokens
+from gitingest.utils.tokens import DEFAULT_ENCODING, count_tokens, get_encoding, truncate_content
+
+if TYPE_CHECKING:
+    from tiktoken import Encoding
+
+# Mesure d'un contenu : nombre de tokens et position de coupe (en caractères), `None` si le contenu est gardé entier
+Measure = Tuple[int, Optional[int]]
+
+_worker_encoding_name = DEFAULT_ENCODING
+
+
+class TokenizerPool:
+    """
+    Compte les tokens des contenus soumis, et tronque ceux qui ont une limite, dans des processus séparés.
+
+    L'encodage tiktoken libère le GIL, mais la préparation des textes et le découpage par expression régulière se
+    font sous le GIL : dans le processus principal, ils se disputent le GIL avec la lecture des fichiers. Ici, chaque
+    processus charge l'encodeur une fois, à son démarrage, puis reçoit des lots de textes par les tubes du pool et
+    renvoie pour chacun son nombre de tokens et sa position de coupe. Les processus sont démarrés par "spawn", sans
+    hériter des threads de lecture en cours ; un encodeur qui n'est pas celui d'un nom enregistré dans tiktoken (par
+    exemple un encodeur construit localement) leur est transmis avec ses rangs BPE.
+
+    Un lot dont le traitement échoue (processus arrêté, encodeur introuvable) est mesuré par `fallback` dans le
+    processus principal.
+
+    Paramètres
+    ----------
+    encoding_name : str
+        Nom de l'encodage tiktoken, par défaut cl100k_base.
+    processes : int
+        Nombre de processus, par défaut `TOKENIZER_PROCESSES`.
+    batch_chars : int
+        Taille (caractères) à partir de laquelle un lot est envoyé, par défaut `TOKENIZER_POOL_BATCH_CHARS`.
+    fallback : Callable[[Hashable, str, Optional[int]], Measure], optional
+        Mesure d'un contenu dans le processus principal, à partir de sa clé, de son texte et de sa limite ; par
+        défaut `count_tokens` et `truncate_content` avec le même encodage.
+
+    Lève
+    ------
+    ValueError
+        Si l'encodage ne peut pas être chargé dans le processus principal.
+    """
+
+    def __init__(
+        self,
+        encoding_name: str = DEFAULT_ENCODING,
+        processes: int = TOKENIZER_PROCESSES,
+        batch_chars: int = TOKENIZER_POOL_BATCH_CHARS,
+        fallback: Optional[Callable[[Hashable, str, Optional[int]], Measure]] = None,
+    ) -> None:
+        import tiktoken.registry  # pylint: disable=import-outside-toplevel
+
+        # L'encodeur est chargé ici d'abord : le fichier BPE est mis en cache une fois pour tous les processus
+        encoding = get_encoding(encoding_name)
+        shipped = None if tiktoken.registry.ENCODINGS.get(encoding_name) is encoding else encoding
+        self.encoding_name = encoding_name
+        self.processes = max(1, processes)
+        self.batch_chars = max(1, batch_chars)
+        self._fallback = fallback or (lambda key, text, max_tokens: _measure(text, max_tokens, encoding_name))
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(encoding_name, shipped, token_cache.get_token_cache() is not None),
+        )
+        self._keys: List[Hashable] = []
+        self._items: List[Tuple[str, Optional[int]]] = []
+        self._chars = 0
+        self._sent: List[Tuple[Future, List[Hashable], List[Tuple[str, Optional[int]]]]] = []
+
+    def submit(self, key: Hashable, text: str, max_tokens: Optional[int] = None) -> None:
+        """
+        Ajoute un contenu au lot en cours, envoyé à un processus dès qu'il est assez gros.
+
+        Paramètres
+        ----------
+        key : Hashable
+            Clé rendue avec la mesure du contenu.
+        text : str
+            Le contenu.
+        max_tokens : int, optional
+            Nombre maximal de tokens à garder ; `None` pour compter le contenu sans le tronquer.
+        """
+        self._keys.append(key)
+        self._items.append((text, max_tokens))
+        self._chars += len(text)
+        if self._chars >= self.batch_chars or len(self._items) >= TOKEN_BATCH_FILES:
+            self._send()
+
+    def results(self) -> Iterator[Tuple[Hashable, int, Optional[int]]]:
+        """
+        Envoie le dernier lot, puis produit les mesures de tous les contenus soumis, dans l'ordre de soumission.
+
+        Retourne
+        -------
+        Iterator[Tuple[Hashable, int, Optional[int]]]
+            Pour chaque contenu, sa clé, son nombre de tokens (après troncature) et la position (en caractères) où
+            le couper, `None` s'il est gardé entier.
+        """
+        self._send()
+        sent, self._sent = self._sent, []
+        for future, keys, items in sent:
+            try:
+                measures = future.result()
+            except Exception:  # pylint: disable=broad-except
+                measures = [self._fallback(key, text, max_tokens) for key, (text, max_tokens) in zip(keys, items)]
+            for key, (count, cut) in zip(keys, measures):
+                yield key, count, cut
+
+    def close(self) -> None:
+        """Arrête les processus ; les lots pas encore commencés sont annulés."""
+        # `shutdown(cancel_futures=True)` n'existe qu'à partir de Python 3.9
+        for future, _, _ in self._sent:
+            future.cancel()
+        self._sent = []
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "TokenizerPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _send(self) -> None:
+        if not self._items:
+            return
+        future = self._executor.submit(_measure_batch, self._items)
+        self._sent.append((future, self._keys, self._items))
+        self._keys, self._items, self._chars = [], [], 0
+
+
+def _init_worker(encoding_name: str, encoding: Optional["Encoding"], use_cache: bool) -> None:
+    """Prépare un processus du pool : encodeur chargé d'avance, cache de tokens désactivé comme dans le parent."""
+    global _worker_encoding_name  # pylint: disable=global-statement
+
+    _worker_encoding_name = encoding_name
+    if encoding is not None:
+        tokens._encodings[encoding_name] = encoding  # pylint: disable=protected-access
+    if not use_cache:
+        token_cache._default_cache = None  # pylint: disable=protected-access
+        token_cache._default_checked = True  # pylint: disable=protected-access
+    get_encoding(encoding_name)
+
+
+def _measure_batch(items: List[Tuple[str, Optional[int]]]) -> List[Measure]:
+    """Mesure un lot de contenus dans un processus du pool."""
+    return [_measure(text, max_tokens, _worker_encoding_name) for text, max_tokens in items]
+
+
+def _measure(text: str, max_tokens: Optional[int], encoding_name: str) -> Measure:
+    cut = None
+    if max_tokens is not None:
+        kept = truncate_content(text, max_tokens, encoding_name=encoding_name)
+        if kept != text:
+            text, cut = kept, len(kept)
+    return count_tokens(text, encoding_name=encoding_name), cut
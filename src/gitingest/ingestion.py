@@ -2,12 +2,21 @@
 
 import warnings
 from pathlib import Path
-from typing import Tuple
-
-from gitingest.config import MAX_DIRECTORY_DEPTH, MAX_FILES, MAX_TOTAL_SIZE_BYTES
-from gitingest.output_formatters import format_node
+from typing import Optional, TextIO, Tuple, Union
+
+from gitingest.config import (
+    COMPRESSION_BLOCK_SIZE,
+    LARGE_FILE_SAMPLE_HEAD,
+    LARGE_FILE_SAMPLE_TAIL,
+    MAX_DIRECTORY_DEPTH,
+    MAX_FILES,
+    MAX_TOTAL_SIZE_BYTES,
+)
+from gitingest.digest_index import DigestIndexBuilder, index_path_for
+from gitingest.output_formatters import format_node, write_digest, write_digest_container
 from gitingest.query_parsing import IngestionQuery
-from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats
+from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats, ReadOptions
+from gitingest.utils.compression import compression_for_path, gzip_member_offsets, open_digest_writer
 from gitingest.utils.ingestion_utils import _should_exclude, _should_include
 from gitingest.utils.path_utils import _is_safe_symlink
 
@@ -36,6 +45,129 @@ def ingest_query(query: IngestionQuery) -> Tuple[str, str, str]:
     Tuple[str, str, str]
         A tuple containing the summary, directory structure, and file contents.
 
+    Raises
+    ------
+    ValueError
+        If the path cannot be found, is not a file, or the file has no content.
+    """
+    return format_node(_create_root_node(query), query)
+
+
+def stream_ingest_query(
+    query: IngestionQuery,
+    output: TextIO,
+    index: Optional[DigestIndexBuilder] = None,
+) -> Tuple[str, str]:
+    """
+    Run the ingestion process for a parsed query and write the digest to a stream as it is produced.
+
+    Unlike `ingest_query`, the file contents are written one file at a time and never held in memory together.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+    output : TextIO
+        The text stream the directory structure and file contents are written to.
+    index : DigestIndexBuilder, optional
+        If given, the offsets of the blocks written are recorded in it (see `gitingest.digest_index`).
+
+    Returns
+    -------
+    Tuple[str, str]
+        A tuple containing the summary and the directory structure.
+
+    Raises
+    ------
+    ValueError
+        If the path cannot be found, is not a file, or the file has no content.
+    """
+    return write_digest(_create_root_node(query), query, output, index)
+
+
+def ingest_query_to_file(
+    query: IngestionQuery,
+    path: Union[str, Path],
+    write_index: bool = False,
+) -> Tuple[str, str]:
+    """
+    Run the ingestion process for a parsed query and write the digest to a file as it is produced.
+
+    The file is compressed according to its suffix (see `open_digest_writer`). With `write_index`, the offset index
+    of the digest is built in the same pass and written next to it as `<name>.index.json`.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+    path : Union[str, Path]
+        The path of the digest file to write.
+    write_index : bool
+        Whether to also write the offset index of the digest, by default False.
+
+    Returns
+    -------
+    Tuple[str, str]
+        A tuple containing the summary and the directory structure.
+    """
+    index = DigestIndexBuilder(query.token_count_mode) if write_index else None
+    with open_digest_writer(path) as f:
+        summary, tree = stream_ingest_query(query, f, index)
+
+    if index is not None:
+        # The seek table of a gzip digest is only complete once the stream is closed
+        digest_index = index.build(
+            summary,
+            tree,
+            compression=compression_for_path(path),
+            member_offsets=gzip_member_offsets(f),
+            block_size=COMPRESSION_BLOCK_SIZE,
+        )
+        digest_index.save(index_path_for(path))
+
+    return summary, tree
+
+
+def ingest_query_to_container(query: IngestionQuery, path: Union[str, Path]) -> Tuple[str, str]:
+    """
+    Run the ingestion process for a parsed query and write the digest to an indexed digest container.
+
+    The container can then be opened with `DigestContainer` to read any file by its path without scanning the digest.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+    path : Union[str, Path]
+        The path of the container file to write.
+
+    Returns
+    -------
+    Tuple[str, str]
+        A tuple containing the summary and the directory structure.
+
+    Raises
+    ------
+    ValueError
+        If the path cannot be found, is not a file, or the file has no content.
+    """
+    return write_digest_container(_create_root_node(query), query, path)
+
+
+def _create_root_node(query: IngestionQuery) -> FileSystemNode:
+    """
+    Build the tree of file system nodes to ingest for a parsed query.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+
+    Returns
+    -------
+    FileSystemNode
+        The node of the ingested file, or the root directory node with its subtree.
+
     Raises
     ------
     ValueError
@@ -63,12 +195,13 @@ def ingest_query(query: IngestionQuery) -> Tuple[str, str, str]:
             file_count=1,
             path_str=str(relative_path),
             path=path,
+            read_options=query.extract_read_options(),
         )
 
         if not file_node.content:
             raise ValueError(f"File {file_node.name} has no content")
 
-        return format_node(file_node, query)
+        return file_node
 
     root_node = FileSystemNode(
         name=path.name,
@@ -85,7 +218,7 @@ def ingest_query(query: IngestionQuery) -> Tuple[str, str, str]:
         stats=stats,
     )
 
-    return format_node(root_node, query)
+    return root_node
 
 
 def apply_gitingest_file(path: Path, query: IngestionQuery) -> None:
@@ -245,7 +378,8 @@ def _process_file(path: Path, parent_node: FileSystemNode, stats: FileSystemStat
     Process a file in the file system.
 
     This function checks the file's size, increments the statistics, and reads its content.
-    If the file size exceeds the maximum allowed, it raises an error.
+    Files larger than `query.max_file_size` are skipped, or only sampled (head and tail) if the query's
+    `large_file_policy` is "sample".
 
     Parameters
     ----------
@@ -262,14 +396,18 @@ def _process_file(path: Path, parent_node: FileSystemNode, stats: FileSystemStat
     """
     file_size = path.stat().st_size
     # Filtrage par taille individuelle
-    if query is not None and hasattr(query, "max_file_size") and file_size > query.max_file_size:
+    oversized = query is not None and hasattr(query, "max_file_size") and file_size > query.max_file_size
+    if oversized and query.large_file_policy != "sample":
         return
-    if stats.total_size + file_size > MAX_TOTAL_SIZE_BYTES:
+
+    # Seuls les octets effectivement lus comptent dans la limite totale
+    read_size = min(file_size, LARGE_FILE_SAMPLE_HEAD + LARGE_FILE_SAMPLE_TAIL) if oversized else file_size
+    if stats.total_size + read_size > MAX_TOTAL_SIZE_BYTES:
         print(f"Skipping file {path}: would exceed total size limit")
         return
 
     stats.total_files += 1
-    stats.total_size += file_size
+    stats.total_size += read_size
 
     if stats.total_files > MAX_FILES:
         print(f"Maximum file limit ({MAX_FILES}) reached")
@@ -283,6 +421,7 @@ def _process_file(path: Path, parent_node: FileSystemNode, stats: FileSystemStat
         path_str=str(path.relative_to(local_path)),
         path=path,
         depth=parent_node.depth + 1,
+        read_options=query.extract_read_options(oversized=oversized) if query is not None else ReadOptions(),
     )
 
     parent_node.children.append(child)
@@ -1,11 +1,278 @@
 """Functions to ingest and analyze a codebase directory or single file."""
 
-from typing import Optional, Tuple
-
-import tiktoken
-
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+from gitingest.config import (
+    DEDUP_MIN_SIZE,
+    MAX_READ_WORKERS,
+    READ_AHEAD_FILES,
+    TOKEN_BATCH_CHARS,
+    TOKEN_BATCH_FILES,
+    TOKEN_CACHE_MIN_CHARS,
+    TOKENIZER_THREADS,
+)
+from gitingest.digest_container import DigestContainerWriter
+from gitingest.digest_index import DigestIndexBuilder
 from gitingest.query_parsing import IngestionQuery
 from gitingest.schemas import FileSystemNode, FileSystemNodeType
+from gitingest.schemas.filesystem_schema import SEPARATOR
+from gitingest.utils.file_utils import FileContent, count_lines
+from gitingest.utils.token_cache import CachedCount, get_token_cache, text_blob_sha
+from gitingest.utils.tokens import approximate_tokens, get_encoding, language_for_path
+
+_TOKEN_ENCODING = "cl100k_base"  # Encoding of the token counts of digests
+
+
+class _Deduplicator:
+    """
+    Replace files whose content was already emitted in the digest by a reference to their first occurrence.
+
+    Files are matched on the content hash computed while reading them, so no extra pass over the data is needed.
+    Files smaller than `min_size` bytes are always emitted, as a reference would not be much shorter.
+
+    Attributes
+    ----------
+    min_size : int
+        The minimum size in bytes of a file to be deduplicated.
+    duplicates : int
+        The number of files replaced by a reference.
+    saved_bytes : int
+        The total size of the files replaced by a reference.
+    """
+
+    def __init__(self, min_size: int = DEDUP_MIN_SIZE) -> None:
+        self.min_size = min_size
+        self.duplicates = 0
+        self.saved_bytes = 0
+        self._first_paths: Dict[str, str] = {}
+
+    def content_string(self, node: FileSystemNode, content: FileContent) -> str:
+        """
+        Return the content string of a file, or a reference to the first file with the same content.
+
+        Parameters
+        ----------
+        node : FileSystemNode
+            The file node.
+        content : FileContent
+            The content of the file, as returned by `node.load()`.
+
+        Returns
+        -------
+        str
+            The content string of the file, or of a reference to its first occurrence.
+        """
+        first_path = self.first_occurrence(node, content)
+        if first_path is None:
+            return node.format_content_string(content.text)
+        return node.format_content_string(f"[Duplicate of {first_path.replace(os.sep, '/')}]")
+
+    def first_occurrence(self, node: FileSystemNode, content: FileContent) -> Optional[str]:
+        """
+        Return the path of the first file with the same content, if the file is a duplicate.
+
+        Parameters
+        ----------
+        node : FileSystemNode
+            The file node.
+        content : FileContent
+            The content of the file, as returned by `node.load()`.
+
+        Returns
+        -------
+        str, optional
+            The path of the first file with the same content, or `None` if the file is emitted in full.
+        """
+        if content.content_hash is None or content.size < self.min_size:
+            return None
+
+        first_path = self._first_paths.setdefault(content.content_hash, node.path_str)
+        if first_path == node.path_str:
+            return None
+
+        self.duplicates += 1
+        self.saved_bytes += content.size
+        return first_path
+
+
+class _TokenCounter:
+    """
+    Running token count over the chunks of a digest, encoded in batches.
+
+    Chunks are buffered and encoded together with tiktoken's multithreaded `encode_ordinary_batch` once
+    `TOKEN_BATCH_FILES` chunks or `TOKEN_BATCH_CHARS` characters are pending. Encoding a batch therefore overlaps
+    with the files being read ahead. The count of each file chunk is stored on its node.
+
+    Large file chunks are looked up in the persistent token-count cache (see `gitingest.utils.token_cache`), keyed
+    by the git blob SHA of their content: only their path line is encoded when the content was counted before, in
+    any repository. Their count is split at the pre-token boundary before the second separator line, so the path
+    line and the rest of the block (which only depends on the content) add up to the count of the whole chunk.
+
+    Attributes
+    ----------
+    total : int, optional
+        The number of tokens counted so far, or `None` once an error occurred.
+    error : int
+        The bound of the error on `total`, always 0 for an exact count.
+    """
+
+    def __init__(self) -> None:
+        self.total: Optional[int] = 0
+        self.error = 0
+        self._pending: List[Tuple[str, Optional[FileSystemNode]]] = []
+        self._pending_chars = 0
+
+    def add(self, chunk: str, node: Optional[FileSystemNode] = None) -> None:
+        """
+        Add a chunk to the running count.
+
+        Parameters
+        ----------
+        chunk : str
+            The text to count.
+        node : FileSystemNode, optional
+            The file node the chunk is the content string of, if any.
+        """
+        if self.total is None:
+            return
+
+        self._pending.append((chunk, node))
+        self._pending_chars += len(chunk)
+        if len(self._pending) >= TOKEN_BATCH_FILES or self._pending_chars >= TOKEN_BATCH_CHARS:
+            self.flush()
+
+    def flush(self) -> None:
+        """Encode the pending chunks and add their token counts to the total."""
+        pending, self._pending, self._pending_chars = self._pending, [], 0
+        if self.total is None or not pending:
+            return
+
+        cache = get_token_cache()
+        keys = [_block_cache_key(chunk) if cache is not None and node is not None else None for chunk, node in pending]
+        cached = cache.get_many([key[1] for key in keys if key], _TOKEN_ENCODING, "block") if cache else {}
+
+        texts: List[str] = []
+        for (chunk, _), key in zip(pending, keys):
+            if key is None:
+                texts.append(chunk)
+            else:
+                texts.append(chunk[: key[0]])
+                if key[1] not in cached:
+                    texts.append(chunk[key[0] :])
+
+        try:
+            encoding = get_encoding(_TOKEN_ENCODING)
+            encoded = encoding.encode_ordinary_batch(texts, num_threads=TOKENIZER_THREADS)
+        except (ValueError, OSError, UnicodeEncodeError) as exc:
+            # Encoding unavailable (e.g. not cached and no network access): the summary omits the token count
+            print(exc)
+            self.total = None
+            return
+
+        counts = iter(encoded)
+        new: Dict[str, CachedCount] = {}
+        for (chunk, node), key in zip(pending, keys):
+            count = len(next(counts))
+            if key is not None:
+                if key[1] in cached:
+                    count += cached[key[1]].tokens
+                else:
+                    block_count = len(next(counts))
+                    new[key[1]] = CachedCount(block_count, count_lines(chunk[key[0] + len(SEPARATOR) + 1 : -2]))
+                    count += block_count
+            if node is not None:
+                node.token_count = count
+            self.total += count
+        if new:
+            cache.put_many(new.items(), _TOKEN_ENCODING, "block")
+
+
+def _block_cache_key(chunk: str) -> Optional[Tuple[int, str]]:
+    """
+    Split a file chunk for the token-count cache, if it is large enough to be worth looking up.
+
+    Parameters
+    ----------
+    chunk : str
+        The content string of a file, as returned by `FileSystemNode.format_content_string`.
+
+    Returns
+    -------
+    Tuple[int, str], optional
+        The offset of the second separator line, where the chunk is split, and the blob SHA of the content of the
+        file, or `None` if the chunk is too small or not a file block.
+    """
+    if len(chunk) < TOKEN_CACHE_MIN_CHARS or not chunk.endswith("\n\n"):
+        return None
+    header_end = chunk.find(f"\n{SEPARATOR}\n", len(SEPARATOR))
+    if header_end < 0:
+        return None
+    split = header_end + 1
+    return split, text_blob_sha(chunk[split + len(SEPARATOR) + 1 : -2])
+
+
+class _ApproximateTokenCounter:
+    """
+    Running token estimate over the chunks of a digest, computed from character statistics without encoding.
+
+    Each file chunk is estimated with the characters-per-token ratio of its language, guessed from its extension.
+    The estimate of each file chunk is stored on its node. This counter has the same interface as `_TokenCounter`.
+
+    Attributes
+    ----------
+    total : int
+        The estimated number of tokens so far.
+    error : int
+        The bound of the error on `total`.
+    """
+
+    def __init__(self) -> None:
+        self.total: Optional[int] = 0
+        self.error = 0
+
+    def add(self, chunk: str, node: Optional[FileSystemNode] = None) -> None:
+        """
+        Add a chunk to the running estimate.
+
+        Parameters
+        ----------
+        chunk : str
+            The text to estimate.
+        node : FileSystemNode, optional
+            The file node the chunk is the content string of, if any.
+        """
+        estimate = approximate_tokens(chunk, language_for_path(node.name) if node else "other")
+        if node is not None:
+            node.token_count = estimate.tokens
+        self.total += estimate.tokens
+        self.error += estimate.error
+
+    def flush(self) -> None:
+        """Do nothing, as chunks are estimated as soon as they are added."""
+
+
+def _create_token_counter(query: IngestionQuery) -> Union[_TokenCounter, _ApproximateTokenCounter]:
+    """
+    Create the token counter matching the token count mode of a query.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+
+    Returns
+    -------
+    Union[_TokenCounter, _ApproximateTokenCounter]
+        An exact counter, or an approximate one if `query.token_count_mode` is "approximate".
+    """
+    if query.token_count_mode == "approximate":
+        return _ApproximateTokenCounter()
+    return _TokenCounter()
 
 
 def format_node(node: FileSystemNode, query: IngestionQuery) -> Tuple[str, str, str]:
@@ -26,6 +293,154 @@ def format_node(node: FileSystemNode, query: IngestionQuery) -> Tuple[str, str,
     Tuple[str, str, str]
         A tuple containing the summary, directory structure, and file contents.
     """
+    tree = "Directory structure:\n" + _create_tree_structure(query, node)
+
+    deduplicator = _Deduplicator()
+    token_counter = _create_token_counter(query)
+    token_counter.add(tree)
+    content = "".join(iter_file_contents(node, deduplicator, token_counter))
+    token_counter.flush()
+
+    summary = _create_summary(query, node, deduplicator, token_counter.total, token_counter.error)
+    return summary, tree, content
+
+
+def write_digest(
+    node: FileSystemNode,
+    query: IngestionQuery,
+    output: TextIO,
+    index: Optional[DigestIndexBuilder] = None,
+) -> Tuple[str, str]:
+    """
+    Write the digest of a file system node to a stream, one chunk at a time.
+
+    The directory structure is written first, then the content string of each file as soon as it is read, so the
+    file contents are never held in memory together. The summary is computed from counters updated as chunks are
+    written; its token estimate is the sum of the token counts of the directory structure and of each file.
+
+    Parameters
+    ----------
+    node : FileSystemNode
+        The file system node to be summarized.
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+    output : TextIO
+        The text stream the digest (directory structure, a newline, then file contents) is written to.
+    index : DigestIndexBuilder, optional
+        If given, the offset of every chunk written is recorded in it, so the index of the digest can be built
+        without reading the digest again.
+
+    Returns
+    -------
+    Tuple[str, str]
+        A tuple containing the summary and the directory structure.
+    """
+    tree = "Directory structure:\n" + _create_tree_structure(query, node)
+
+    deduplicator = _Deduplicator()
+    token_counter = _create_token_counter(query)
+    token_counter.add(tree)
+    token_counter.add("\n")
+    blocks = chain(((None, tree), (None, "\n")), _iter_file_blocks(node, deduplicator, token_counter))
+    for file_node, chunk in blocks:
+        output.write(chunk)
+        if index is not None:
+            index.add(chunk, file_node)
+    token_counter.flush()
+
+    return _create_summary(query, node, deduplicator, token_counter.total, token_counter.error), tree
+
+
+def write_digest_container(node: FileSystemNode, query: IngestionQuery, path: Union[str, Path]) -> Tuple[str, str]:
+    """
+    Write the digest of a file system node to an indexed digest container, one file at a time.
+
+    The container holds the raw content of each file, indexed by path, with its token count and content hash.
+    Duplicate files point to the content of their first occurrence instead of storing it again. Token counts are
+    those of each file's block in the text digest, so the summary is the same as the one of `write_digest`.
+
+    Parameters
+    ----------
+    node : FileSystemNode
+        The file system node to be summarized.
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+    path : Union[str, Path]
+        The path of the container file to write.
+
+    Returns
+    -------
+    Tuple[str, str]
+        A tuple containing the summary and the directory structure.
+    """
+    tree = "Directory structure:\n" + _create_tree_structure(query, node)
+
+    deduplicator = _Deduplicator()
+    token_counter = _create_token_counter(query)
+    token_counter.add(tree)
+    token_counter.add("\n")
+    indices: List[Tuple[int, FileSystemNode]] = []
+
+    with DigestContainerWriter(path) as writer:
+        if node.type == FileSystemNodeType.DIRECTORY:
+            files = _prefetch_files(node)
+        else:
+            files = iter([(node, node.load())])
+
+        for i, (file_node, content) in enumerate(files):
+            if i:
+                token_counter.add("\n")
+            file_path = file_node.path_str.replace(os.sep, "/")
+            first_path = deduplicator.first_occurrence(file_node, content)
+            if first_path is not None:
+                first_path = first_path.replace(os.sep, "/")
+                token_counter.add(file_node.format_content_string(f"[Duplicate of {first_path}]"), file_node)
+                index = writer.add_duplicate(file_path, first_path)
+            else:
+                token_counter.add(file_node.format_content_string(content.text), file_node)
+                if file_node.type == FileSystemNodeType.SYMLINK:
+                    index = writer.add(file_path, "", symlink_target=file_node.path.readlink().name)
+                else:
+                    index = writer.add(file_path, content.text, content_hash=content.content_hash)
+            indices.append((index, file_node))
+        token_counter.flush()
+
+        for index, file_node in indices:
+            writer.set_token_count(index, file_node.token_count)
+        summary = _create_summary(query, node, deduplicator, token_counter.total, token_counter.error)
+        writer.finish(summary, tree)
+
+    return summary, tree
+
+
+def _create_summary(
+    query: IngestionQuery,
+    node: FileSystemNode,
+    deduplicator: _Deduplicator,
+    token_count: Optional[int],
+    token_error: int = 0,
+) -> str:
+    """
+    Create the summary of a digest.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+    node : FileSystemNode
+        The file system node the digest was generated for.
+    deduplicator : _Deduplicator
+        The deduplicator used while gathering the file contents.
+    token_count : int, optional
+        The number of tokens of the digest, or `None` if it could not be counted.
+    token_error : int
+        The bound of the error on `token_count`, shown next to it when it is an estimate (default is 0).
+
+    Returns
+    -------
+    str
+        The summary of the digest.
+    """
     is_single_file = node.type == FileSystemNodeType.FILE
     summary = _create_summary_prefix(query, single_file=is_single_file)
 
@@ -33,18 +448,17 @@ def format_node(node: FileSystemNode, query: IngestionQuery) -> Tuple[str, str,
         summary += f"Files analyzed: {node.file_count}\n"
     elif node.type == FileSystemNodeType.FILE:
         summary += f"File: {node.name}\n"
-        summary += f"Lines: {len(node.content.splitlines()):,}\n"
+        summary += f"Lines: {node.load().line_count:,}\n"
 
-    tree = "Directory structure:\n" + _create_tree_structure(query, node)
-    _create_tree_structure(query, node)
+    if deduplicator.duplicates:
+        summary += f"Duplicate files: {deduplicator.duplicates} ({deduplicator.saved_bytes:,} bytes deduplicated)\n"
 
-    content = _gather_file_contents(node)
+    if token_count is not None:
+        summary += f"\nEstimated tokens: {_format_token_count(token_count)}"
+        if token_error:
+            summary += f" (±{_format_token_count(token_error)})"
 
-    token_estimate = _format_token_count(tree + content)
-    if token_estimate:
-        summary += f"\nEstimated tokens: {token_estimate}"
-
-    return summary, tree, content
+    return summary
 
 
 def _create_summary_prefix(query: IngestionQuery, single_file: bool = False) -> str:
@@ -84,31 +498,224 @@ def _create_summary_prefix(query: IngestionQuery, single_file: bool = False) ->
     return "\n".join(parts) + "\n"
 
 
-def _gather_file_contents(node: FileSystemNode) -> str:
+def _gather_file_contents(node: FileSystemNode, deduplicator: Optional[_Deduplicator] = None) -> str:
     """
     Recursively gather contents of all files under the given node.
 
     This function recursively processes a directory node and gathers the contents of all files
     under that node. It returns the concatenated content of all files as a single string.
+    Files are read ahead of the concatenation by a thread pool, in tree order, so the output is identical to a
+    sequential read.
 
     Parameters
     ----------
     node : FileSystemNode
         The current directory or file node being processed.
+    deduplicator : _Deduplicator, optional
+        If given, files whose content already appeared are replaced by a reference to their first occurrence.
 
     Returns
     -------
     str
         The concatenated content of all files under the given node.
     """
+    return "".join(iter_file_contents(node, deduplicator))
+
+
+def iter_file_contents(
+    node: FileSystemNode,
+    deduplicator: Optional[_Deduplicator] = None,
+    token_counter: Optional[_TokenCounter] = None,
+) -> Iterator[str]:
+    """
+    Yield the chunks making up the concatenated contents of all files under the given node.
+
+    Joining the chunks gives the output of `_gather_file_contents`; consuming them one by one keeps at most the
+    read-ahead window of file contents in memory.
+
+    Parameters
+    ----------
+    node : FileSystemNode
+        The current directory or file node being processed.
+    deduplicator : _Deduplicator, optional
+        If given, files whose content already appeared are replaced by a reference to their first occurrence.
+    token_counter : _TokenCounter, optional
+        If given, every yielded chunk is added to it, and the token count of each file is stored on its node.
+
+    Yields
+    ------
+    str
+        The content string of each file, and the separators between them.
+    """
+    for _, chunk in _iter_file_blocks(node, deduplicator, token_counter):
+        yield chunk
+
+
+def _iter_file_blocks(
+    node: FileSystemNode,
+    deduplicator: Optional[_Deduplicator] = None,
+    token_counter: Optional[_TokenCounter] = None,
+) -> Iterator[Tuple[Optional[FileSystemNode], str]]:
+    """
+    Yield the chunks of `iter_file_contents` together with the file node each of them is the content string of.
+
+    Parameters
+    ----------
+    node : FileSystemNode
+        The current directory or file node being processed.
+    deduplicator : _Deduplicator, optional
+        If given, files whose content already appeared are replaced by a reference to their first occurrence.
+    token_counter : _TokenCounter, optional
+        If given, every yielded chunk is added to it, and the token count of each file is stored on its node.
+
+    Yields
+    ------
+    Tuple[FileSystemNode, optional, str]
+        The content string of each file with its node, and the newlines separating files with `None`.
+    """
+    if node.type != FileSystemNodeType.DIRECTORY:
+        content = node.load()
+        node.content_hash = content.content_hash
+        content_string = node.format_content_string(content.text)
+        if token_counter is not None:
+            token_counter.add(content_string, node)
+        yield node, content_string
+        return
+
+    contents = _prefetch_file_contents(node, deduplicator=deduplicator)
+    for file_node, chunk in _join_file_contents(node, contents):
+        if token_counter is not None:
+            token_counter.add(chunk, file_node)
+        yield file_node, chunk
+
+
+def _join_file_contents(
+    node: FileSystemNode,
+    contents: Iterator[str],
+) -> Iterator[Tuple[Optional[FileSystemNode], str]]:
+    """
+    Interleave prefetched file contents with the separators following the structure of the tree.
+
+    Parameters
+    ----------
+    node : FileSystemNode
+        The current directory or file node being processed.
+    contents : Iterator[str]
+        The content strings of the files under the root node, in tree order.
+
+    Yields
+    ------
+    Tuple[FileSystemNode, optional, str]
+        The content string of each file under the given node with its node, and the newlines separating siblings
+        with `None`.
+    """
     if node.type != FileSystemNodeType.DIRECTORY:
-        return node.content_string
+        yield node, next(contents)
+        return
+
+    for i, child in enumerate(node.children):
+        if i:
+            yield None, "\n"
+        yield from _join_file_contents(child, contents)
+
+
+def _prefetch_file_contents(
+    node: FileSystemNode,
+    max_workers: int = MAX_READ_WORKERS,
+    read_ahead: int = READ_AHEAD_FILES,
+    deduplicator: Optional[_Deduplicator] = None,
+) -> Iterator[str]:
+    """
+    Read the files under a node with a thread pool and yield their content strings in tree order.
+
+    At most `read_ahead` files are read ahead of the consumer, which bounds the memory held by the pipeline.
+    Deduplication happens on the consumer side, so the first occurrence of a content is always the first in
+    tree order. The content hash of each file is stored on its node.
+
+    Parameters
+    ----------
+    node : FileSystemNode
+        The directory node whose files are read.
+    max_workers : int
+        The number of threads reading files, by default `MAX_READ_WORKERS`.
+    read_ahead : int
+        The maximum number of files read ahead of the consumer, by default `READ_AHEAD_FILES`.
+    deduplicator : _Deduplicator, optional
+        If given, files whose content already appeared are replaced by a reference to their first occurrence.
+
+    Yields
+    ------
+    str
+        The content string of each file, in tree order.
+    """
+    for file_node, content in _prefetch_files(node, max_workers, read_ahead):
+        file_node.content_hash = content.content_hash
+        if deduplicator is None:
+            yield file_node.format_content_string(content.text)
+        else:
+            yield deduplicator.content_string(file_node, content)
+
+
+def _prefetch_files(
+    node: FileSystemNode,
+    max_workers: int = MAX_READ_WORKERS,
+    read_ahead: int = READ_AHEAD_FILES,
+) -> Iterator[Tuple[FileSystemNode, FileContent]]:
+    """
+    Load the files under a node with a thread pool and yield them in tree order.
 
-    # Recursively gather contents of all files under the current directory
-    return "\n".join(_gather_file_contents(child) for child in node.children)
+    Parameters
+    ----------
+    node : FileSystemNode
+        The directory node whose files are read.
+    max_workers : int
+        The number of threads reading files, by default `MAX_READ_WORKERS`.
+    read_ahead : int
+        The maximum number of files read ahead of the consumer, by default `READ_AHEAD_FILES`.
+
+    Yields
+    ------
+    Tuple[FileSystemNode, FileContent]
+        Each file node with its loaded content, in tree order.
+    """
+    pending: Deque[Tuple[FileSystemNode, Future]] = deque()
 
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for file_node in _iter_file_nodes(node):
+            pending.append((file_node, executor.submit(file_node.load)))
+            if len(pending) >= read_ahead:
+                file_node, future = pending.popleft()
+                yield file_node, future.result()
 
-def _create_tree_structure(query: IngestionQuery, node: FileSystemNode, prefix: str = "", is_last: bool = True) -> str:
+        while pending:
+            file_node, future = pending.popleft()
+            yield file_node, future.result()
+
+
+def _iter_file_nodes(node: FileSystemNode) -> Iterator[FileSystemNode]:
+    """
+    Yield the non-directory nodes under a node in tree order.
+
+    Parameters
+    ----------
+    node : FileSystemNode
+        The root of the subtree to walk.
+
+    Yields
+    ------
+    FileSystemNode
+        Each file or symlink node, in the order `_gather_file_contents` concatenates them.
+    """
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.type != FileSystemNodeType.DIRECTORY:
+            yield current
+        else:
+            stack.extend(reversed(current.children))
+
+
+def _create_tree_structure(query: IngestionQuery, node: FileSystemNode) -> str:
     """
     Generate a tree-like string representation of the file structure.
 
@@ -120,63 +727,141 @@ def _create_tree_structure(query: IngestionQuery, node: FileSystemNode, prefix:
     query : IngestionQuery
         The parsed query object containing information about the repository and query parameters.
     node : FileSystemNode
-        The current directory or file node being processed.
-    prefix : str
-        A string used for indentation and formatting of the tree structure, by default "".
-    is_last : bool
-        A flag indicating whether the current node is the last in its directory, by default True.
+        The root directory or file node of the tree.
 
     Returns
     -------
     str
         A string representing the directory structure formatted as a tree.
     """
+    return "".join(_iter_tree_lines(query, node))
+
+
+def _iter_tree_lines(query: IngestionQuery, node: FileSystemNode) -> Iterator[str]:
+    """
+    Yield the lines of the tree-like representation of the file structure, in linear time.
+
+    The tree is walked with an explicit stack. Directories with more than `query.tree_max_children` children only
+    show the first ones, followed by a line counting the others, and directories deeper than
+    `query.tree_max_depth` are shown without their content.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+    node : FileSystemNode
+        The root directory or file node of the tree.
+
+    Yields
+    ------
+    str
+        Each line of the tree, including its trailing newline.
+    """
     if not node.name:
         # If no name is present, use the slug as the top-level directory name
         node.name = query.slug
 
-    tree_str = ""
-    current_prefix = "└── " if is_last else "├── "
+    max_children = query.tree_max_children
+    max_depth = query.tree_max_depth
 
-    # Indicate directories with a trailing slash
-    display_name = node.name
-    if node.type == FileSystemNodeType.DIRECTORY:
-        display_name += "/"
-    elif node.type == FileSystemNodeType.SYMLINK:
-        display_name += " -> " + node.path.readlink().name
+    # Each entry is a node to render, or an already formatted line for collapsed children
+    stack: List[Tuple[Union[FileSystemNode, str], str, bool, int]] = [(node, "", True, 0)]
+    while stack:
+        current, prefix, is_last, depth = stack.pop()
+        if isinstance(current, str):
+            yield f"{prefix}{'└── ' if is_last else '├── '}{current}\n"
+            continue
 
-    tree_str += f"{prefix}{current_prefix}{display_name}\n"
+        # Indicate directories with a trailing slash
+        display_name = current.name
+        if current.type == FileSystemNodeType.DIRECTORY:
+            display_name += "/"
+        elif current.type == FileSystemNodeType.SYMLINK:
+            display_name += " -> " + current.path.readlink().name
 
-    if node.type == FileSystemNodeType.DIRECTORY and node.children:
-        prefix += "    " if is_last else "│   "
-        for i, child in enumerate(node.children):
-            tree_str += _create_tree_structure(query, node=child, prefix=prefix, is_last=i == len(node.children) - 1)
-    return tree_str
+        yield f"{prefix}{'└── ' if is_last else '├── '}{display_name}\n"
 
+        if current.type != FileSystemNodeType.DIRECTORY or not current.children:
+            continue
 
-def _format_token_count(text: str) -> Optional[str]:
+        child_prefix = prefix + ("    " if is_last else "│   ")
+        if max_depth is not None and depth >= max_depth:
+            label = f"... {current.file_count:,} {_plural(current.file_count, 'file')}"
+            stack.append((label, child_prefix, True, depth + 1))
+            continue
+
+        children = current.children
+        entries: List[Union[FileSystemNode, str]] = list(children)
+        if max_children is not None and len(children) > max_children:
+            entries = entries[:max_children]
+            entries.append(_collapsed_children_label(children[max_children:]))
+
+        # Pushed in reverse so that children are rendered in order
+        for i in range(len(entries) - 1, -1, -1):
+            stack.append((entries[i], child_prefix, i == len(entries) - 1, depth + 1))
+
+
+def _collapsed_children_label(hidden: List[FileSystemNode]) -> str:
     """
-    Return a human-readable string representing the token count of the given text.
+    Describe the children of a directory that are not shown in the tree.
 
-    E.g., '120' -> '120', '1200' -> '1.2k', '1200000' -> '1.2M'.
+    Parameters
+    ----------
+    hidden : List[FileSystemNode]
+        The children left out of the tree.
+
+    Returns
+    -------
+    str
+        A label such as "... 4,812 more files" or "... 12 more entries (4,812 files)".
+    """
+    directories = sum(1 for child in hidden if child.type == FileSystemNodeType.DIRECTORY)
+    if not directories:
+        return f"... {len(hidden):,} more {_plural(len(hidden), 'file')}"
+
+    files = sum(child.file_count if child.type == FileSystemNodeType.DIRECTORY else 1 for child in hidden)
+    return f"... {len(hidden):,} more {_plural(len(hidden), 'entry', 'entries')} ({files:,} {_plural(files, 'file')})"
+
+
+def _plural(count: int, singular: str, plural: Optional[str] = None) -> str:
+    """
+    Return the singular or plural form of a word depending on a count.
 
     Parameters
     ----------
-    text : str
-        The text string for which the token count is to be estimated.
+    count : int
+        The number of items.
+    singular : str
+        The singular form of the word.
+    plural : str, optional
+        The plural form of the word, by default the singular form followed by "s".
 
     Returns
     -------
-    str, optional
-        The formatted number of tokens as a string (e.g., '1.2k', '1.2M'), or `None` if an error occurs.
-    """
-    try:
-        encoding = tiktoken.get_encoding("cl100k_base")
-        total_tokens = len(encoding.encode(text, disallowed_special=()))
-    except (ValueError, UnicodeEncodeError) as exc:
-        print(exc)
-        return None
+    str
+        The form of the word matching the count.
+    """
+    if count == 1:
+        return singular
+    return plural or f"{singular}s"
 
+
+def _format_token_count(total_tokens: int) -> str:
+    """
+    Return a human-readable string representing a token count.
+
+    E.g., '120' -> '120', '1200' -> '1.2k', '1200000' -> '1.2M'.
+
+    Parameters
+    ----------
+    total_tokens : int
+        The number of tokens.
+
+    Returns
+    -------
+    str
+        The formatted number of tokens as a string (e.g., '1.2k', '1.2M').
+    """
     if total_tokens >= 1_000_000:
         return f"{total_tokens / 1_000_000:.1f}M"
 
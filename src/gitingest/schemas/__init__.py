@@ -1,11 +1,11 @@
 """This module contains the schemas for the Gitingest package."""
 
-from gitingest.schemas.filesystem_schema import FileSystemNode, FileSystemNodeType, FileSystemStats
+from gitingest.schemas.filesystem_schema import FileSystemNode, FileSystemNodeType, FileSystemStats, ReadOptions
 from gitingest.schemas.ingestion_schema import CloneConfig, IngestionQuery
 from gitingest.schemas.schemas import FileType, FileImportance, FileNode, RepoContext
 
 __all__ = [
-    "FileSystemNode", "FileSystemNodeType", "FileSystemStats",
+    "FileSystemNode", "FileSystemNodeType", "FileSystemStats", "ReadOptions",
     "CloneConfig", "IngestionQuery",
     "FileType", "FileImportance", "FileNode", "RepoContext"
 ]
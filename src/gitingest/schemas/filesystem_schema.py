@@ -6,8 +6,12 @@ import os
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from pathlib import Path
+from typing import Optional
 
-from gitingest.utils.file_utils import get_preferred_encodings, is_text_file
+from gitingest.config import LARGE_FILE_SAMPLE_HEAD, LARGE_FILE_SAMPLE_TAIL
+from gitingest.utils.content_cache import get_content_cache
+from gitingest.utils.file_utils import FileContent, count_lines, load_file, load_file_sample
+from gitingest.utils.generated_utils import detect_generated_file
 from gitingest.utils.notebook_utils import process_notebook
 
 SEPARATOR = "=" * 48  # Tiktoken, the tokenizer openai uses, counts 2 tokens if we have more than 48
@@ -30,6 +34,35 @@ class FileSystemStats:
     total_size: int = 0
 
 
+@dataclass(frozen=True)
+class ReadOptions:
+    """
+    Options controlling how the content of file nodes is read.
+
+    Attributes
+    ----------
+    include_notebook_output : bool
+        Whether cell outputs are included when converting Jupyter notebooks (default is True).
+    sample_head : int
+        If non-zero, only this many leading bytes of the file are read, together with `sample_tail` trailing bytes
+        (default is 0, which reads the whole file).
+    sample_tail : int
+        The number of trailing bytes read when sampling the file (default is 0).
+    generated_file_policy : str
+        What to do with files that look generated: "keep" them, "sample" their head and tail, or "skip" their
+        content (default is "keep").
+    hash_content : bool
+        Whether the raw content of files read in full is hashed, for deduplication and digest indexes (default is
+        False).
+    """
+
+    include_notebook_output: bool = True
+    sample_head: int = 0
+    sample_tail: int = 0
+    generated_file_policy: str = "keep"
+    hash_content: bool = False
+
+
 @dataclass
 class FileSystemNode:  # pylint: disable=too-many-instance-attributes
     """
@@ -47,6 +80,9 @@ class FileSystemNode:  # pylint: disable=too-many-instance-attributes
     dir_count: int = 0
     depth: int = 0
     children: list[FileSystemNode] = field(default_factory=list)
+    read_options: ReadOptions = field(default_factory=ReadOptions)
+    token_count: Optional[int] = None  # Tokens of the content string, once counted while generating a digest
+    content_hash: Optional[str] = None  # Hash of the raw content, once read while generating a digest
 
     def sort_children(self) -> None:
         """
@@ -90,18 +126,34 @@ class FileSystemNode:  # pylint: disable=too-many-instance-attributes
         str
             A string representation of the node's content.
         """
+        return self.format_content_string(self.content)
+
+    def format_content_string(self, content: str) -> str:
+        """
+        Return the given content preceded by the path header of the node.
+
+        Parameters
+        ----------
+        content : str
+            The text to show under the header, usually the content of the node.
+
+        Returns
+        -------
+        str
+            A string representation of the node's path and of the given content.
+        """
         parts = [
             SEPARATOR,
             f"{self.type.name}: {str(self.path_str).replace(os.sep, '/')}"
             + (f" -> {self.path.readlink().name}" if self.type == FileSystemNodeType.SYMLINK else ""),
             SEPARATOR,
-            f"{self.content}",
+            f"{content}",
         ]
 
         return "\n".join(parts) + "\n\n"
 
     @property
-    def content(self) -> str:  # pylint: disable=too-many-return-statements
+    def content(self) -> str:
         """
         Read the content of a file if it's text (or a notebook). Return an error message otherwise.
 
@@ -110,6 +162,25 @@ class FileSystemNode:  # pylint: disable=too-many-instance-attributes
         str
             The content of the file, or an error message if the file could not be read.
 
+        Raises
+        ------
+        ValueError
+            If the node is a directory.
+        """
+        return self.load().text
+
+    def load(self) -> FileContent:
+        """
+        Read the file behind this node once and return its content together with its metadata.
+
+        Notebooks are converted to Python scripts; other files are read and decoded in a single pass. The result is
+        kept in the shared content cache, so repeated accesses to an unchanged file do not read it again.
+
+        Returns
+        -------
+        FileContent
+            The decoded content (or an error message) and the metadata gathered while reading it.
+
         Raises
         ------
         ValueError
@@ -119,27 +190,26 @@ class FileSystemNode:  # pylint: disable=too-many-instance-attributes
             raise ValueError("Cannot read content of a directory node")
 
         if self.type == FileSystemNodeType.SYMLINK:
-            return ""
+            return FileContent(text="", is_text=True)
 
-        if not is_text_file(self.path):
-            return "[Non-text file]"
+        return get_content_cache().get_or_load(self.path, self._read, variant=self.read_options)
 
+    def _read(self) -> FileContent:
         if self.path.suffix == ".ipynb":
             try:
-                return process_notebook(self.path)
+                text = process_notebook(self.path, include_output=self.read_options.include_notebook_output)
             except Exception as exc:
-                return f"Error processing notebook: {exc}"
+                return FileContent(text=f"Error processing notebook: {exc}", is_text=False, size=self.size)
+            return FileContent(text=text, is_text=True, encoding="utf-8", size=self.size, line_count=count_lines(text))
 
-        # Try multiple encodings
-        for encoding in get_preferred_encodings():
-            try:
-                with self.path.open(encoding=encoding) as f:
-                    return f.read()
-            except UnicodeDecodeError:
-                continue
-            except UnicodeError:
-                continue
-            except OSError as exc:
-                return f"Error reading file: {exc}"
-
-        return "Error: Unable to decode file with available encodings"
+        if self.read_options.sample_head:
+            return load_file_sample(self.path, self.read_options.sample_head, self.read_options.sample_tail)
+
+        if self.read_options.generated_file_policy != "keep":
+            reason = detect_generated_file(self.path)
+            if reason and self.read_options.generated_file_policy == "skip":
+                return FileContent(text=f"[Generated file skipped: {reason}]", is_text=False, size=self.size)
+            if reason:
+                return load_file_sample(self.path, LARGE_FILE_SAMPLE_HEAD, LARGE_FILE_SAMPLE_TAIL)
+
+        return load_file(self.path, hash_content=self.read_options.hash_content)
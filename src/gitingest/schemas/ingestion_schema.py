@@ -2,11 +2,12 @@
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Set
+from typing import Literal, Optional, Set
 
 from pydantic import BaseModel, ConfigDict, Field
 
-from gitingest.config import MAX_FILE_SIZE
+from gitingest.config import LARGE_FILE_SAMPLE_HEAD, LARGE_FILE_SAMPLE_TAIL, MAX_FILE_SIZE, TREE_MAX_CHILDREN
+from gitingest.schemas.filesystem_schema import ReadOptions
 
 
 @dataclass
@@ -57,6 +58,12 @@ class IngestionQuery(BaseModel):  # pylint: disable=too-many-instance-attributes
     max_file_size: int = Field(default=MAX_FILE_SIZE)
     ignore_patterns: Optional[Set[str]] = None
     include_patterns: Optional[Set[str]] = None
+    include_notebook_output: bool = True
+    large_file_policy: Literal["skip", "sample"] = "skip"
+    generated_file_policy: Literal["keep", "sample", "skip"] = "keep"
+    tree_max_children: Optional[int] = TREE_MAX_CHILDREN
+    tree_max_depth: Optional[int] = None
+    token_count_mode: Literal["exact", "approximate"] = "exact"
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
@@ -85,3 +92,31 @@ class IngestionQuery(BaseModel):  # pylint: disable=too-many-instance-attributes
             subpath=self.subpath,
             blob=self.type == "blob",
         )
+
+    def extract_read_options(self, oversized: bool = False) -> ReadOptions:
+        """
+        Extract the options used to read the content of the ingested files.
+
+        Parameters
+        ----------
+        oversized : bool
+            Whether the file is larger than `max_file_size` and must be sampled, by default False.
+
+        Returns
+        -------
+        ReadOptions
+            A ReadOptions object containing the relevant fields.
+        """
+        if oversized:
+            return ReadOptions(
+                include_notebook_output=self.include_notebook_output,
+                sample_head=LARGE_FILE_SAMPLE_HEAD,
+                sample_tail=LARGE_FILE_SAMPLE_TAIL,
+                generated_file_policy=self.generated_file_policy,
+            )
+        # Ingested files end up in a digest, which deduplicates and indexes them by content hash
+        return ReadOptions(
+            include_notebook_output=self.include_notebook_output,
+            generated_file_policy=self.generated_file_policy,
+            hash_content=True,
+        )
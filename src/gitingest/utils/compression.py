@@ -0,0 +1,313 @@
+"""Utility functions for writing and reading compressed digests as text streams."""
+
+import gzip
+import io
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Deque, List, Optional, TextIO, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from gitingest.config import (
+    COMPRESSION_BLOCK_SIZE,
+    COMPRESSION_THREADS,
+    GZIP_COMPRESSION_LEVEL,
+    ZSTD_COMPRESSION_LEVEL,
+)
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+CONTENT_ENCODINGS = {"gzip": "gzip", "zstd": "zstd"}  # Value of the HTTP Content-Encoding header per compression
+
+
+def compression_for_path(path: Union[str, Path]) -> Optional[str]:
+    """
+    Guess the compression of a digest file from its suffix.
+
+    Parameters
+    ----------
+    path : Union[str, Path]
+        The path of the digest file.
+
+    Returns
+    -------
+    str, optional
+        "gzip" for `.gz` files, "zstd" for `.zst` files, or `None` for uncompressed files.
+    """
+    suffix = Path(path).suffix.lower()
+    return next((compression for compression, known in COMPRESSION_SUFFIXES.items() if known == suffix), None)
+
+
+def open_digest_writer(path: Union[str, Path], compression: Optional[str] = None) -> TextIO:
+    """
+    Open a digest file for writing as a UTF-8 text stream, compressing it on the fly.
+
+    Newlines are written untranslated on every platform, so byte offsets computed from the text (see
+    `gitingest.digest_index`) match the file. Large gzip outputs are compressed on `COMPRESSION_THREADS` threads, one
+    block at a time; zstd uses the multithreaded compressor of the `zstandard` package.
+
+    Parameters
+    ----------
+    path : Union[str, Path]
+        The path of the digest file.
+    compression : str, optional
+        "gzip", "zstd", or `None` for no compression. If not given, it is guessed from the suffix of `path`.
+
+    Returns
+    -------
+    TextIO
+        A text stream writing to the digest file. Closing it finishes the compressed stream.
+
+    Raises
+    ------
+    ImportError
+        If zstd compression is requested and the `zstandard` package is not installed.
+    ValueError
+        If the compression is not supported.
+    """
+    compression = compression or compression_for_path(path)
+    if compression is None:
+        return open(path, "w", encoding="utf-8", newline="")
+    if compression == "gzip" and COMPRESSION_THREADS <= 1:
+        return gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=GZIP_COMPRESSION_LEVEL)
+
+    raw = open(path, "wb")  # pylint: disable=consider-using-with
+    try:
+        stream = _compressed_writer(raw, compression)
+    except (ImportError, ValueError):
+        raw.close()
+        raise
+    return io.TextIOWrapper(stream, encoding="utf-8", newline="")
+
+
+def open_digest_reader(
+    path: Union[str, Path],
+    compression: Optional[str] = None,
+    newline: Optional[str] = None,
+) -> TextIO:
+    """
+    Open a digest file for reading as a UTF-8 text stream, decompressing it on the fly.
+
+    Parameters
+    ----------
+    path : Union[str, Path]
+        The path of the digest file.
+    compression : str, optional
+        "gzip", "zstd", or `None` for no compression. If not given, it is guessed from the suffix of `path`.
+    newline : str, optional
+        How line endings are translated, as for `open` (pass "" to read them untranslated), by default `None`.
+
+    Returns
+    -------
+    TextIO
+        A text stream reading the decompressed digest.
+
+    Raises
+    ------
+    ImportError
+        If the file is zstd-compressed and the `zstandard` package is not installed.
+    """
+    compression = compression or compression_for_path(path)
+    if compression is None:
+        return open(path, encoding="utf-8", newline=newline)
+    if compression == "gzip":
+        return gzip.open(path, "rt", encoding="utf-8", newline=newline)
+
+    _require_zstandard()
+    raw = open(path, "rb")  # pylint: disable=consider-using-with
+    stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return io.TextIOWrapper(stream, encoding="utf-8", newline=newline)
+
+
+def gzip_member_offsets(stream: TextIO) -> Optional[List[int]]:
+    """
+    Return the offsets of the gzip members written by a stream from `open_digest_writer`.
+
+    Parallel gzip writers start a new member every `COMPRESSION_BLOCK_SIZE` bytes of digest, so together with the
+    block size these offsets form a seek table: reading from a digest offset only needs to decompress from the
+    member holding it. The list is complete once the stream is closed.
+
+    Parameters
+    ----------
+    stream : TextIO
+        A text stream returned by `open_digest_writer`.
+
+    Returns
+    -------
+    List[int], optional
+        The offset in the compressed file of each member, in order, or `None` if the stream is not a parallel gzip
+        writer.
+    """
+    raw = getattr(getattr(stream, "buffer", None), "raw", None)
+    return raw.member_offsets if isinstance(raw, _ParallelGzipWriter) else None
+
+
+def read_digest_range(
+    path: Union[str, Path],
+    offset: int,
+    length: int,
+    compression: Optional[str] = None,
+    member_offsets: Optional[List[int]] = None,
+    block_size: int = COMPRESSION_BLOCK_SIZE,
+) -> bytes:
+    """
+    Read a range of bytes of the decompressed content of a digest file.
+
+    Uncompressed digests are read with a single `seek`. Compressed ones are decompressed from their start, or, for
+    gzip digests with a seek table (see `gzip_member_offsets`), from the member holding `offset`.
+
+    Parameters
+    ----------
+    path : Union[str, Path]
+        The path of the digest file.
+    offset : int
+        The offset of the range in the decompressed digest.
+    length : int
+        The number of bytes to read.
+    compression : str, optional
+        "gzip", "zstd", or `None` for no compression. If not given, it is guessed from the suffix of `path`.
+    member_offsets : List[int], optional
+        The offsets of the gzip members of the file, as returned by `gzip_member_offsets`.
+    block_size : int
+        The number of decompressed bytes in each gzip member, by default `COMPRESSION_BLOCK_SIZE`.
+
+    Returns
+    -------
+    bytes
+        The bytes of the range, fewer than `length` if the digest ends before.
+
+    Raises
+    ------
+    ImportError
+        If the file is zstd-compressed and the `zstandard` package is not installed.
+    """
+    compression = compression or compression_for_path(path)
+    with open(path, "rb") as raw:
+        if compression is None:
+            raw.seek(offset)
+            return raw.read(length)
+
+        if compression == "gzip":
+            if member_offsets:
+                member = min(offset // block_size, len(member_offsets) - 1)
+                raw.seek(member_offsets[member])
+                offset -= member * block_size
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        else:
+            _require_zstandard()
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+
+        with stream:
+            stream.seek(offset)
+            return stream.read(length)
+
+
+def _compressed_writer(raw: BinaryIO, compression: str) -> BinaryIO:
+    """
+    Wrap a binary file in a compressing writer.
+
+    Parameters
+    ----------
+    raw : BinaryIO
+        The binary file to write the compressed data to. It is closed with the writer.
+    compression : str
+        "gzip" or "zstd".
+
+    Returns
+    -------
+    BinaryIO
+        A binary stream compressing what is written to it.
+
+    Raises
+    ------
+    ImportError
+        If zstd compression is requested and the `zstandard` package is not installed.
+    ValueError
+        If the compression is not supported.
+    """
+    if compression == "gzip":
+        return io.BufferedWriter(_ParallelGzipWriter(raw), buffer_size=COMPRESSION_BLOCK_SIZE)
+
+    if compression == "zstd":
+        _require_zstandard()
+        compressor = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL, threads=COMPRESSION_THREADS)
+        return compressor.stream_writer(raw, closefd=True)
+
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def _require_zstandard() -> None:
+    """
+    Check that the optional `zstandard` package is installed.
+
+    Raises
+    ------
+    ImportError
+        If the `zstandard` package is not installed.
+    """
+    if zstandard is None:
+        raise ImportError("zstd compression requires the 'zstandard' package (pip install zstandard)")
+
+
+class _ParallelGzipWriter(io.RawIOBase):
+    """
+    Binary stream compressing blocks of `COMPRESSION_BLOCK_SIZE` bytes in parallel into gzip members.
+
+    A gzip file may hold several members, which decompress to the concatenation of their data, so blocks are
+    compressed independently (zlib releases the GIL) and written in order. At most `COMPRESSION_THREADS` blocks
+    are pending at once, which bounds memory use.
+
+    Attributes
+    ----------
+    member_offsets : List[int]
+        The offset in the compressed file of each member written so far.
+    """
+
+    def __init__(self, raw: BinaryIO) -> None:
+        super().__init__()
+        self._raw = raw
+        self._block = bytearray()
+        self._executor = ThreadPoolExecutor(max_workers=COMPRESSION_THREADS, thread_name_prefix="gitingest-gzip")
+        self._pending: Deque[Future] = deque()
+        self._members = 0
+        self._written = 0
+        self.member_offsets: List[int] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._block += data
+        while len(self._block) >= COMPRESSION_BLOCK_SIZE:
+            self._submit(bytes(self._block[:COMPRESSION_BLOCK_SIZE]))
+            del self._block[:COMPRESSION_BLOCK_SIZE]
+        return len(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self._block or not self._members:
+                # An empty digest still gets one (empty) member, so the file is valid gzip
+                self._submit(bytes(self._block))
+                self._block.clear()
+            while self._pending:
+                self._write_member(self._pending.popleft().result())
+        finally:
+            self._executor.shutdown()
+            self._raw.close()
+            super().close()
+
+    def _submit(self, block: bytes) -> None:
+        if len(self._pending) >= COMPRESSION_THREADS:
+            self._write_member(self._pending.popleft().result())
+        self._pending.append(self._executor.submit(gzip.compress, block, GZIP_COMPRESSION_LEVEL))
+        self._members += 1
+
+    def _write_member(self, member: bytes) -> None:
+        self.member_offsets.append(self._written)
+        self._raw.write(member)
+        self._written += len(member)
@@ -0,0 +1,136 @@
+"""Bounded LRU cache of decoded file contents."""
+
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Tuple
+
+from gitingest.config import CONTENT_CACHE_MAX_BYTES
+from gitingest.utils.file_utils import FileContent
+
+_Signature = Tuple[int, int, Hashable]
+
+
+class ContentCache:
+    """
+    Byte-bounded LRU cache of decoded file contents.
+
+    Entries are keyed by path and validated against the file's modification time and size, so a file that changed
+    on disk is read again. A `variant` can be given to tell apart contents read from the same file with different
+    options. The cache is thread-safe and evicts the least recently used entries once the decoded
+    content it holds exceeds `max_bytes`.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The maximum amount of memory, in bytes, the cached contents may use.
+    """
+
+    def __init__(self, max_bytes: int = CONTENT_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[_Signature, FileContent, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_load(self, path: Path, loader: Callable[[], FileContent], variant: Hashable = None) -> FileContent:
+        """
+        Return the cached content of `path`, calling `loader` to read it on a miss.
+
+        Parameters
+        ----------
+        path : Path
+            The path of the file.
+        loader : Callable[[], FileContent]
+            A callable reading the file when it is not cached.
+        variant : Hashable
+            The options the content is read with; an entry read with other options is not reused, by default None.
+
+        Returns
+        -------
+        FileContent
+            The decoded content of the file.
+        """
+        try:
+            stat = path.stat()
+        except OSError:
+            return loader()
+
+        key = str(path)
+        signature = (stat.st_mtime_ns, stat.st_size, variant)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        content = loader()
+        self._put(key, signature, content)
+        return content
+
+    def clear(self) -> None:
+        """Remove all entries and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the cache counters.
+
+        Returns
+        -------
+        Dict[str, int]
+            The number of hits, misses, cached entries and bytes currently held.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _put(self, key: str, signature: _Signature, content: FileContent) -> None:
+        cost = sys.getsizeof(content.text)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+
+            # Entries that would fill the whole cache on their own are not worth keeping
+            if cost > self.max_bytes:
+                return
+
+            self._entries[key] = (signature, content, cost)
+            self.current_bytes += cost
+
+            while self.current_bytes > self.max_bytes:
+                _, (_, _, evicted_cost) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_cost
+
+
+_DEFAULT_CACHE = ContentCache()
+
+
+def get_content_cache() -> ContentCache:
+    """
+    Return the process-wide content cache shared by all file nodes.
+
+    Returns
+    -------
+    ContentCache
+        The shared content cache.
+    """
+    return _DEFAULT_CACHE
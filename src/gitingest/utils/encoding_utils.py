@@ -0,0 +1,197 @@
+"""Utility functions for detecting the text encoding of files."""
+
+import codecs
+import locale
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+ENCODING_SAMPLE_SIZE = 64 * 1024  # Number of leading bytes used to detect the encoding of a file
+MAX_CACHED_VERDICTS = 100_000  # Number of per-file encoding verdicts kept in memory
+
+_BOMS = (
+    # UTF-32 BOMs must be checked before UTF-16 ones, as they share a prefix
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# Legacy encodings to fall back to for files that are not valid UTF-8, by extension
+EXTENSION_ENCODING_HINTS = {
+    ".bat": "cp1252",
+    ".cmd": "cp1252",
+    ".ps1": "cp1252",
+    ".psm1": "cp1252",
+    ".reg": "cp1252",
+    ".vbs": "cp1252",
+    ".nfo": "cp437",
+}
+
+_C1_BYTES = re.compile(b"[\x80-\x9f]")
+# Bytes that are not valid in cp1252 and make it fall back to latin-1
+_CP1252_UNDEFINED = re.compile(b"[\x81\x8d\x8f\x90\x9d]")
+# Control characters that never appear in text files; every other byte is deleted before counting them
+_BINARY_CONTROLS = frozenset(range(0x20)).union({0x7F}).difference(b"\t\n\r\f\b\x1b")
+_NON_BINARY_CONTROLS = bytes(byte for byte in range(256) if byte not in _BINARY_CONTROLS)
+_MAX_CONTROL_RATIO = 0.1
+
+_BINARY = ""  # Cached verdict for binary files, distinct from a missing entry
+_verdicts: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_verdicts_lock = threading.Lock()
+
+
+def detect_encoding(sample: bytes, path: Optional[Path] = None, complete: bool = True) -> Optional[str]:
+    """
+    Detect the encoding of a file from a sample of its leading bytes.
+
+    Detection runs in three steps: byte order mark detection, strict UTF-8 validation of the sample, and a small
+    statistical fallback that tells legacy single-byte text apart from binary data.
+
+    Parameters
+    ----------
+    sample : bytes
+        The leading bytes of the file.
+    path : Path, optional
+        The path of the file, used for per-extension encoding hints.
+    complete : bool
+        Whether the sample holds the whole file. If not, a multi-byte character cut at the end of the sample is
+        tolerated, by default True.
+
+    Returns
+    -------
+    str, optional
+        The name of the detected encoding, or `None` if the sample looks like binary data.
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    if b"\x00" in sample or not _looks_like_text(sample):
+        return None
+
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=complete)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    return fallback_encoding(sample, path)
+
+
+def detect_file_encoding(
+    sample: bytes,
+    path: Path,
+    signature: Tuple[int, int],
+    complete: bool = True,
+) -> Optional[str]:
+    """
+    Detect the encoding of a file, reusing the verdict cached for its current version if there is one.
+
+    Parameters
+    ----------
+    sample : bytes
+        The leading bytes of the file.
+    path : Path
+        The path of the file.
+    signature : Tuple[int, int]
+        The modification time (in nanoseconds) and size of the file, which identify its current version.
+    complete : bool
+        Whether the sample holds the whole file, by default True.
+
+    Returns
+    -------
+    str, optional
+        The name of the detected encoding, or `None` if the file looks like binary data.
+    """
+    key = (str(path), *signature)
+    with _verdicts_lock:
+        verdict = _verdicts.get(key)
+        if verdict is not None:
+            _verdicts.move_to_end(key)
+            return verdict or None
+
+    encoding = detect_encoding(sample, path, complete=complete)
+    remember_encoding(path, signature, encoding)
+    return encoding
+
+
+def remember_encoding(path: Path, signature: Tuple[int, int], encoding: Optional[str]) -> None:
+    """
+    Cache the encoding verdict of a file.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the file.
+    signature : Tuple[int, int]
+        The modification time (in nanoseconds) and size of the file.
+    encoding : str, optional
+        The encoding of the file, or `None` if it is binary.
+    """
+    key = (str(path), *signature)
+    with _verdicts_lock:
+        _verdicts[key] = encoding or _BINARY
+        _verdicts.move_to_end(key)
+        if len(_verdicts) > MAX_CACHED_VERDICTS:
+            _verdicts.popitem(last=False)
+
+
+def fallback_encoding(sample: bytes, path: Optional[Path] = None) -> str:
+    """
+    Pick the single-byte encoding used to decode text that is not valid UTF-8.
+
+    Parameters
+    ----------
+    sample : bytes
+        The leading bytes of the file.
+    path : Path, optional
+        The path of the file, used for per-extension encoding hints.
+
+    Returns
+    -------
+    str
+        The name of the encoding to use.
+    """
+    if path is not None:
+        hint = EXTENSION_ENCODING_HINTS.get(path.suffix.lower())
+        if hint:
+            return hint
+
+    preferred = codecs.lookup(locale.getpreferredencoding(False)).name
+    if preferred not in ("utf-8", "ascii"):
+        try:
+            sample.decode(preferred)
+            return preferred
+        except (UnicodeDecodeError, LookupError):
+            pass
+
+    # cp1252 maps 0x80-0x9F to printable characters where latin-1 has C1 controls
+    if _C1_BYTES.search(sample) and not _CP1252_UNDEFINED.search(sample):
+        return "cp1252"
+
+    return "latin-1"
+
+
+def _looks_like_text(sample: bytes) -> bool:
+    """
+    Check whether a sample looks like text rather than binary data.
+
+    Parameters
+    ----------
+    sample : bytes
+        The leading bytes of the file.
+
+    Returns
+    -------
+    bool
+        True if control characters make up only a small share of the sample.
+    """
+    if not sample:
+        return True
+
+    controls = len(sample.translate(None, _NON_BINARY_CONTROLS))
+    return controls / len(sample) <= _MAX_CONTROL_RATIO
@@ -1,15 +1,125 @@
 """Utility functions for working with files and directories."""
 
+import codecs
+import hashlib
 import locale
+import mmap
+import os
 import platform
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple, Union
+
+from gitingest.utils.encoding_utils import (
+    ENCODING_SAMPLE_SIZE,
+    detect_file_encoding,
+    fallback_encoding,
+    remember_encoding,
+)
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
 try:
     locale.setlocale(locale.LC_ALL, "")
 except locale.Error:
     locale.setlocale(locale.LC_ALL, "C")
 
+MAGIC_NUMBER_SIZE = 16  # Number of leading bytes compared against known binary signatures
+MMAP_THRESHOLD = 1024 * 1024  # Files at least this large are memory-mapped instead of read into memory
+_SCAN_CHUNK_SIZE = 1024 * 1024  # Size of the slices scanned when counting newlines in a buffer
+
+_UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))  # Trailing bytes of a multi-byte UTF-8 character
+
+Buffer = Union[bytes, mmap.mmap]
+
+HASH_ALGORITHM = "xxh3_128" if xxhash is not None else "blake2b_128"  # Algorithm used by `hash_buffer`
+
+# Extensions of formats that are always binary; files with these are never opened
+BINARY_EXTENSIONS = frozenset(
+    {
+        # Images
+        ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".icns", ".tif", ".tiff", ".webp", ".avif", ".heic", ".psd",
+        # Audio and video
+        ".mp3", ".mp4", ".m4a", ".m4v", ".wav", ".flac", ".ogg", ".opus", ".avi", ".mov", ".mkv", ".webm",
+        # Fonts
+        ".ttf", ".otf", ".woff", ".woff2", ".eot",
+        # Archives and packages
+        ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".tar", ".jar", ".war", ".whl", ".egg", ".nupkg",
+        ".deb", ".rpm", ".dmg", ".iso", ".apk",
+        # Compiled code and native libraries
+        ".pyc", ".pyo", ".pyd", ".class", ".o", ".obj", ".a", ".lib", ".so", ".dll", ".dylib", ".exe", ".wasm",
+        # Databases and data containers
+        ".sqlite", ".sqlite3", ".db", ".parquet", ".feather", ".arrow", ".avro", ".orc", ".h5", ".hdf5", ".npy",
+        ".npz", ".pkl", ".pickle", ".pt", ".pth", ".onnx", ".safetensors", ".tflite",
+        # Documents
+        ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".odt", ".ods", ".odp",
+    }
+)
+
+# Signatures found at the start of common binary formats
+MAGIC_NUMBERS = (
+    b"\x89PNG\r\n\x1a\n",  # PNG
+    b"\xff\xd8\xff",  # JPEG
+    b"GIF87a",  # GIF
+    b"GIF89a",  # GIF
+    b"PK\x03\x04",  # ZIP (and jar, whl, docx, ...)
+    b"PK\x05\x06",  # Empty ZIP
+    b"\x7fELF",  # ELF
+    b"\xca\xfe\xba\xbe",  # Java class, Mach-O universal binary
+    b"\xcf\xfa\xed\xfe",  # Mach-O 64-bit
+    b"\xfe\xed\xfa\xce",  # Mach-O 32-bit
+    b"\x00asm",  # WebAssembly
+    b"\x1f\x8b",  # gzip
+    b"BZh",  # bzip2
+    b"\xfd7zXZ\x00",  # xz
+    b"\x28\xb5\x2f\xfd",  # zstd
+    b"7z\xbc\xaf\x27\x1c",  # 7-Zip
+    b"Rar!\x1a\x07",  # RAR
+    b"%PDF-",  # PDF
+    b"SQLite format 3\x00",  # SQLite
+    b"PAR1",  # Parquet
+    b"wOFF",  # WOFF
+    b"wOF2",  # WOFF2
+    b"OggS",  # Ogg
+    b"fLaC",  # FLAC
+    b"ID3",  # MP3
+)
+
+
+@dataclass
+class FileContent:
+    """
+    Decoded content of a file together with the metadata gathered while reading it.
+
+    Attributes
+    ----------
+    text : str
+        The decoded text, or a placeholder/error message if the file is not readable text.
+    is_text : bool
+        Whether the file was successfully decoded as text.
+    encoding : str, optional
+        The encoding used to decode the file, if any.
+    size : int
+        The size of the file in bytes.
+    line_count : int
+        The number of lines in the decoded text.
+    content_hash : str, optional
+        A hash of the raw bytes of the file, if it was requested and the file is text read in full.
+    sampled : bool
+        Whether only the head and tail of the file were read.
+    """
+
+    text: str
+    is_text: bool
+    encoding: Optional[str] = None
+    size: int = 0
+    line_count: int = 0
+    content_hash: Optional[str] = None
+    sampled: bool = False
+
 
 def get_preferred_encodings() -> List[str]:
     """
@@ -27,10 +137,245 @@ def get_preferred_encodings() -> List[str]:
     return encodings
 
 
+def load_file(path: Path, hash_content: bool = False) -> FileContent:
+    """
+    Read a file once, detect whether it is binary and decode it.
+
+    The file is read into memory a single time. The encoding is detected from the first bytes of that buffer (see
+    `detect_file_encoding`), which also tells binary files apart, and the buffer is then decoded once. Files of at
+    least `MMAP_THRESHOLD` bytes are memory-mapped instead: sniffing, hashing and newline counting run on the mapped
+    pages and the text is decoded straight from them, without an intermediate copy of the bytes.
+
+    Files with a known binary extension are reported as non-text from their metadata alone, without being opened.
+
+    Parameters
+    ----------
+    path : Path
+        The path to the file to read.
+    hash_content : bool
+        Whether to hash the raw bytes into `content_hash`, for deduplication and digest indexes (default is False).
+
+    Returns
+    -------
+    FileContent
+        The decoded content of the file and its metadata.
+    """
+    if has_binary_extension(path):
+        try:
+            size = path.stat().st_size
+        except OSError:
+            size = 0
+        return FileContent(text="[Non-text file]", is_text=False, size=size)
+
+    try:
+        with path.open("rb") as f:
+            stat = os.fstat(f.fileno())
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if stat.st_size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return _load_buffer(mapped, path, signature, hash_content)
+            if has_binary_magic(f.read(MAGIC_NUMBER_SIZE)):
+                return FileContent(text="[Non-text file]", is_text=False, size=stat.st_size)
+            f.seek(0)
+            data = f.read()
+    except (OSError, ValueError) as exc:
+        return FileContent(text=f"Error reading file: {exc}", is_text=False)
+
+    return _load_buffer(data, path, signature, hash_content)
+
+
+def load_file_sample(path: Path, head_size: int, tail_size: int) -> FileContent:
+    """
+    Read only the first `head_size` and last `tail_size` bytes of a file and decode them.
+
+    The middle of the file is skipped with a seek, so the I/O cost does not depend on the file size. Both slices are
+    trimmed to whole lines and joined with a marker telling how many bytes were left out. Files small enough to be
+    covered by the two slices are read in full with `load_file`.
+
+    Parameters
+    ----------
+    path : Path
+        The path to the file to read.
+    head_size : int
+        The number of leading bytes to read.
+    tail_size : int
+        The number of trailing bytes to read.
+
+    Returns
+    -------
+    FileContent
+        The decoded head and tail of the file, and its metadata.
+    """
+    if has_binary_extension(path):
+        return load_file(path)
+
+    try:
+        with path.open("rb") as f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            if size <= head_size + tail_size:
+                return load_file(path)
+            head = f.read(head_size)
+            f.seek(size - tail_size)
+            tail = f.read(tail_size)
+    except (OSError, ValueError) as exc:
+        return FileContent(text=f"Error reading file: {exc}", is_text=False)
+
+    if has_binary_magic(head[:MAGIC_NUMBER_SIZE]):
+        return FileContent(text="[Non-text file]", is_text=False, size=size)
+
+    signature = (stat.st_mtime_ns, size)
+    encoding = detect_file_encoding(head[:ENCODING_SAMPLE_SIZE], path, signature, complete=False)
+    if encoding is None:
+        return FileContent(text="[Non-text file]", is_text=False, size=size)
+
+    head_text, tail_text = _decode_sample(head, tail, encoding)
+    head_text, tail_text = _normalize_newlines(head_text), _normalize_newlines(tail_text)
+
+    # Cut both slices at line boundaries so that no partial line is shown
+    if "\n" in head_text:
+        head_text = head_text[: head_text.rindex("\n") + 1]
+    if "\n" in tail_text:
+        tail_text = tail_text[tail_text.index("\n") + 1 :]
+
+    omitted = size - len(head) - len(tail)
+    text = f"{head_text}\n[... {omitted:,} bytes omitted ...]\n\n{tail_text}"
+
+    return FileContent(
+        text=text,
+        is_text=True,
+        encoding=encoding,
+        size=size,
+        line_count=count_lines(text),
+        sampled=True,
+    )
+
+
+def hash_file(path: Path) -> str:
+    """
+    Hash the raw content of a file, memory-mapping it when it is large.
+
+    Parameters
+    ----------
+    path : Path
+        The path to the file to hash.
+
+    Returns
+    -------
+    str
+        The hexadecimal digest of the file content.
+    """
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return hash_buffer(mapped)
+        return hash_buffer(f.read())
+
+
+def hash_buffer(buffer: Buffer) -> str:
+    """
+    Hash a buffer without copying it.
+
+    The fast, non-cryptographic XXH3 hash is used when the optional `xxhash` package is installed; BLAKE2b is used
+    otherwise. Digests are only meant to be compared within a single process.
+
+    Parameters
+    ----------
+    buffer : Buffer
+        The bytes or memory-mapped file to hash.
+
+    Returns
+    -------
+    str
+        The hexadecimal digest of the buffer.
+    """
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(buffer)
+    return hashlib.blake2b(buffer, digest_size=16).hexdigest()
+
+
+def count_newlines(buffer: Buffer) -> int:
+    """
+    Count the lines of a raw buffer, scanning it in bounded slices.
+
+    Parameters
+    ----------
+    buffer : Buffer
+        The bytes or memory-mapped file to scan.
+
+    Returns
+    -------
+    int
+        The number of lines, counting a trailing line that has no newline.
+    """
+    size = len(buffer)
+    if not size:
+        return 0
+
+    newlines = 0
+    for start in range(0, size, _SCAN_CHUNK_SIZE):
+        newlines += buffer[start : start + _SCAN_CHUNK_SIZE].count(b"\n")
+
+    return newlines + (buffer[size - 1 : size] != b"\n")
+
+
+def count_lines(text: str) -> int:
+    """
+    Count the lines of a text without splitting it.
+
+    Parameters
+    ----------
+    text : str
+        The text whose lines are counted.
+
+    Returns
+    -------
+    int
+        The number of lines, counting a trailing line that has no newline.
+    """
+    if not text:
+        return 0
+    return text.count("\n") + (not text.endswith("\n"))
+
+
+def has_binary_extension(path: Path) -> bool:
+    """
+    Check whether a file has the extension of a format that is always binary.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the file.
+
+    Returns
+    -------
+    bool
+        True if the extension is listed in `BINARY_EXTENSIONS`.
+    """
+    return path.suffix.lower() in BINARY_EXTENSIONS
+
+
+def has_binary_magic(head: bytes) -> bool:
+    """
+    Check whether the first bytes of a file match the signature of a known binary format.
+
+    Parameters
+    ----------
+    head : bytes
+        The first bytes of the file (at least `MAGIC_NUMBER_SIZE` if the file is that large).
+
+    Returns
+    -------
+    bool
+        True if the bytes start with one of the `MAGIC_NUMBERS`.
+    """
+    return head.startswith(MAGIC_NUMBERS)
+
+
 def is_text_file(path: Path) -> bool:
     """
-    Determine if the file is likely a text file by trying to decode a small chunk
-    with multiple encodings, and checking for common binary markers.
+    Determine if the file is likely a text file by checking its extension and signature, then detecting the
+    encoding of its first bytes.
 
     Parameters
     ----------
@@ -42,33 +387,155 @@ def is_text_file(path: Path) -> bool:
     bool
         True if the file is likely textual; False if it appears to be binary.
     """
+    if has_binary_extension(path):
+        return False
 
-    # Attempt to read a portion of the file in binary mode
     try:
         with path.open("rb") as f:
-            chunk = f.read(1024)
+            sample = f.read(ENCODING_SAMPLE_SIZE)
+            stat = os.fstat(f.fileno())
     except OSError:
         return False
 
-    # If file is empty, treat as text
-    if not chunk:
-        return True
-
-    # Check obvious binary bytes
-    if b"\x00" in chunk or b"\xff" in chunk:
+    if has_binary_magic(sample[:MAGIC_NUMBER_SIZE]):
         return False
 
-    # Attempt multiple encodings
-    for enc in get_preferred_encodings():
+    signature = (stat.st_mtime_ns, stat.st_size)
+    return detect_file_encoding(sample, path, signature, complete=len(sample) == stat.st_size) is not None
+
+
+def _load_buffer(buffer: Buffer, path: Path, signature: Tuple[int, int], hash_content: bool) -> FileContent:
+    """
+    Detect the encoding of, decode and describe the raw content of a file.
+
+    Parameters
+    ----------
+    buffer : Buffer
+        The bytes or memory-mapped file holding the content.
+    path : Path
+        The path of the file.
+    signature : Tuple[int, int]
+        The modification time (in nanoseconds) and size of the file.
+    hash_content : bool
+        Whether to hash the raw bytes into `content_hash`.
+
+    Returns
+    -------
+    FileContent
+        The decoded content and its metadata.
+    """
+    size = len(buffer)
+    sample = buffer[:ENCODING_SAMPLE_SIZE]
+
+    if has_binary_magic(sample[:MAGIC_NUMBER_SIZE]):
+        return FileContent(text="[Non-text file]", is_text=False, size=size)
+
+    encoding = detect_file_encoding(sample, path, signature, complete=size <= ENCODING_SAMPLE_SIZE)
+    if encoding is None:
+        return FileContent(text="[Non-text file]", is_text=False, size=size)
+
+    text, decoded_with = _decode(buffer, encoding, sample, path)
+    if decoded_with != encoding:
+        remember_encoding(path, signature, decoded_with)
+
+    if decoded_with.startswith(("utf-16", "utf-32")) or buffer.find(b"\r") != -1:
+        # Newline bytes cannot be counted on the raw buffer for wide encodings, nor for lone carriage returns
+        line_count = count_lines(text)
+    else:
+        line_count = count_newlines(buffer)
+
+    return FileContent(
+        text=text,
+        is_text=True,
+        encoding=decoded_with,
+        size=size,
+        line_count=line_count,
+        content_hash=hash_buffer(buffer) if hash_content else None,
+    )
+
+
+def _decode_sample(head: bytes, tail: bytes, encoding: str) -> Tuple[str, str]:
+    """
+    Decode the head and tail slices of a file, whose boundaries may fall inside a multi-byte character.
+
+    Parameters
+    ----------
+    head : bytes
+        The leading bytes of the file.
+    tail : bytes
+        The trailing bytes of the file.
+    encoding : str
+        The encoding detected from the head.
+
+    Returns
+    -------
+    Tuple[str, str]
+        The decoded head and tail.
+    """
+    # A character cut at the end of the head is left pending in the incremental decoder and dropped
+    head_text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(head, final=False)
+
+    if encoding in ("utf-16", "utf-32"):
+        # The tail has no byte order mark: take the byte order from the head and realign on a code unit
+        width = 2 if encoding == "utf-16" else 4
+        byte_order = "le" if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF32_LE)) else "be"
+        encoding = f"{encoding}-{byte_order}"
+        tail = tail[len(tail) % width :]
+    elif codecs.lookup(encoding).name in ("utf-8", "utf-8-sig"):
+        # Skip the continuation bytes of a character cut at the start of the tail
+        tail = tail.lstrip(_UTF8_CONTINUATION_BYTES)
+        encoding = "utf-8"
+
+    return head_text, tail.decode(encoding, errors="replace")
+
+
+def _decode(data: Buffer, encoding: str, sample: bytes, path: Path) -> Tuple[str, str]:
+    """
+    Decode raw bytes with the detected encoding, falling back to a single-byte encoding on failure.
+
+    The detected encoding only reflects the sampled bytes, so the rest of the data may still be invalid for it.
+    Newlines are normalized to ``\n``, as when reading the file in text mode.
+
+    Parameters
+    ----------
+    data : Buffer
+        The raw content of a file.
+    encoding : str
+        The encoding detected from the sample.
+    sample : bytes
+        The leading bytes of the file.
+    path : Path
+        The path of the file.
+
+    Returns
+    -------
+    Tuple[str, str]
+        The decoded text and the encoding used.
+    """
+    for candidate in (encoding, fallback_encoding(sample, path)):
         try:
-            with path.open(encoding=enc) as f:
-                f.read()
-                return True
+            return _normalize_newlines(str(data, candidate)), candidate
         except UnicodeDecodeError:
             continue
-        except UnicodeError:
-            continue
-        except OSError:
-            return False
 
-    return False
+    # latin-1 maps every byte to a character and cannot fail
+    return _normalize_newlines(str(data, "latin-1")), "latin-1"
+
+
+def _normalize_newlines(text: str) -> str:
+    """
+    Translate ``\r\n`` and lone ``\r`` line endings to ``\n``, like Python's universal newlines mode.
+
+    Parameters
+    ----------
+    text : str
+        The decoded text.
+
+    Returns
+    -------
+    str
+        The text with ``\n`` line endings.
+    """
+    if "\r" not in text:
+        return text
+    return text.replace("\r\n", "\n").replace("\r", "\n")
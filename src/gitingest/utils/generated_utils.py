@@ -0,0 +1,144 @@
+"""Utility functions for telling machine-produced files (bundles, codegen output, lockfiles) apart from sources."""
+
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+GENERATED_SAMPLE_SIZE = 8 * 1024  # Number of leading bytes inspected to classify a file as generated
+GENERATED_POLICIES = ("keep", "sample", "skip")
+
+# Files that are always written by tools, whatever their content
+GENERATED_FILE_NAMES = frozenset(
+    {
+        "package-lock.json",
+        "npm-shrinkwrap.json",
+        "yarn.lock",
+        "pnpm-lock.yaml",
+        "bun.lockb",
+        "poetry.lock",
+        "pdm.lock",
+        "uv.lock",
+        "pipfile.lock",
+        "cargo.lock",
+        "composer.lock",
+        "gemfile.lock",
+        "go.sum",
+        "flake.lock",
+        "packages.lock.json",
+    }
+)
+
+# Prose formats, where long lines are expected and say nothing about how the file was produced
+_PROSE_EXTENSIONS = frozenset({".md", ".markdown", ".rst", ".txt", ".adoc", ".csv", ".tsv"})
+
+_MARKER_LINES = 10  # Number of leading lines searched for a generation marker
+# Markers are only trusted in comments, so that code or docs mentioning them are not flagged
+_COMMENT_PREFIXES = (b"#", b"//", b"/*", b"*", b"<!--", b"--", b";", b"%", b"'", b'"""')
+_MARKER = re.compile(
+    rb"@generated\b"
+    rb"|\b(?:auto-?)?generated (?:by|from|using|with)\b"
+    rb"|\b(?:file|code) (?:is |was )?(?:auto-?)?generated\b"
+    rb"|\bauto-?generated (?:file|code)\b"
+    rb"|\bdo not (?:edit|modify)\b",
+    re.IGNORECASE,
+)
+
+_MAX_AVERAGE_LINE_LENGTH = 300  # Bundled and minified code packs whole modules on a few lines
+_MAX_LINE_LENGTH = 4000
+_MAX_ENTROPY = 5.8  # Bits per byte; source code sits around 4.5-5, base64 and packed data around 6
+_MAX_NON_ASCII_RATIO = 0.05  # Non-Latin text also has a high byte entropy, so entropy is only checked on ASCII
+_NON_ASCII = bytes(range(128))  # Deleting these bytes leaves the non-ASCII ones
+_MIN_STATISTICS_SAMPLE = 1024  # Line length and entropy are not meaningful on smaller samples
+
+
+def detect_generated_file(path: Path) -> Optional[str]:
+    """
+    Tell whether a file looks generated, reading only its first `GENERATED_SAMPLE_SIZE` bytes.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the file.
+
+    Returns
+    -------
+    str, optional
+        The reason the file is considered generated, or `None` if it looks hand-written or cannot be read.
+    """
+    if path.name.lower() in GENERATED_FILE_NAMES:
+        return "lockfile"
+
+    try:
+        with path.open("rb") as f:
+            sample = f.read(GENERATED_SAMPLE_SIZE)
+    except OSError:
+        return None
+
+    return detect_generated(sample, path)
+
+
+def detect_generated(sample: bytes, path: Optional[Path] = None) -> Optional[str]:
+    """
+    Tell whether the leading bytes of a file look machine-produced.
+
+    Three cheap signals are checked: a generation marker in a leading comment (`@generated`, "generated by",
+    "DO NOT EDIT", ...), very long lines as found in bundled or minified code, and a byte entropy typical of embedded
+    base64 or packed data.
+
+    Parameters
+    ----------
+    sample : bytes
+        The leading bytes of the file.
+    path : Path, optional
+        The path of the file, used to recognise lockfiles and prose formats.
+
+    Returns
+    -------
+    str, optional
+        The reason the sample is considered generated, or `None` if it looks hand-written.
+    """
+    if path is not None and path.name.lower() in GENERATED_FILE_NAMES:
+        return "lockfile"
+
+    lines = sample.split(b"\n")
+    for line in lines[:_MARKER_LINES]:
+        stripped = line.strip()
+        if stripped.startswith(_COMMENT_PREFIXES) and _MARKER.search(stripped):
+            return "generation marker"
+
+    if len(sample) < _MIN_STATISTICS_SAMPLE:
+        return None
+
+    if path is None or path.suffix.lower() not in _PROSE_EXTENSIONS:
+        # The last line may be cut by the end of the sample
+        complete_lines = lines[:-1] or lines
+        longest = max(len(line) for line in complete_lines)
+        average = sum(len(line) for line in complete_lines) / len(complete_lines)
+        if longest > _MAX_LINE_LENGTH or average > _MAX_AVERAGE_LINE_LENGTH:
+            return "minified"
+
+    mostly_ascii = len(sample.translate(None, _NON_ASCII)) <= _MAX_NON_ASCII_RATIO * len(sample)
+    if mostly_ascii and _entropy(sample) > _MAX_ENTROPY:
+        return "high entropy"
+
+    return None
+
+
+def _entropy(sample: bytes) -> float:
+    """
+    Compute the Shannon entropy of a sample, in bits per byte.
+
+    Parameters
+    ----------
+    sample : bytes
+        The bytes to measure.
+
+    Returns
+    -------
+    float
+        The entropy of the byte distribution of the sample, between 0 and 8.
+    """
+    size = len(sample)
+    return -sum(count / size * math.log2(count / size) for count in Counter(sample).values())
@@ -1,24 +1,38 @@
 """Utilities for processing Jupyter notebooks."""
 
 import json
+import re
 import warnings
-from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
 
 from gitingest.utils.exceptions import InvalidNotebookError
 
+MAX_OUTPUT_CHARS = 10_000  # Maximum number of characters kept from a single cell output
+NOTEBOOK_READ_CHUNK_SIZE = 64 * 1024  # Number of characters read from the notebook at a time
 
-def process_notebook(file: Path, include_output: bool = True) -> str:
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING_RUN = re.compile(r'[^"\\]+')
+_SCALAR = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+_SCALAR_TOKEN = re.compile(r"[^,\]}\s]*")
+
+
+def process_notebook(file: Path, include_output: bool = True, max_output_chars: int = MAX_OUTPUT_CHARS) -> str:
     """
     Process a Jupyter notebook file and return an executable Python script as a string.
 
+    The notebook is parsed as a stream: cell metadata, attachments and non-text outputs (images, HTML, ...) are
+    skipped without being materialized, and each text output is capped to `max_output_chars` characters, so large
+    notebooks are converted in bounded memory.
+
     Parameters
     ----------
     file : Path
         The path to the Jupyter notebook file.
     include_output : bool
         Whether to include cell outputs in the generated script, by default True.
+    max_output_chars : int
+        The maximum number of characters kept from a single cell output, by default `MAX_OUTPUT_CHARS`.
 
     Returns
     -------
@@ -32,13 +46,12 @@ def process_notebook(file: Path, include_output: bool = True) -> str:
     """
     try:
         with file.open(encoding="utf-8") as f:
-            notebook: Dict[str, Any] = json.load(f)
+            cells, worksheet_cells = _read_notebook(_JSONStream(f), include_output, max_output_chars)
     except json.JSONDecodeError as exc:
         raise InvalidNotebookError(f"Invalid JSON in notebook: {file}") from exc
 
     # Check if the notebook contains worksheets
-    worksheets = notebook.get("worksheets")
-    if worksheets:
+    if worksheet_cells:
         warnings.warn(
             "Worksheets are deprecated as of IPEP-17. Consider updating the notebook. "
             "(See: https://github.com/jupyter/nbformat and "
@@ -47,13 +60,13 @@ def process_notebook(file: Path, include_output: bool = True) -> str:
             DeprecationWarning,
         )
 
-        if len(worksheets) > 1:
+        if len(worksheet_cells) > 1:
             warnings.warn("Multiple worksheets detected. Combining all worksheets into a single script.", UserWarning)
 
-        cells = list(chain.from_iterable(ws["cells"] for ws in worksheets))
+        cells = [cell for ws_cells in worksheet_cells for cell in ws_cells]
 
-    else:
-        cells = notebook["cells"]
+    elif cells is None:
+        raise KeyError("cells")
 
     result = ["# Jupyter notebook converted to Python script."]
 
@@ -65,6 +78,115 @@ def process_notebook(file: Path, include_output: bool = True) -> str:
     return "\n\n".join(result) + "\n"
 
 
+def _read_notebook(
+    stream: "_JSONStream",
+    include_output: bool,
+    max_output_chars: int,
+) -> Tuple[Optional[List[Dict[str, Any]]], List[List[Dict[str, Any]]]]:
+    """
+    Read the cells of a notebook from a JSON stream.
+
+    Parameters
+    ----------
+    stream : _JSONStream
+        The JSON stream positioned at the start of the notebook.
+    include_output : bool
+        Whether to read cell outputs; if not, they are skipped.
+    max_output_chars : int
+        The maximum number of characters kept from a single cell output.
+
+    Returns
+    -------
+    Tuple[Optional[List[Dict[str, Any]]], List[List[Dict[str, Any]]]]
+        The top-level cells (or None if the notebook has none), and the cells of each worksheet.
+    """
+    cells = None
+    worksheet_cells = []
+
+    for key in stream.iter_object():
+        if key == "cells":
+            cells = [_read_cell(stream, include_output, max_output_chars) for _ in stream.iter_array()]
+        elif key == "worksheets":
+            for _ in stream.iter_array():
+                ws_cells = []
+                for ws_key in stream.iter_object():
+                    if ws_key == "cells":
+                        ws_cells = [_read_cell(stream, include_output, max_output_chars) for _ in stream.iter_array()]
+                    else:
+                        stream.skip_value()
+                worksheet_cells.append(ws_cells)
+        else:
+            stream.skip_value()
+
+    return cells, worksheet_cells
+
+
+def _read_cell(stream: "_JSONStream", include_output: bool, max_output_chars: int) -> Dict[str, Any]:
+    """
+    Read a notebook cell from a JSON stream, keeping only the fields used to convert it.
+
+    Parameters
+    ----------
+    stream : _JSONStream
+        The JSON stream positioned at the start of the cell.
+    include_output : bool
+        Whether to read the cell outputs; if not, they are skipped.
+    max_output_chars : int
+        The maximum number of characters kept from a single cell output.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The cell with its type, source and (optionally) outputs.
+    """
+    cell: Dict[str, Any] = {}
+    for key in stream.iter_object():
+        if key in ("cell_type", "source"):
+            cell[key] = stream.read_value()
+        elif key == "outputs" and include_output:
+            cell[key] = [_read_output(stream, max_output_chars) for _ in stream.iter_array()]
+        else:
+            stream.skip_value()
+    return cell
+
+
+def _read_output(stream: "_JSONStream", max_output_chars: int) -> Dict[str, Any]:
+    """
+    Read a cell output from a JSON stream, skipping everything but its plain-text representation.
+
+    Parameters
+    ----------
+    stream : _JSONStream
+        The JSON stream positioned at the start of the output.
+    max_output_chars : int
+        The maximum number of characters kept from the output.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The output with its type and its text, capped to `max_output_chars`.
+    """
+    output: Dict[str, Any] = {}
+    for key in stream.iter_object():
+        if key == "output_type":
+            output[key] = stream.read_value()
+        elif key in ("ename", "evalue"):
+            output[key] = "".join(stream.read_text(max_output_chars))
+        elif key == "text":
+            output[key] = stream.read_text(max_output_chars)
+        elif key == "data":
+            data = {}
+            for mime_type in stream.iter_object():
+                if mime_type == "text/plain":
+                    data[mime_type] = stream.read_text(max_output_chars)
+                else:
+                    stream.skip_value()
+            output[key] = data
+        else:
+            stream.skip_value()
+    return output
+
+
 def _process_cell(cell: Dict[str, Any], include_output: bool) -> Optional[str]:
     """
     Process a Jupyter notebook cell and return the cell content as a string.
@@ -146,9 +268,285 @@ def _extract_output(output: Dict[str, Any]) -> List[str]:
         return output["text"]
 
     if output_type in ("execute_result", "display_data"):
-        return output["data"]["text/plain"]
+        return output["data"].get("text/plain", [])
 
     if output_type == "error":
         return [f"Error: {output['ename']}: {output['evalue']}"]
 
     raise ValueError(f"Unknown output type: {output_type}")
+
+
+class _JSONStream:
+    """
+    Minimal pull parser reading JSON from a text stream in chunks.
+
+    Values can be skipped without being materialized, and strings can be read up to a maximum length, the rest being
+    discarded as it is scanned. Only the portion of the document currently being scanned is held in memory.
+
+    Parameters
+    ----------
+    f : TextIO
+        The text stream to read from.
+    """
+
+    def __init__(self, f: TextIO) -> None:
+        self._f = f
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Iterate over the keys of a JSON object; the caller must consume each value before the next iteration.
+
+        Yields
+        ------
+        str
+            The key of each member of the object.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            if self._peek() != '"':
+                self._error("Expecting property name enclosed in double quotes")
+            key = self._read_string()
+            self._expect(":")
+            yield key
+            if not self._separator("}"):
+                return
+
+    def iter_array(self) -> Iterator[None]:
+        """
+        Iterate over the elements of a JSON array; the caller must consume each element before the next iteration.
+
+        Yields
+        ------
+        None
+            Once per element, with the stream positioned at the start of the element.
+        """
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            if not self._separator("]"):
+                return
+
+    def read_value(self) -> Any:
+        """
+        Read and return the next JSON value.
+
+        Returns
+        -------
+        Any
+            The decoded value.
+        """
+        char = self._peek()
+        if char == '"':
+            return self._read_string()
+        if char == "{":
+            return {key: self.read_value() for key in self.iter_object()}
+        if char == "[":
+            return [self.read_value() for _ in self.iter_array()]
+        return json.loads(self._read_scalar())
+
+    def read_text(self, max_chars: int) -> List[str]:
+        """
+        Read a string or a list of strings, keeping at most `max_chars` characters in total.
+
+        Parameters
+        ----------
+        max_chars : int
+            The maximum number of characters to keep.
+
+        Returns
+        -------
+        List[str]
+            The strings read, with a truncation notice appended if characters were dropped.
+        """
+        budget = max_chars
+        lines = []
+        truncated = False
+
+        if self._peek() == "[":
+            elements: Iterator[None] = self.iter_array()
+        else:
+            elements = iter([None])
+
+        for _ in elements:
+            if self._peek() != '"':
+                self.skip_value()
+                continue
+            if budget <= 0:
+                self._skip_string()
+                truncated = True
+                continue
+            text, cut = self._read_capped_string(budget)
+            budget -= len(text)
+            truncated = truncated or cut
+            lines.append(text)
+
+        if truncated:
+            lines.append(f"[... output truncated to {max_chars:,} characters]")
+        return lines
+
+    def skip_value(self) -> None:
+        """Skip the next JSON value without materializing it."""
+        char = self._peek()
+        if char == '"':
+            self._skip_string()
+        elif char == "{":
+            for _ in self.iter_object():
+                self.skip_value()
+        elif char == "[":
+            for _ in self.iter_array():
+                self.skip_value()
+        else:
+            self._read_scalar()
+
+    def _read_string(self) -> str:
+        """
+        Read a JSON string.
+
+        Returns
+        -------
+        str
+            The decoded string.
+        """
+        self._expect('"')
+        parts = []
+        while True:
+            segment = self._string_segment()
+            if segment is None:
+                return json.loads('"' + "".join(parts) + '"')
+            parts.append(segment)
+
+    def _read_capped_string(self, max_chars: int) -> Tuple[str, bool]:
+        """
+        Read a JSON string, keeping only its first `max_chars` characters and scanning past the rest.
+
+        Parameters
+        ----------
+        max_chars : int
+            The maximum number of characters to keep.
+
+        Returns
+        -------
+        Tuple[str, bool]
+            The decoded (possibly truncated) string, and whether characters were dropped.
+        """
+        self._expect('"')
+        parts = []
+        kept = 0
+        truncated = False
+
+        while True:
+            segment = self._string_segment()
+            if segment is None:
+                break
+            if kept >= max_chars:
+                truncated = True
+                continue
+            parts.append(segment)
+            kept += len(segment)
+
+        text = json.loads('"' + "".join(parts) + '"')
+        if len(text) > max_chars:
+            text, truncated = text[:max_chars], True
+        if truncated and text and "\ud800" <= text[-1] <= "\udbff":
+            # Do not leave half of a surrogate pair behind
+            text = text[:-1]
+        return text, truncated
+
+    def _skip_string(self) -> None:
+        self._expect('"')
+        while self._string_segment() is not None:
+            pass
+
+    def _string_segment(self) -> Optional[str]:
+        """
+        Return the next raw segment of the string being scanned, or None once its closing quote is consumed.
+
+        Returns
+        -------
+        str, optional
+            A run of unescaped characters or a single escape sequence, still JSON-encoded.
+        """
+        if not self._ensure(1):
+            self._error("Unterminated string")
+
+        char = self._buf[self._pos]
+        if char == '"':
+            self._pos += 1
+            return None
+
+        if char == "\\":
+            length = 6 if self._ensure(2) and self._buf[self._pos + 1] == "u" else 2
+            if not self._ensure(length):
+                self._error("Unterminated string")
+            segment = self._buf[self._pos : self._pos + length]
+            self._pos += length
+            return segment
+
+        match = _STRING_RUN.match(self._buf, self._pos)
+        if match is None:
+            self._error("Invalid string")
+        self._pos = match.end()
+        return match.group()
+
+    def _read_scalar(self) -> str:
+        while True:
+            match = _SCALAR_TOKEN.match(self._buf, self._pos)
+            # A scalar ends at the next delimiter, which may not have been read yet
+            if match.end() < len(self._buf) or not self._fill():
+                break
+        if _SCALAR.fullmatch(match.group()) is None:
+            self._error("Expecting value")
+        self._pos = match.end()
+        return match.group()
+
+    def _separator(self, closing: str) -> bool:
+        char = self._peek()
+        self._pos += 1
+        if char == ",":
+            return True
+        if char == closing:
+            return False
+        self._pos -= 1
+        return self._error(f"Expecting ',' delimiter or '{closing}'")
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            self._error(f"Expecting '{char}'")
+        self._pos += 1
+
+    def _peek(self) -> str:
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _ensure(self, count: int) -> bool:
+        while len(self._buf) - self._pos < count:
+            if not self._fill():
+                return False
+        return True
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(NOTEBOOK_READ_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _error(self, message: str) -> Any:
+        raise json.JSONDecodeError(message, self._buf, self._pos)
@@ -0,0 +1,226 @@
+"""Cache local des fichiers BPE de tiktoken, pré-rempli et vérifié pour fonctionner sans accès réseau."""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from gitingest.config import TIKTOKEN_CACHE_DIR, TIKTOKEN_SEED_DIR
+
+# URL de téléchargement et empreinte SHA-256 des fichiers BPE, telles que déclarées par tiktoken
+TIKTOKEN_FILES: Dict[str, Tuple[str, str]] = {
+    "r50k_base": (
+        "https://openaipublic.blob.core.windows.net/encodings/r50k_base.tiktoken",
+        "306cd27f03c1a714eca7108e03d66b7dc042abe8c258b44c199a7ed9838dd930",
+    ),
+    "p50k_base": (
+        "https://openaipublic.blob.core.windows.net/encodings/p50k_base.tiktoken",
+        "94b5ca7dff4d00767bc256fdd1b27e5b17361d7b8a5f968547f9f23eb70d2069",
+    ),
+    "cl100k_base": (
+        "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken",
+        "223921b76ee99bde995b7ff738513eef100fb51d18c93597a113bcffe865b2a7",
+    ),
+    "o200k_base": (
+        "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken",
+        "446a9538cb6c348e3516120d7c08b09f57c36495e2acfffe59a5bf8b0cfb1a2d",
+    ),
+}
+
+_checked: Dict[str, bool] = {}
+_lock = threading.Lock()
+
+
+def configure_tiktoken_cache() -> Path:
+    """
+    Fait pointer tiktoken vers le cache de gitingest, sauf si `TIKTOKEN_CACHE_DIR` est déjà défini.
+
+    Sans cette variable, tiktoken met ses fichiers dans un dossier temporaire, vidé à chaque nouveau conteneur. Si le
+    dossier de gitingest ne peut pas être créé, tiktoken garde son dossier temporaire.
+
+    Retourne
+    -------
+    Path
+        Le dossier de cache effectivement utilisé par tiktoken.
+    """
+    if "TIKTOKEN_CACHE_DIR" not in os.environ:
+        try:
+            os.makedirs(TIKTOKEN_CACHE_DIR, exist_ok=True)
+            os.environ["TIKTOKEN_CACHE_DIR"] = str(TIKTOKEN_CACHE_DIR)
+        except OSError:
+            return Path(tempfile.gettempdir()) / "data-gym-cache"
+    return Path(os.environ["TIKTOKEN_CACHE_DIR"])
+
+
+def cached_file_path(encoding_name: str, cache_dir: Optional[Path] = None) -> Path:
+    """
+    Renvoie le chemin sous lequel tiktoken cherche le fichier BPE d'un encodage.
+
+    tiktoken nomme ses fichiers de cache d'après l'empreinte SHA-1 de leur URL.
+
+    Paramètres
+    ----------
+    encoding_name : str
+        Nom de l'encodage (clé de `TIKTOKEN_FILES`).
+    cache_dir : Path, optional
+        Dossier de cache ; par défaut celui configuré par `configure_tiktoken_cache`.
+
+    Retourne
+    -------
+    Path
+        Chemin du fichier dans le cache.
+    """
+    url, _ = TIKTOKEN_FILES[encoding_name]
+    return (cache_dir or configure_tiktoken_cache()) / hashlib.sha1(url.encode()).hexdigest()
+
+
+def verify_file(encoding_name: str, path: Path) -> bool:
+    """
+    Vérifie qu'un fichier BPE a l'empreinte SHA-256 attendue pour un encodage.
+
+    Paramètres
+    ----------
+    encoding_name : str
+        Nom de l'encodage (clé de `TIKTOKEN_FILES`).
+    path : Path
+        Chemin du fichier à vérifier.
+
+    Retourne
+    -------
+    bool
+        True si le fichier existe et n'est pas corrompu.
+    """
+    _, expected_hash = TIKTOKEN_FILES[encoding_name]
+    digest = hashlib.sha256()
+    try:
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    except OSError:
+        return False
+    return digest.hexdigest() == expected_hash
+
+
+def ensure_cached(encoding_name: str, seed_dir: Optional[Path] = None, download: bool = False) -> str:
+    """
+    S'assure que le fichier BPE d'un encodage est présent et intact dans le cache.
+
+    Un fichier absent ou corrompu est copié depuis `seed_dir` (fichier `<encodage>.tiktoken`), puis, si `download`
+    est vrai, téléchargé. Les écritures sont atomiques : un fichier du cache n'est jamais lu à moitié écrit.
+
+    Paramètres
+    ----------
+    encoding_name : str
+        Nom de l'encodage.
+    seed_dir : Path, optional
+        Dossier de fichiers `<encodage>.tiktoken` fournis hors ligne ; par défaut `TIKTOKEN_SEED_DIR`.
+    download : bool
+        Télécharger le fichier s'il n'est disponible nulle part en local, par défaut False.
+
+    Retourne
+    -------
+    str
+        "cached" si le cache était déjà valide, "seeded" ou "downloaded" s'il a été rempli, "missing" sinon
+        (tiktoken tentera alors lui-même le téléchargement), "unknown" pour un encodage hors de `TIKTOKEN_FILES`.
+    """
+    if encoding_name not in TIKTOKEN_FILES:
+        return "unknown"
+
+    target = cached_file_path(encoding_name)
+    if verify_file(encoding_name, target):
+        return "cached"
+
+    seed_dir = seed_dir or (Path(TIKTOKEN_SEED_DIR) if TIKTOKEN_SEED_DIR else None)
+    if seed_dir is not None:
+        source = seed_dir / f"{encoding_name}.tiktoken"
+        if verify_file(encoding_name, source):
+            with source.open("rb") as f:
+                _write_atomic(target, f)
+            return "seeded"
+
+    if download:
+        from tiktoken.load import read_file  # pylint: disable=import-outside-toplevel
+
+        url, expected_hash = TIKTOKEN_FILES[encoding_name]
+        contents = read_file(url)
+        if hashlib.sha256(contents).hexdigest() != expected_hash:
+            raise ValueError(f"Empreinte invalide pour le fichier BPE téléchargé depuis {url}")
+        _write_atomic(target, contents)
+        return "downloaded"
+
+    return "missing"
+
+
+def prepare_encoding(encoding_name: str) -> None:
+    """
+    Prépare le cache d'un encodage avant son premier chargement par tiktoken, une seule fois par processus.
+
+    Paramètres
+    ----------
+    encoding_name : str
+        Nom de l'encodage.
+    """
+    if _checked.get(encoding_name):
+        return
+    with _lock:
+        if not _checked.get(encoding_name):
+            try:
+                ensure_cached(encoding_name)
+            except OSError:
+                pass  # Cache en lecture seule : tiktoken se charge du fichier comme d'habitude
+            _checked[encoding_name] = True
+
+
+def seed_tiktoken_cache(
+    encoding_names: Iterable[str] = ("cl100k_base", "o200k_base"),
+    seed_dir: Optional[Path] = None,
+    download: bool = True,
+) -> Dict[str, str]:
+    """
+    Pré-remplit le cache de tiktoken, typiquement à la construction d'une image destinée à un réseau isolé.
+
+    Paramètres
+    ----------
+    encoding_names : Iterable[str]
+        Encodages à mettre en cache (par défaut : cl100k_base et o200k_base).
+    seed_dir : Path, optional
+        Dossier de fichiers `<encodage>.tiktoken` à copier plutôt que de les télécharger.
+    download : bool
+        Télécharger les fichiers introuvables dans `seed_dir`, par défaut True.
+
+    Retourne
+    -------
+    Dict[str, str]
+        État du cache pour chaque encodage (voir `ensure_cached`).
+    """
+    configure_tiktoken_cache()
+    return {name: ensure_cached(name, seed_dir=seed_dir, download=download) for name in encoding_names}
+
+
+def _write_atomic(target: Path, contents) -> None:
+    """
+    Écrit un fichier du cache via un fichier temporaire renommé, comme le fait tiktoken.
+
+    Paramètres
+    ----------
+    target : Path
+        Chemin du fichier à écrire.
+    contents : bytes ou fichier binaire
+        Contenu à écrire.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f"{target.name}.{uuid.uuid4()}.tmp")
+    try:
+        with tmp_path.open("wb") as f:
+            if isinstance(contents, bytes):
+                f.write(contents)
+            else:
+                shutil.copyfileobj(contents, f)
+        os.replace(tmp_path, target)
+    finally:
+        # Après un échec (disque plein, source illisible), le fichier temporaire ne doit pas rester dans le cache
+        tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,284 @@
+"""Cache persistant des nombres de tokens, indexé par l'empreinte git (blob SHA-1) des contenus et par encodage."""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+from gitingest.config import TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_PATH
+
+_SQL_BATCH = 500  # Clés par requête (SQLite limite le nombre de paramètres d'une requête)
+# Une entrée lue n'est datée à nouveau qu'une fois par jour, pour limiter les écritures
+_TOUCH_INTERVAL = 24 * 3600
+_EVICTION_RATIO = 0.9  # Une éviction ramène le cache à cette fraction de sa taille maximale
+_CONNECT_TIMEOUT = 5.0  # Secondes d'attente quand un autre processus écrit dans le cache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_counts (
+    blob_sha TEXT NOT NULL,
+    encoding TEXT NOT NULL,
+    framing TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (blob_sha, encoding, framing)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS token_counts_last_used ON token_counts (last_used);
+"""
+
+_default_cache: Optional["TokenCountCache"] = None
+_default_checked = False
+_default_lock = threading.Lock()
+
+
+class CachedCount(NamedTuple):
+    """
+    Nombre de tokens et de lignes d'un contenu, tel que stocké dans le cache.
+
+    Attributs
+    ----------
+    tokens : int
+        Nombre de tokens du contenu (ou du bloc de digest qui le contient, selon le cadrage).
+    lines : int
+        Nombre de lignes du contenu.
+    """
+
+    tokens: int
+    lines: int
+
+
+class TokenCountCache:
+    """
+    Cache SQLite des nombres de tokens, partagé entre les dépôts, les branches et les processus.
+
+    Les entrées sont indexées par le blob SHA-1 du contenu (celui que donnent `git hash-object` et `git ls-tree`
+    pour un fichier UTF-8), le nom de l'encodage et le cadrage du texte compté : "text" pour le contenu seul,
+    "block" pour le contenu tel qu'il apparaît dans un bloc de digest. Au-delà de `max_entries` entrées, les moins
+    récemment utilisées sont évincées. Le cache est utilisable depuis plusieurs threads ; une erreur SQLite (disque
+    plein, fichier corrompu, dossier en lecture seule) le désactive sans interrompre le comptage.
+
+    Paramètres
+    ----------
+    path : Union[str, Path]
+        Chemin du fichier SQLite, créé au besoin.
+    max_entries : int
+        Nombre maximal d'entrées, par défaut `TOKEN_CACHE_MAX_ENTRIES`.
+    """
+
+    def __init__(self, path: Union[str, Path], max_entries: int = TOKEN_CACHE_MAX_ENTRIES) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection: Optional[sqlite3.Connection] = sqlite3.connect(
+            self.path, timeout=_CONNECT_TIMEOUT, check_same_thread=False, isolation_level=None
+        )
+        try:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(_SCHEMA)
+            self._entries = self._connection.execute("SELECT COUNT(*) FROM token_counts").fetchone()[0]
+        except sqlite3.Error:
+            self._connection.close()
+            raise
+
+    def get_many(self, keys: Iterable[str], encoding_name: str, framing: str = "text") -> Dict[str, CachedCount]:
+        """
+        Cherche les nombres de tokens de plusieurs contenus.
+
+        Paramètres
+        ----------
+        keys : Iterable[str]
+            Blob SHA-1 des contenus (voir `text_blob_sha`).
+        encoding_name : str
+            Nom de l'encodage tiktoken.
+        framing : str
+            Cadrage du texte compté, "text" ou "block", par défaut "text".
+
+        Retourne
+        -------
+        Dict[str, CachedCount]
+            Les comptes trouvés, par clé ; les clés absentes du cache n'y figurent pas.
+        """
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, CachedCount] = {}
+        stale = []
+        now = int(time.time())
+        with self._lock:
+            if self._connection is None or not keys:
+                return found
+            try:
+                for start in range(0, len(keys), _SQL_BATCH):
+                    batch = keys[start : start + _SQL_BATCH]
+                    rows = self._connection.execute(
+                        "SELECT blob_sha, tokens, lines, last_used FROM token_counts "
+                        f"WHERE encoding = ? AND framing = ? AND blob_sha IN ({','.join('?' * len(batch))})",
+                        (encoding_name, framing, *batch),
+                    )
+                    for blob_sha, tokens, lines, last_used in rows:
+                        found[blob_sha] = CachedCount(tokens, lines)
+                        if last_used < now - _TOUCH_INTERVAL:
+                            stale.append((now, blob_sha, encoding_name, framing))
+                if stale:
+                    self._connection.executemany(
+                        "UPDATE token_counts SET last_used = ? WHERE blob_sha = ? AND encoding = ? AND framing = ?",
+                        stale,
+                    )
+            except sqlite3.Error:
+                self._disable()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries: Iterable[Tuple[str, CachedCount]], encoding_name: str, framing: str = "text") -> None:
+        """
+        Enregistre les nombres de tokens de plusieurs contenus, puis évince les entrées les plus anciennes au besoin.
+
+        Paramètres
+        ----------
+        entries : Iterable[Tuple[str, CachedCount]]
+            Blob SHA-1 et comptes de chaque contenu.
+        encoding_name : str
+            Nom de l'encodage tiktoken.
+        framing : str
+            Cadrage du texte compté, "text" ou "block", par défaut "text".
+        """
+        now = int(time.time())
+        rows = [(key, encoding_name, framing, count.tokens, count.lines, now) for key, count in entries]
+        with self._lock:
+            if self._connection is None or not rows:
+                return
+            try:
+                before = self._connection.total_changes
+                self._connection.execute("BEGIN")
+                self._connection.executemany("INSERT OR IGNORE INTO token_counts VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self._connection.execute("COMMIT")
+                self._entries += self._connection.total_changes - before
+                if self._entries > self.max_entries:
+                    self._evict()
+            except sqlite3.Error:
+                self._disable()
+
+    def get(self, key: str, encoding_name: str, framing: str = "text") -> Optional[CachedCount]:
+        """
+        Cherche le nombre de tokens d'un contenu (voir `get_many`).
+
+        Retourne
+        -------
+        CachedCount, optional
+            Les comptes du contenu, ou `None` s'il n'est pas dans le cache.
+        """
+        return self.get_many([key], encoding_name, framing).get(key)
+
+    def put(self, key: str, count: CachedCount, encoding_name: str, framing: str = "text") -> None:
+        """Enregistre le nombre de tokens d'un contenu (voir `put_many`)."""
+        self.put_many([(key, count)], encoding_name, framing)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Renvoie les compteurs du cache.
+
+        Retourne
+        -------
+        Dict[str, int]
+            Nombre de clés trouvées et manquantes depuis l'ouverture, et nombre d'entrées du cache.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+            }
+
+    def close(self) -> None:
+        """Ferme le fichier du cache ; les consultations suivantes ne trouvent plus rien."""
+        with self._lock:
+            self._disable()
+
+    def _evict(self) -> None:
+        """Supprime les entrées les moins récemment utilisées, jusqu'à `_EVICTION_RATIO` de la taille maximale."""
+        excess = self._entries - int(self.max_entries * _EVICTION_RATIO)
+        self._connection.execute(
+            "DELETE FROM token_counts WHERE (blob_sha, encoding, framing) IN "
+            "(SELECT blob_sha, encoding, framing FROM token_counts ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        # D'autres processus ont pu remplir le cache en même temps : le compte est relu plutôt que déduit
+        self._entries = self._connection.execute("SELECT COUNT(*) FROM token_counts").fetchone()[0]
+
+    def _disable(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except sqlite3.Error:
+                pass
+            self._connection = None
+
+
+def git_blob_sha(data: bytes) -> str:
+    """
+    Calcule l'empreinte d'un contenu comme git le fait pour un blob (`git hash-object`).
+
+    Paramètres
+    ----------
+    data : bytes
+        Le contenu brut.
+
+    Retourne
+    -------
+    str
+        Le SHA-1 hexadécimal de `blob <taille>\\0<contenu>`.
+    """
+    digest = hashlib.sha1(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def text_blob_sha(text: str) -> str:
+    """
+    Calcule la clé de cache d'un texte : le blob SHA-1 de son encodage UTF-8.
+
+    Pour un fichier UTF-8 lu en entier, c'est l'empreinte git du fichier ; pour tout autre texte (fichier décodé
+    depuis un autre jeu de caractères, extrait, texte de remplacement), c'est une clé propre à ce texte.
+
+    Paramètres
+    ----------
+    text : str
+        Le texte.
+
+    Retourne
+    -------
+    str
+        L'empreinte hexadécimale du texte.
+    """
+    return git_blob_sha(text.encode("utf-8", errors="surrogatepass"))
+
+
+def get_token_cache() -> Optional[TokenCountCache]:
+    """
+    Renvoie le cache de tokens du processus, ouvert au premier appel depuis `TOKEN_CACHE_PATH`.
+
+    Retourne
+    -------
+    TokenCountCache, optional
+        Le cache partagé, ou `None` s'il est désactivé (`TOKEN_CACHE_PATH` vide) ou ne peut pas être ouvert.
+    """
+    global _default_cache, _default_checked  # pylint: disable=global-statement
+
+    if _default_checked:
+        return _default_cache
+    with _default_lock:
+        if not _default_checked:
+            if TOKEN_CACHE_PATH:
+                try:
+                    _default_cache = TokenCountCache(os.path.expanduser(TOKEN_CACHE_PATH))
+                except (OSError, sqlite3.Error):
+                    _default_cache = None  # Dossier en lecture seule ou fichier corrompu : pas de cache
+            _default_checked = True
+    return _default_cache
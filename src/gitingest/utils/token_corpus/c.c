@@ -0,0 +1,76 @@
+/* Growable byte buffer with printf-style appends. */
+#include <stdarg.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+typedef struct {
+    char *data;
+    size_t length;
+    size_t capacity;
+} buffer_t;
+
+int buffer_init(buffer_t *buf, size_t capacity)
+{
+    buf->data = malloc(capacity ? capacity : 16);
+    if (buf->data == NULL) {
+        return -1;
+    }
+    buf->length = 0;
+    buf->capacity = capacity ? capacity : 16;
+    buf->data[0] = '\0';
+    return 0;
+}
+
+static int buffer_reserve(buffer_t *buf, size_t extra)
+{
+    size_t needed = buf->length + extra + 1;
+    if (needed <= buf->capacity) {
+        return 0;
+    }
+    size_t capacity = buf->capacity * 2;
+    while (capacity < needed) {
+        capacity *= 2;
+    }
+    char *data = realloc(buf->data, capacity);
+    if (data == NULL) {
+        return -1;
+    }
+    buf->data = data;
+    buf->capacity = capacity;
+    return 0;
+}
+
+int buffer_append(buffer_t *buf, const char *text, size_t length)
+{
+    if (buffer_reserve(buf, length) != 0) {
+        return -1;
+    }
+    memcpy(buf->data + buf->length, text, length);
+    buf->length += length;
+    buf->data[buf->length] = '\0';
+    return 0;
+}
+
+int buffer_printf(buffer_t *buf, const char *format, ...)
+{
+    va_list args;
+    va_start(args, format);
+    int length = vsnprintf(NULL, 0, format, args);
+    va_end(args);
+    if (length < 0 || buffer_reserve(buf, (size_t)length) != 0) {
+        return -1;
+    }
+    va_start(args, format);
+    vsnprintf(buf->data + buf->length, buf->capacity - buf->length, format, args);
+    va_end(args);
+    buf->length += (size_t)length;
+    return length;
+}
+
+void buffer_free(buffer_t *buf)
+{
+    free(buf->data);
+    buf->data = NULL;
+    buf->length = buf->capacity = 0;
+}
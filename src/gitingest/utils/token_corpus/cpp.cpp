@@ -0,0 +1,62 @@
+// Least-recently-used cache built on a list and a hash map.
+#include <cstddef>
+#include <list>
+#include <optional>
+#include <unordered_map>
+#include <utility>
+
+template <typename Key, typename Value>
+class LruCache {
+public:
+    explicit LruCache(std::size_t capacity) : capacity_(capacity) {}
+
+    std::optional<Value> get(const Key& key) {
+        auto it = index_.find(key);
+        if (it == index_.end()) {
+            ++misses_;
+            return std::nullopt;
+        }
+        entries_.splice(entries_.begin(), entries_, it->second);
+        ++hits_;
+        return it->second->second;
+    }
+
+    void put(const Key& key, Value value) {
+        auto it = index_.find(key);
+        if (it != index_.end()) {
+            it->second->second = std::move(value);
+            entries_.splice(entries_.begin(), entries_, it->second);
+            return;
+        }
+        entries_.emplace_front(key, std::move(value));
+        index_[key] = entries_.begin();
+        if (entries_.size() > capacity_) {
+            index_.erase(entries_.back().first);
+            entries_.pop_back();
+        }
+    }
+
+    bool erase(const Key& key) {
+        auto it = index_.find(key);
+        if (it == index_.end()) {
+            return false;
+        }
+        entries_.erase(it->second);
+        index_.erase(it);
+        return true;
+    }
+
+    std::size_t size() const { return entries_.size(); }
+    double hit_rate() const {
+        const auto total = hits_ + misses_;
+        return total == 0 ? 0.0 : static_cast<double>(hits_) / static_cast<double>(total);
+    }
+
+private:
+    using Entry = std::pair<Key, Value>;
+    std::size_t capacity_;
+    std::list<Entry> entries_;
+    std::unordered_map<Key, typename std::list<Entry>::iterator> index_;
+    std::size_t hits_ = 0;
+    std::size_t misses_ = 0;
+};
@@ -0,0 +1,58 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading.Tasks;
+
+namespace Example.Billing
+{
+    public record Invoice(Guid Id, string Customer, decimal Amount, DateTime DueDate, bool Paid);
+
+    public interface IInvoiceStore
+    {
+        Task<IReadOnlyList<Invoice>> ListAsync(string customer);
+        Task SaveAsync(Invoice invoice);
+    }
+
+    public class ReminderService
+    {
+        private readonly IInvoiceStore _store;
+        private readonly Func<DateTime> _clock;
+
+        public ReminderService(IInvoiceStore store, Func<DateTime>? clock = null)
+        {
+            _store = store ?? throw new ArgumentNullException(nameof(store));
+            _clock = clock ?? (() => DateTime.UtcNow);
+        }
+
+        public async Task<IEnumerable<Invoice>> OverdueAsync(string customer)
+        {
+            var invoices = await _store.ListAsync(customer);
+            var today = _clock().Date;
+            return invoices
+                .Where(invoice => !invoice.Paid && invoice.DueDate.Date < today)
+                .OrderBy(invoice => invoice.DueDate);
+        }
+
+        public async Task<decimal> OutstandingAsync(string customer)
+        {
+            var invoices = await _store.ListAsync(customer);
+            return invoices.Where(invoice => !invoice.Paid).Sum(invoice => invoice.Amount);
+        }
+
+        public async Task<int> MarkPaidAsync(string customer, IEnumerable<Guid> ids)
+        {
+            var wanted = new HashSet<Guid>(ids);
+            var count = 0;
+            foreach (var invoice in await _store.ListAsync(customer))
+            {
+                if (!wanted.Contains(invoice.Id) || invoice.Paid)
+                {
+                    continue;
+                }
+                await _store.SaveAsync(invoice with { Paid = true });
+                count++;
+            }
+            return count;
+        }
+    }
+}
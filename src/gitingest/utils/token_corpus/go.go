@@ -0,0 +1,67 @@
+// Package ratelimit implements a token bucket limiter safe for concurrent use.
+package ratelimit
+
+import (
+	"context"
+	"errors"
+	"sync"
+	"time"
+)
+
+// ErrLimited is returned when a request cannot be served without waiting.
+var ErrLimited = errors.New("ratelimit: limited")
+
+// Bucket refills at a fixed rate up to its capacity.
+type Bucket struct {
+	mu       sync.Mutex
+	capacity float64
+	tokens   float64
+	rate     float64
+	last     time.Time
+	now      func() time.Time
+}
+
+// New returns a full bucket holding capacity tokens and refilling rate tokens per second.
+func New(capacity int, rate float64) *Bucket {
+	return &Bucket{capacity: float64(capacity), tokens: float64(capacity), rate: rate, last: time.Now(), now: time.Now}
+}
+
+func (b *Bucket) refill() {
+	now := b.now()
+	elapsed := now.Sub(b.last).Seconds()
+	b.last = now
+	b.tokens += elapsed * b.rate
+	if b.tokens > b.capacity {
+		b.tokens = b.capacity
+	}
+}
+
+// Allow takes n tokens if they are available right now.
+func (b *Bucket) Allow(n int) error {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	b.refill()
+	if b.tokens < float64(n) {
+		return ErrLimited
+	}
+	b.tokens -= float64(n)
+	return nil
+}
+
+// Wait blocks until n tokens are available or the context is done.
+func (b *Bucket) Wait(ctx context.Context, n int) error {
+	for {
+		if err := b.Allow(n); err == nil {
+			return nil
+		}
+		b.mu.Lock()
+		missing := float64(n) - b.tokens
+		b.mu.Unlock()
+		delay := time.Duration(missing / b.rate * float64(time.Second))
+		select {
+		case <-ctx.Done():
+			return ctx.Err()
+		case <-time.After(delay):
+		}
+	}
+}
@@ -0,0 +1,67 @@
+package com.example.inventory;
+
+import java.util.ArrayList;
+import java.util.Collections;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.Optional;
+
+/**
+ * In-memory inventory keeping stock levels per warehouse.
+ */
+public class Inventory {
+
+    private final Map<String, Map<String, Integer>> stock = new HashMap<>();
+
+    public void receive(String warehouse, String sku, int quantity) {
+        if (quantity <= 0) {
+            throw new IllegalArgumentException("quantity must be positive: " + quantity);
+        }
+        stock.computeIfAbsent(warehouse, key -> new HashMap<>()).merge(sku, quantity, Integer::sum);
+    }
+
+    public boolean ship(String warehouse, String sku, int quantity) {
+        Map<String, Integer> items = stock.get(warehouse);
+        if (items == null) {
+            return false;
+        }
+        int available = items.getOrDefault(sku, 0);
+        if (available < quantity) {
+            return false;
+        }
+        if (available == quantity) {
+            items.remove(sku);
+        } else {
+            items.put(sku, available - quantity);
+        }
+        return true;
+    }
+
+    public int total(String sku) {
+        int total = 0;
+        for (Map<String, Integer> items : stock.values()) {
+            total += items.getOrDefault(sku, 0);
+        }
+        return total;
+    }
+
+    public Optional<String> bestWarehouse(String sku) {
+        String best = null;
+        int bestQuantity = 0;
+        for (Map.Entry<String, Map<String, Integer>> entry : stock.entrySet()) {
+            int quantity = entry.getValue().getOrDefault(sku, 0);
+            if (quantity > bestQuantity) {
+                best = entry.getKey();
+                bestQuantity = quantity;
+            }
+        }
+        return Optional.ofNullable(best);
+    }
+
+    public List<String> warehouses() {
+        List<String> names = new ArrayList<>(stock.keySet());
+        Collections.sort(names);
+        return names;
+    }
+}
@@ -0,0 +1,66 @@
+// Debounced search box that fetches suggestions from the API.
+const DEFAULT_DELAY = 250;
+
+export function debounce(fn, delay = DEFAULT_DELAY) {
+  let timer = null;
+  return function debounced(...args) {
+    if (timer !== null) {
+      clearTimeout(timer);
+    }
+    timer = setTimeout(() => {
+      timer = null;
+      fn.apply(this, args);
+    }, delay);
+  };
+}
+
+export class SearchBox {
+  constructor(input, list, { endpoint = "/api/suggest", limit = 8 } = {}) {
+    this.input = input;
+    this.list = list;
+    this.endpoint = endpoint;
+    this.limit = limit;
+    this.controller = null;
+    this.input.addEventListener("input", debounce(() => this.update()));
+  }
+
+  async update() {
+    const query = this.input.value.trim();
+    if (query.length < 2) {
+      this.render([]);
+      return;
+    }
+    if (this.controller) {
+      this.controller.abort();
+    }
+    this.controller = new AbortController();
+    try {
+      const response = await fetch(`${this.endpoint}?q=${encodeURIComponent(query)}&limit=${this.limit}`, {
+        signal: this.controller.signal,
+      });
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+      const { items } = await response.json();
+      this.render(items);
+    } catch (error) {
+      if (error.name !== "AbortError") {
+        console.error("suggestion request failed", error);
+      }
+    }
+  }
+
+  render(items) {
+    this.list.innerHTML = "";
+    for (const item of items) {
+      const li = document.createElement("li");
+      li.textContent = item.label;
+      li.dataset.value = item.value;
+      li.addEventListener("click", () => {
+        this.input.value = item.label;
+        this.render([]);
+      });
+      this.list.appendChild(li);
+    }
+  }
+}
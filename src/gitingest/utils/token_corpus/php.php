@@ -0,0 +1,62 @@
+<?php
+
+declare(strict_types=1);
+
+namespace App\Http\Controllers;
+
+use App\Models\Article;
+use Illuminate\Http\JsonResponse;
+use Illuminate\Http\Request;
+
+final class ArticleController
+{
+    private const PER_PAGE = 20;
+
+    public function index(Request $request): JsonResponse
+    {
+        $query = Article::query()->where('published', true);
+
+        if ($tag = $request->query('tag')) {
+            $query->whereHas('tags', fn ($q) => $q->where('slug', $tag));
+        }
+
+        $articles = $query->orderByDesc('published_at')->paginate(self::PER_PAGE);
+
+        return new JsonResponse([
+            'data' => $articles->items(),
+            'page' => $articles->currentPage(),
+            'total' => $articles->total(),
+        ]);
+    }
+
+    public function store(Request $request): JsonResponse
+    {
+        $data = $request->validate([
+            'title' => ['required', 'string', 'max:200'],
+            'body' => ['required', 'string'],
+            'tags' => ['array'],
+            'tags.*' => ['string', 'max:40'],
+        ]);
+
+        $article = Article::create([
+            'title' => $data['title'],
+            'body' => $data['body'],
+            'author_id' => $request->user()->id,
+            'published' => false,
+        ]);
+        $article->syncTags($data['tags'] ?? []);
+
+        return new JsonResponse($article, 201);
+    }
+
+    public function publish(Article $article): JsonResponse
+    {
+        if ($article->published) {
+            return new JsonResponse(['message' => 'Already published.'], 409);
+        }
+
+        $article->forceFill(['published' => true, 'published_at' => now()])->save();
+
+        return new JsonResponse($article);
+    }
+}
@@ -0,0 +1,71 @@
+"""Small job queue backed by a SQLite table."""
+
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+
+@dataclass
+class Job:
+    id: int
+    name: str
+    payload: str
+    attempts: int = 0
+
+
+class JobQueue:
+    def __init__(self, path: str, max_attempts: int = 3) -> None:
+        self.connection = sqlite3.connect(path)
+        self.max_attempts = max_attempts
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY, name TEXT, payload TEXT, attempts INTEGER)"
+        )
+
+    def push(self, name: str, payload: str) -> int:
+        cursor = self.connection.execute(
+            "INSERT INTO jobs (name, payload, attempts) VALUES (?, ?, 0)", (name, payload)
+        )
+        self.connection.commit()
+        return cursor.lastrowid
+
+    def pop(self) -> Optional[Job]:
+        row = self.connection.execute(
+            "SELECT id, name, payload, attempts FROM jobs WHERE attempts < ? ORDER BY id LIMIT 1",
+            (self.max_attempts,),
+        ).fetchone()
+        if row is None:
+            return None
+        return Job(*row)
+
+    def fail(self, job: Job) -> None:
+        self.connection.execute("UPDATE jobs SET attempts = attempts + 1 WHERE id = ?", (job.id,))
+        self.connection.commit()
+
+    def done(self, job: Job) -> None:
+        self.connection.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+        self.connection.commit()
+
+    def drain(self, poll_interval: float = 0.5) -> Iterator[Job]:
+        while True:
+            job = self.pop()
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            yield job
+
+
+def run_worker(queue: JobQueue, handlers: dict) -> None:
+    for job in queue.drain():
+        handler = handlers.get(job.name)
+        if handler is None:
+            print(f"no handler for {job.name!r}, dropping job {job.id}")
+            queue.done(job)
+            continue
+        try:
+            handler(job.payload)
+        except Exception as exc:  # noqa: BLE001
+            print(f"job {job.id} failed: {exc}")
+            queue.fail(job)
+        else:
+            queue.done(job)
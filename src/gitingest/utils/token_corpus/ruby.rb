@@ -0,0 +1,58 @@
+# Tiny markdown-ish link checker for a documentation folder.
+require "net/http"
+require "uri"
+require "set"
+
+class LinkChecker
+  LINK_PATTERN = /\[([^\]]+)\]\(([^)]+)\)/.freeze
+
+  attr_reader :broken
+
+  def initialize(root, timeout: 5)
+    @root = root
+    @timeout = timeout
+    @checked = Set.new
+    @broken = []
+  end
+
+  def run
+    Dir.glob(File.join(@root, "**", "*.md")).sort.each do |path|
+      File.foreach(path).with_index(1) do |line, number|
+        line.scan(LINK_PATTERN) do |label, target|
+          check(path, number, label, target)
+        end
+      end
+    end
+    broken.empty?
+  end
+
+  private
+
+  def check(path, number, label, target)
+    return if target.start_with?("#", "mailto:")
+    return unless @checked.add?(target)
+
+    ok = target.start_with?("http") ? remote_ok?(target) : File.exist?(File.expand_path(target, File.dirname(path)))
+    @broken << "#{path}:#{number}: #{label} -> #{target}" unless ok
+  end
+
+  def remote_ok?(target)
+    uri = URI.parse(target)
+    Net::HTTP.start(uri.host, uri.port, use_ssl: uri.scheme == "https", open_timeout: @timeout) do |http|
+      response = http.head(uri.request_uri)
+      response.is_a?(Net::HTTPSuccess) || response.is_a?(Net::HTTPRedirection)
+    end
+  rescue StandardError
+    false
+  end
+end
+
+if $PROGRAM_NAME == __FILE__
+  checker = LinkChecker.new(ARGV.fetch(0, "docs"))
+  if checker.run
+    puts "all links ok"
+  else
+    puts checker.broken
+    exit 1
+  end
+end
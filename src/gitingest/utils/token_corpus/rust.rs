@@ -0,0 +1,61 @@
+//! Parse simple `key = value` configuration files.
+use std::collections::HashMap;
+use std::fmt;
+use std::fs;
+use std::path::Path;
+
+#[derive(Debug, PartialEq)]
+pub enum ConfigError {
+    Io(String),
+    Syntax { line: usize, message: String },
+    Duplicate(String),
+}
+
+impl fmt::Display for ConfigError {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        match self {
+            ConfigError::Io(message) => write!(f, "cannot read config: {}", message),
+            ConfigError::Syntax { line, message } => write!(f, "line {}: {}", line, message),
+            ConfigError::Duplicate(key) => write!(f, "duplicate key `{}`", key),
+        }
+    }
+}
+
+#[derive(Debug, Default)]
+pub struct Config {
+    values: HashMap<String, String>,
+}
+
+impl Config {
+    pub fn load(path: &Path) -> Result<Self, ConfigError> {
+        let text = fs::read_to_string(path).map_err(|e| ConfigError::Io(e.to_string()))?;
+        Self::parse(&text)
+    }
+
+    pub fn parse(text: &str) -> Result<Self, ConfigError> {
+        let mut values = HashMap::new();
+        for (index, raw) in text.lines().enumerate() {
+            let line = raw.trim();
+            if line.is_empty() || line.starts_with('#') {
+                continue;
+            }
+            let (key, value) = line.split_once('=').ok_or_else(|| ConfigError::Syntax {
+                line: index + 1,
+                message: "expected `key = value`".to_string(),
+            })?;
+            let key = key.trim().to_string();
+            if values.insert(key.clone(), value.trim().to_string()).is_some() {
+                return Err(ConfigError::Duplicate(key));
+            }
+        }
+        Ok(Config { values })
+    }
+
+    pub fn get(&self, key: &str) -> Option<&str> {
+        self.values.get(key).map(String::as_str)
+    }
+
+    pub fn get_or<T: std::str::FromStr>(&self, key: &str, default: T) -> T {
+        self.get(key).and_then(|value| value.parse().ok()).unwrap_or(default)
+    }
+}
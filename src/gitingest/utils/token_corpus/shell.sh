@@ -0,0 +1,41 @@
+#!/usr/bin/env bash
+# Back up a PostgreSQL database and keep the last N dumps.
+set -euo pipefail
+
+DB_NAME="${1:?usage: $0 <database> [backup-dir] [keep]}"
+BACKUP_DIR="${2:-/var/backups/postgres}"
+KEEP="${3:-7}"
+STAMP="$(date +%Y%m%d-%H%M%S)"
+TARGET="${BACKUP_DIR}/${DB_NAME}-${STAMP}.sql.gz"
+
+log() {
+    printf '[%s] %s\n' "$(date +%H:%M:%S)" "$*" >&2
+}
+
+cleanup() {
+    if [[ -f "${TARGET}.partial" ]]; then
+        rm -f "${TARGET}.partial"
+        log "removed partial dump"
+    fi
+}
+trap cleanup EXIT
+
+mkdir -p "${BACKUP_DIR}"
+log "dumping ${DB_NAME} to ${TARGET}"
+pg_dump --no-owner --format=plain "${DB_NAME}" | gzip -6 > "${TARGET}.partial"
+mv "${TARGET}.partial" "${TARGET}"
+log "dump size: $(du -h "${TARGET}" | cut -f1)"
+
+mapfile -t dumps < <(ls -1t "${BACKUP_DIR}/${DB_NAME}"-*.sql.gz 2>/dev/null)
+if (( ${#dumps[@]} > KEEP )); then
+    for old in "${dumps[@]:KEEP}"; do
+        log "deleting old dump ${old}"
+        rm -f -- "${old}"
+    done
+fi
+
+if command -v aws >/dev/null 2>&1 && [[ -n "${S3_BUCKET:-}" ]]; then
+    aws s3 cp "${TARGET}" "s3://${S3_BUCKET}/postgres/" --only-show-errors
+    log "uploaded to s3://${S3_BUCKET}/postgres/"
+fi
+log "done"
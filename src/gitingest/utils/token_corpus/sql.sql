@@ -0,0 +1,49 @@
+-- Schema and reporting queries for a small order system.
+CREATE TABLE customers (
+    id          BIGSERIAL PRIMARY KEY,
+    email       TEXT NOT NULL UNIQUE,
+    name        TEXT NOT NULL,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE orders (
+    id           BIGSERIAL PRIMARY KEY,
+    customer_id  BIGINT NOT NULL REFERENCES customers (id) ON DELETE CASCADE,
+    status       TEXT NOT NULL CHECK (status IN ('pending', 'paid', 'shipped', 'cancelled')),
+    total_cents  INTEGER NOT NULL CHECK (total_cents >= 0),
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX orders_customer_created_idx ON orders (customer_id, created_at DESC);
+
+-- Monthly revenue per status over the last year
+SELECT date_trunc('month', o.created_at) AS month,
+       o.status,
+       count(*) AS orders,
+       sum(o.total_cents) / 100.0 AS revenue
+FROM orders AS o
+WHERE o.created_at >= now() - INTERVAL '12 months'
+GROUP BY 1, 2
+ORDER BY 1 DESC, 2;
+
+-- Customers whose last order is older than 90 days
+SELECT c.id, c.email, max(o.created_at) AS last_order
+FROM customers AS c
+JOIN orders AS o ON o.customer_id = c.id
+GROUP BY c.id, c.email
+HAVING max(o.created_at) < now() - INTERVAL '90 days'
+ORDER BY last_order;
+
+-- Top ten customers by lifetime value, with their rank
+SELECT id, email, lifetime_value, rank() OVER (ORDER BY lifetime_value DESC) AS position
+FROM (
+    SELECT c.id, c.email, coalesce(sum(o.total_cents), 0) / 100.0 AS lifetime_value
+    FROM customers AS c
+    LEFT JOIN orders AS o ON o.customer_id = c.id AND o.status <> 'cancelled'
+    GROUP BY c.id, c.email
+) AS totals
+ORDER BY lifetime_value DESC
+LIMIT 10;
+
+UPDATE orders SET status = 'cancelled'
+WHERE status = 'pending' AND created_at < now() - INTERVAL '30 days';
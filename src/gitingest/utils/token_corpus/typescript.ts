@@ -0,0 +1,59 @@
+// Typed event emitter with once() and listener removal.
+type Listener<T> = (payload: T) => void;
+
+export interface Events {
+  connected: { id: string };
+  message: { from: string; body: string; sentAt: Date };
+  disconnected: { reason?: string };
+}
+
+export class Emitter<E extends Record<string, unknown>> {
+  private listeners: { [K in keyof E]?: Set<Listener<E[K]>> } = {};
+
+  on<K extends keyof E>(event: K, listener: Listener<E[K]>): () => void {
+    const set = this.listeners[event] ?? new Set<Listener<E[K]>>();
+    set.add(listener);
+    this.listeners[event] = set;
+    return () => this.off(event, listener);
+  }
+
+  once<K extends keyof E>(event: K, listener: Listener<E[K]>): () => void {
+    const off = this.on(event, (payload) => {
+      off();
+      listener(payload);
+    });
+    return off;
+  }
+
+  off<K extends keyof E>(event: K, listener: Listener<E[K]>): void {
+    this.listeners[event]?.delete(listener);
+  }
+
+  emit<K extends keyof E>(event: K, payload: E[K]): number {
+    const set = this.listeners[event];
+    if (!set) {
+      return 0;
+    }
+    for (const listener of [...set]) {
+      listener(payload);
+    }
+    return set.size;
+  }
+}
+
+export async function waitFor<K extends keyof Events>(
+  emitter: Emitter<Events>,
+  event: K,
+  timeoutMs = 5000,
+): Promise<Events[K]> {
+  return new Promise((resolve, reject) => {
+    const timer = setTimeout(() => {
+      off();
+      reject(new Error(`timed out waiting for ${String(event)}`));
+    }, timeoutMs);
+    const off = emitter.once(event, (payload) => {
+      clearTimeout(timer);
+      resolve(payload);
+    });
+  });
+}
@@ -1,7 +1,260 @@
 """Utilitaires pour le comptage et la gestion des tokens dans le contexte LLM."""
 
-from typing import List
-import tiktoken
+import math
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from gitingest.config import TOKEN_CACHE_MIN_CHARS
+from gitingest.utils.file_utils import count_lines
+from gitingest.utils.tiktoken_cache import prepare_encoding
+from gitingest.utils.token_cache import CachedCount, get_token_cache, text_blob_sha
+
+if TYPE_CHECKING:
+    from tiktoken import Encoding
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Corpus intégré de calibration : un fichier représentatif par langage de `TOKEN_RATIOS`
+CALIBRATION_CORPUS_DIR = Path(__file__).parent / "token_corpus"
+# Taille visée d'un échantillon de calibration : un bloc de lignes consécutives d'un fichier du corpus
+CALIBRATION_SAMPLE_CHARS = 512
+
+# Nombre moyen de caractères ASCII par token et erreur relative, par encodage et par langage, tels que les calcule
+# `calibrate_token_ratios` sur le corpus intégré ; l'erreur relative est le plus grand écart observé sur un de ses
+# échantillons. Les nombres exacts de tokens du corpus sont enregistrés dans tests/utils/token_corpus_counts.json :
+# les tests vérifient sans fichier BPE que la table est celle de la calibration et que chaque estimation d'un
+# fichier du corpus reste dans sa borne.
+TOKEN_RATIOS: Dict[str, Dict[str, Tuple[float, float]]] = {
+    "cl100k_base": {
+        "python": (4.4, 0.06),
+        "javascript": (4.42, 0.08),
+        "typescript": (3.93, 0.02),
+        "java": (4.85, 0.13),
+        "c": (3.5, 0.04),
+        "cpp": (4.09, 0.07),
+        "csharp": (5.23, 0.13),
+        "go": (3.76, 0.13),
+        "rust": (4.05, 0.18),
+        "ruby": (3.64, 0.05),
+        "php": (4.34, 0.01),
+        "shell": (3.09, 0.03),
+        "sql": (3.91, 0.12),
+        "html": (3.7, 0.15),
+        "css": (3.14, 0.03),
+        "json": (2.88, 0.01),
+        "yaml": (3.84, 0.08),
+        "markdown": (4.68, 0.05),
+        "text": (5.04, 0.06),
+        "other": (4.0, 0.47),
+    },
+    "o200k_base": {
+        "python": (4.37, 0.06),
+        "javascript": (4.3, 0.07),
+        "typescript": (3.9, 0.02),
+        "java": (4.69, 0.12),
+        "c": (3.49, 0.03),
+        "cpp": (4.09, 0.06),
+        "csharp": (5.16, 0.19),
+        "go": (3.79, 0.13),
+        "rust": (4.01, 0.2),
+        "ruby": (3.61, 0.04),
+        "php": (4.24, 0.01),
+        "shell": (3.06, 0.02),
+        "sql": (3.85, 0.12),
+        "html": (3.7, 0.15),
+        "css": (3.13, 0.03),
+        "json": (2.9, 0.01),
+        "yaml": (3.84, 0.08),
+        "markdown": (4.67, 0.06),
+        "text": (5.03, 0.05),
+        "other": (3.97, 0.54),
+    },
+}
+
+# Extensions reconnues pour choisir le ratio d'un fichier
+EXTENSION_LANGUAGES = {
+    ".py": "python", ".pyi": "python", ".ipynb": "python",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".java": "java", ".kt": "java", ".scala": "java",
+    ".c": "c", ".h": "c",
+    ".cc": "cpp", ".cpp": "cpp", ".cxx": "cpp", ".hpp": "cpp",
+    ".cs": "csharp",
+    ".go": "go",
+    ".rs": "rust",
+    ".rb": "ruby",
+    ".php": "php",
+    ".sh": "shell", ".bash": "shell", ".zsh": "shell", ".ps1": "shell",
+    ".sql": "sql",
+    ".html": "html", ".htm": "html", ".xml": "html", ".jinja": "html", ".vue": "html", ".svg": "html",
+    ".css": "css", ".scss": "css", ".less": "css",
+    ".json": "json",
+    ".yaml": "yaml", ".yml": "yaml", ".toml": "yaml", ".ini": "yaml", ".cfg": "yaml",
+    ".md": "markdown", ".rst": "markdown",
+    ".txt": "text",
+}
+
+CJK_TOKENS_PER_CHAR = 1.0  # Les idéogrammes et kana coûtent environ un token chacun
+NON_ASCII_TOKENS_PER_CHAR = 0.6  # Autres caractères non ASCII (accents, cyrillique, ...)
+NON_ASCII_RELATIVE_ERROR = 0.3
+
+_CJK = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+")
+
+# Registre des encodeurs : tiktoken n'est importé qu'au premier comptage, chaque encodeur n'est chargé qu'une fois
+_encodings: Dict[str, "Encoding"] = {}
+_model_encoding_names: Dict[str, str] = {}
+_encodings_lock = threading.Lock()
+
+# Caractères encodés par token voulu au premier essai d'une troncature (puis doublés)
+_TRUNCATION_CHARS_PER_TOKEN = 5
+# Tokens encodés au-delà de la coupe, pour qu'elle ne dépende pas du texte écarté
+_TRUNCATION_MARGIN_TOKENS = 8
+
+_background_executor: Optional[ThreadPoolExecutor] = None
+_background_lock = threading.Lock()
+
+
+@dataclass
+class TokenEstimate:
+    """
+    Estimation du nombre de tokens d'un texte.
+
+    Attributs
+    ----------
+    tokens : int
+        Nombre de tokens estimé.
+    error : int
+        Borne de l'erreur absolue de l'estimation (0 pour un comptage exact).
+    """
+
+    tokens: int
+    error: int = 0
+
+    def __add__(self, other: "TokenEstimate") -> "TokenEstimate":
+        return TokenEstimate(self.tokens + other.tokens, self.error + other.error)
+
+
+def get_encoding(encoding_name: str = DEFAULT_ENCODING) -> "Encoding":
+    """
+    Renvoie l'encodeur tiktoken d'un encodage, chargé une seule fois par processus.
+
+    tiktoken est importé au premier appel seulement : les commandes qui ne comptent pas de tokens n'en paient pas
+    le coût d'import. Le registre est protégé par un verrou et peut être utilisé depuis plusieurs threads. Le
+    fichier BPE de l'encodage est d'abord cherché dans le cache local de gitingest (voir
+    `gitingest.utils.tiktoken_cache`).
+
+    Paramètres
+    ----------
+    encoding_name : str
+        Nom de l'encodage tiktoken (par défaut : cl100k_base).
+
+    Retourne
+    -------
+    Encoding
+        L'encodeur tiktoken.
+
+    Lève
+    ------
+    ValueError
+        Si l'encodage est inconnu ou ne peut pas être chargé.
+    """
+    encoding = _encodings.get(encoding_name)
+    if encoding is not None:
+        return encoding
+
+    with _encodings_lock:
+        encoding = _encodings.get(encoding_name)
+        if encoding is None:
+            import tiktoken  # pylint: disable=import-outside-toplevel
+
+            prepare_encoding(encoding_name)
+            encoding = _encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+    return encoding
+
+
+def warm_up_encodings(encoding_names: Iterable[str] = (DEFAULT_ENCODING,)) -> Dict[str, Optional[str]]:
+    """
+    Charge des encodeurs à l'avance, pour que le premier comptage de tokens soit aussi rapide que les suivants.
+
+    Paramètres
+    ----------
+    encoding_names : Iterable[str]
+        Encodages à charger (par défaut : cl100k_base).
+
+    Retourne
+    -------
+    Dict[str, Optional[str]]
+        Pour chaque encodage, None s'il est prêt, sinon le message de l'erreur rencontrée.
+    """
+    errors: Dict[str, Optional[str]] = {}
+    for encoding_name in encoding_names:
+        try:
+            # Un premier encodage initialise aussi les structures internes de l'encodeur
+            get_encoding(encoding_name).encode_ordinary("warm up")
+            errors[encoding_name] = None
+        except (ValueError, OSError) as exc:
+            errors[encoding_name] = str(exc)
+    return errors
+
+
+def encoding_name_for_model(model_name: str) -> str:
+    """
+    Détermine l'encodage tiktoken d'un modèle.
+
+    L'encodage déclaré par le preset `LLMModelConfig` du modèle est prioritaire ; sinon celui que tiktoken associe
+    au nom du modèle, et `DEFAULT_ENCODING` pour les modèles que tiktoken ne connaît pas (Claude, Gemini, ...).
+
+    Paramètres
+    ----------
+    model_name : str
+        Nom du modèle (clé de `MODEL_CONFIGS` ou nom de modèle OpenAI).
+
+    Retourne
+    -------
+    str
+        Le nom de l'encodage à utiliser.
+    """
+    encoding_name = _model_encoding_names.get(model_name)
+    if encoding_name is not None:
+        return encoding_name
+
+    from gitingest.config.model_config import MODEL_CONFIGS  # pylint: disable=import-outside-toplevel
+
+    model_config = MODEL_CONFIGS.get(model_name)
+    if model_config is not None and model_config.encoding_name:
+        encoding_name = model_config.encoding_name
+    else:
+        import tiktoken.model  # pylint: disable=import-outside-toplevel
+
+        try:
+            encoding_name = tiktoken.model.encoding_name_for_model(model_name)
+        except KeyError:
+            encoding_name = DEFAULT_ENCODING
+
+    with _encodings_lock:
+        _model_encoding_names[model_name] = encoding_name
+    return encoding_name
+
+
+def get_model_encoding(model_name: str) -> "Encoding":
+    """
+    Renvoie l'encodeur tiktoken d'un modèle, à partir du registre.
+
+    Paramètres
+    ----------
+    model_name : str
+        Nom du modèle (clé de `MODEL_CONFIGS` ou nom de modèle OpenAI).
+
+    Retourne
+    -------
+    Encoding
+        L'encodeur tiktoken du modèle.
+    """
+    return get_encoding(encoding_name_for_model(model_name))
 
 
 def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
@@ -20,49 +273,170 @@ def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
     int
         Le nombre de tokens dans le texte.
     """
-    encoding = tiktoken.get_encoding(encoding_name)
-    return len(encoding.encode(text, disallowed_special=()))
+    if len(text) < TOKEN_CACHE_MIN_CHARS:
+        encoding = get_encoding(encoding_name)
+        return len(encoding.encode(text, disallowed_special=()))
+    return _count_tokens_cached([text], encoding_name)[0]
 
 
-def truncate_content(text: str, max_tokens: int, strategy: str = "end", encoding_name: str = "cl100k_base") -> str:
+def truncate_content(
+    text: str,
+    max_tokens: int,
+    strategy: str = "end",
+    encoding_name: str = "cl100k_base",
+    unit: str = "tokens",
+) -> str:
     """
-    Tronque intelligemment un texte pour ne pas dépasser un nombre de tokens donné.
+    Tronque intelligemment un texte pour ne pas dépasser un nombre de tokens (ou d'octets) donné.
 
     Stratégies disponibles :
     - "end" (par défaut) : conserve le début du texte
     - "start" : conserve la fin du texte
     - "middle" : conserve le début et la fin, coupe au milieu
 
+    Seules les extrémités conservées sont encodées, par fenêtres élargies jusqu'à contenir `max_tokens` tokens :
+    le coût est proportionnel à `max_tokens` et non à la longueur du texte. Le résultat est celui qu'on obtiendrait
+    en encodant le texte entier, sauf si un mot très long (plusieurs dizaines de tokens) chevauche la coupe.
+
     Paramètres
     ----------
     text : str
         Le texte à tronquer.
     max_tokens : int
-        Nombre maximal de tokens à conserver.
+        Nombre maximal de tokens (ou d'octets UTF-8, selon `unit`) à conserver.
     strategy : str
         Stratégie de troncature ('end', 'start', 'middle').
     encoding_name : str
-        Encodage tiktoken à utiliser.
+        Encodage tiktoken à utiliser (ignoré pour l'unité "bytes").
+    unit : str
+        Unité de `max_tokens` : "tokens" (par défaut) ou "bytes".
 
     Retourne
     -------
     str
         Le texte tronqué.
+
+    Lève
+    ------
+    ValueError
+        Si la stratégie ou l'unité est inconnue.
     """
-    encoding = tiktoken.get_encoding(encoding_name)
-    tokens = encoding.encode(text, disallowed_special=())
-    n = len(tokens)
-    if n <= max_tokens:
+    if strategy not in ("end", "start", "middle"):
+        raise ValueError(f"Stratégie inconnue : {strategy}")
+    if unit == "bytes":
+        return _truncate_bytes(text, max_tokens, strategy)
+    if unit != "tokens":
+        raise ValueError(f"Unité inconnue : {unit}")
+
+    encoding = get_encoding(encoding_name)
+    if strategy == "end":
+        head, complete = _encode_head(encoding, text, max_tokens)
+        return text if complete else encoding.decode(head)
+    if strategy == "start":
+        tail, complete = _encode_tail(encoding, text, max_tokens)
+        return text if complete else encoding.decode(tail)
+
+    half = max_tokens // 2
+    head, complete = _encode_head(encoding, text, half)
+    if complete:
+        return text
+    tail, complete = _encode_tail(encoding, text, max_tokens - half)
+    if complete or len(encoding.decode(head)) + len(encoding.decode(tail)) >= len(text):
+        # Les deux extrémités se rejoignent : le texte est assez court pour être encodé en entier
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:half] + tokens[-(max_tokens - half) :])
+    return encoding.decode(head + tail)
+
+
+def _encode_head(encoding: "Encoding", text: str, max_tokens: int) -> Tuple[List[int], bool]:
+    """
+    Encode le début d'un texte jusqu'à obtenir ses `max_tokens` premiers tokens.
+
+    Un préfixe est encodé, puis élargi tant qu'il ne contient pas `max_tokens` tokens plus une marge : les tokens
+    proches de la coupe peuvent dépendre du texte qui suit, ceux d'avant la marge non.
+
+    Paramètres
+    ----------
+    encoding : Encoding
+        Encodeur tiktoken.
+    text : str
+        Le texte à encoder.
+    max_tokens : int
+        Nombre de tokens voulus.
+
+    Retourne
+    -------
+    Tuple[List[int], bool]
+        Les `max_tokens` premiers tokens du texte (ou tous), et True si le texte en compte au plus `max_tokens`.
+    """
+    size = (max_tokens + _TRUNCATION_MARGIN_TOKENS) * _TRUNCATION_CHARS_PER_TOKEN
+    while True:
+        tokens = encoding.encode(text[:size], disallowed_special=())
+        if size >= len(text):
+            return tokens[:max_tokens], len(tokens) <= max_tokens
+        if len(tokens) > max_tokens + _TRUNCATION_MARGIN_TOKENS:
+            return tokens[:max_tokens], False
+        size *= 2
+
+
+def _encode_tail(encoding: "Encoding", text: str, max_tokens: int) -> Tuple[List[int], bool]:
+    """
+    Encode la fin d'un texte jusqu'à obtenir ses `max_tokens` derniers tokens (symétrique de `_encode_head`).
+
+    Paramètres
+    ----------
+    encoding : Encoding
+        Encodeur tiktoken.
+    text : str
+        Le texte à encoder.
+    max_tokens : int
+        Nombre de tokens voulus.
+
+    Retourne
+    -------
+    Tuple[List[int], bool]
+        Les `max_tokens` derniers tokens du texte (ou tous), et True si le texte en compte au plus `max_tokens`.
+    """
+    size = (max_tokens + _TRUNCATION_MARGIN_TOKENS) * _TRUNCATION_CHARS_PER_TOKEN
+    while True:
+        tokens = encoding.encode(text[-size:] if size < len(text) else text, disallowed_special=())
+        kept = tokens[-max_tokens:] if max_tokens else []
+        if size >= len(text):
+            return kept, len(tokens) <= max_tokens
+        if len(tokens) > max_tokens + _TRUNCATION_MARGIN_TOKENS:
+            return kept, False
+        size *= 2
+
+
+def _truncate_bytes(text: str, max_bytes: int, strategy: str) -> str:
+    """
+    Tronque un texte à un nombre d'octets UTF-8, sans couper de caractère ni encoder la partie écartée.
+
+    Paramètres
+    ----------
+    text : str
+        Le texte à tronquer.
+    max_bytes : int
+        Nombre maximal d'octets à conserver.
+    strategy : str
+        Stratégie de troncature ('end', 'start', 'middle').
+
+    Retourne
+    -------
+    str
+        Le texte tronqué.
+    """
+    # Un caractère occupe au moins un octet : un texte de plus de `max_bytes` caractères est toujours trop long
+    if len(text) <= max_bytes and len(text.encode("utf-8")) <= max_bytes:
         return text
     if strategy == "end":
-        return encoding.decode(tokens[:max_tokens])
-    elif strategy == "start":
-        return encoding.decode(tokens[-max_tokens:])
-    elif strategy == "middle":
-        half = max_tokens // 2
-        return encoding.decode(tokens[:half] + tokens[-(max_tokens - half):])
-    else:
-        raise ValueError(f"Stratégie inconnue : {strategy}")
+        return text[:max_bytes].encode("utf-8")[:max_bytes].decode("utf-8", "ignore")
+    if strategy == "start":
+        return text[-max_bytes:].encode("utf-8")[-max_bytes:].decode("utf-8", "ignore") if max_bytes else ""
+    half = max_bytes // 2
+    return _truncate_bytes(text, half, "end") + _truncate_bytes(text, max_bytes - half, "start")
 
 
 def estimate_context_tokens(texts: List[str], encoding_name: str = "cl100k_base") -> int:
@@ -81,5 +455,249 @@ def estimate_context_tokens(texts: List[str], encoding_name: str = "cl100k_base"
     int
         Nombre total de tokens pour l'ensemble du contexte.
     """
-    encoding = tiktoken.get_encoding(encoding_name)
-    return sum(len(encoding.encode(text, disallowed_special=())) for text in texts) 
\ No newline at end of file
+    return sum(_count_tokens_cached(texts, encoding_name))
+
+
+def _count_tokens_cached(texts: List[str], encoding_name: str) -> List[int]:
+    """
+    Compte les tokens de plusieurs textes, en reprenant du cache persistant ceux des textes déjà comptés.
+
+    Seuls les textes d'au moins `TOKEN_CACHE_MIN_CHARS` caractères sont cherchés dans le cache (voir
+    `gitingest.utils.token_cache`) ; les autres, et ceux qui n'y sont pas, sont encodés puis enregistrés.
+
+    Paramètres
+    ----------
+    texts : List[str]
+        Les textes à compter.
+    encoding_name : str
+        Nom de l'encodage tiktoken.
+
+    Retourne
+    -------
+    List[int]
+        Le nombre de tokens de chaque texte, dans l'ordre.
+    """
+    cache = get_token_cache()
+    keys = [
+        text_blob_sha(text) if cache is not None and len(text) >= TOKEN_CACHE_MIN_CHARS else None for text in texts
+    ]
+    cached = cache.get_many([key for key in keys if key], encoding_name) if cache is not None else {}
+
+    counts: List[int] = []
+    new: Dict[str, CachedCount] = {}
+    for text, key in zip(texts, keys):
+        if key in cached:
+            counts.append(cached[key].tokens)
+            continue
+        count = len(get_encoding(encoding_name).encode(text, disallowed_special=()))
+        if key is not None:
+            new[key] = CachedCount(count, count_lines(text))
+        counts.append(count)
+    if new:
+        cache.put_many(new.items(), encoding_name)
+    return counts
+
+
+def language_for_path(path: str) -> str:
+    """
+    Détermine le langage utilisé pour estimer les tokens d'un fichier à partir de son extension.
+
+    Paramètres
+    ----------
+    path : str
+        Chemin ou nom du fichier.
+
+    Retourne
+    -------
+    str
+        Clé de langage de `TOKEN_RATIOS` ("other" si l'extension est inconnue).
+    """
+    return EXTENSION_LANGUAGES.get(Path(path).suffix.lower(), "other")
+
+
+def approximate_tokens(text: str, language: str = "other", encoding_name: str = "cl100k_base") -> TokenEstimate:
+    """
+    Estime le nombre de tokens d'un texte sans l'encoder, à partir de statistiques sur ses caractères.
+
+    Les caractères ASCII sont convertis avec le ratio caractères/token du langage, les idéogrammes CJK et les
+    autres caractères non ASCII avec un coût fixe par caractère. Le coût est linéaire et bien inférieur à un
+    encodage BPE.
+
+    Paramètres
+    ----------
+    text : str
+        Le texte à analyser.
+    language : str
+        Clé de langage de `TOKEN_RATIOS` (voir `language_for_path`), par défaut "other".
+    encoding_name : str
+        Encodage tiktoken dont on approche le comptage (par défaut : cl100k_base).
+
+    Retourne
+    -------
+    TokenEstimate
+        Nombre de tokens estimé et borne d'erreur.
+    """
+    ratios = TOKEN_RATIOS.get(encoding_name, TOKEN_RATIOS["cl100k_base"])
+    chars_per_token, relative_error = ratios.get(language, ratios["other"])
+
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    non_ascii = len(text) - ascii_chars
+    cjk = non_ascii and len(text) - len(_CJK.sub("", text))
+
+    ascii_tokens = ascii_chars / chars_per_token
+    non_ascii_tokens = cjk * CJK_TOKENS_PER_CHAR + (non_ascii - cjk) * NON_ASCII_TOKENS_PER_CHAR
+    error = ascii_tokens * relative_error + non_ascii_tokens * NON_ASCII_RELATIVE_ERROR
+    return TokenEstimate(tokens=round(ascii_tokens + non_ascii_tokens), error=round(error))
+
+
+def estimate_tokens_from_size(
+    size: int,
+    language: str = "other",
+    encoding_name: str = "cl100k_base",
+) -> TokenEstimate:
+    """
+    Estime le nombre de tokens d'un fichier à partir de sa seule taille, sans le lire.
+
+    Chaque octet est compté comme un caractère ASCII ; l'estimation sert à planifier une lecture (par exemple pour
+    choisir les fichiers qui tiennent dans un budget), le comptage exact se faisant sur le texte lu.
+
+    Paramètres
+    ----------
+    size : int
+        Taille du fichier en octets.
+    language : str
+        Clé de langage de `TOKEN_RATIOS` (voir `language_for_path`), par défaut "other".
+    encoding_name : str
+        Encodage tiktoken dont on approche le comptage (par défaut : cl100k_base).
+
+    Retourne
+    -------
+    TokenEstimate
+        Nombre de tokens estimé et borne d'erreur.
+    """
+    ratios = TOKEN_RATIOS.get(encoding_name, TOKEN_RATIOS["cl100k_base"])
+    chars_per_token, relative_error = ratios.get(language, ratios["other"])
+    tokens = size / chars_per_token
+    return TokenEstimate(tokens=round(tokens), error=round(tokens * relative_error))
+
+
+def count_tokens_in_background(
+    texts: Callable[[], Iterable[str]],
+    encoding_name: str = "cl100k_base",
+) -> "Future[int]":
+    """
+    Lance le comptage exact des tokens en tâche de fond, sur un thread dédié.
+
+    Paramètres
+    ----------
+    texts : Callable[[], Iterable[str]]
+        Fonction renvoyant les textes à compter ; elle est appelée dans la tâche de fond, ce qui permet de relire
+        un fichier au lieu de garder son contenu en mémoire.
+    encoding_name : str
+        Encodage tiktoken à utiliser.
+
+    Retourne
+    -------
+    Future[int]
+        Future résolue avec le nombre total de tokens.
+    """
+    global _background_executor
+    with _background_lock:
+        if _background_executor is None:
+            _background_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gitingest-tokens")
+
+    def _count() -> int:
+        encoding = get_encoding(encoding_name)
+        return sum(len(encoding.encode_ordinary(text)) for text in texts())
+
+    return _background_executor.submit(_count)
+
+
+def calibration_samples(text: str) -> List[str]:
+    """
+    Découpe un texte du corpus de calibration en blocs de lignes d'environ `CALIBRATION_SAMPLE_CHARS` caractères.
+
+    Paramètres
+    ----------
+    text : str
+        Le texte à découper.
+
+    Retourne
+    -------
+    List[str]
+        Les échantillons, dans l'ordre du texte ; un reste trop court est rattaché au dernier.
+    """
+    samples: List[str] = []
+    lines: List[str] = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        lines.append(line)
+        size += len(line)
+        if size >= CALIBRATION_SAMPLE_CHARS:
+            samples.append("".join(lines))
+            lines, size = [], 0
+    if lines and samples and size < CALIBRATION_SAMPLE_CHARS // 2:
+        samples[-1] += "".join(lines)
+    elif lines:
+        samples.append("".join(lines))
+    return samples
+
+
+def calibrate_token_ratios(
+    paths: Optional[Iterable[Path]] = None,
+    encoding_name: str = "cl100k_base",
+    token_counts: Optional[Mapping[str, Sequence[int]]] = None,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Recalcule les ratios caractères/token de `TOKEN_RATIOS` sur un corpus de fichiers.
+
+    Chaque fichier est découpé en échantillons (`calibration_samples`). Pour chaque langage, le ratio est celui de
+    l'ensemble de ses échantillons et l'erreur relative le plus grand écart observé sur un échantillon, arrondi au
+    centième supérieur ; "other" est calibré sur tous les échantillons du corpus. Les ratios obtenus peuvent
+    remplacer ceux de `TOKEN_RATIOS[encoding_name]`.
+
+    Paramètres
+    ----------
+    paths : Iterable[Path], optional
+        Fichiers texte du corpus de calibration ; par défaut ceux de `CALIBRATION_CORPUS_DIR`.
+    encoding_name : str
+        Encodage tiktoken de référence.
+    token_counts : Mapping[str, Sequence[int]], optional
+        Nombres exacts de tokens des échantillons de chaque fichier, par nom de fichier, déjà mesurés avec
+        `encoding_name` ; les fichiers absents sont encodés.
+
+    Retourne
+    -------
+    Dict[str, Tuple[float, float]]
+        Ratio caractères ASCII/token et erreur relative, par langage.
+    """
+    if paths is None:
+        paths = sorted(path for path in CALIBRATION_CORPUS_DIR.iterdir() if path.is_file())
+    token_counts = token_counts or {}
+    samples: Dict[str, List[Tuple[int, float]]] = {"other": []}
+    for path in paths:
+        try:
+            texts = calibration_samples(path.read_text(encoding="utf-8"))
+        except (OSError, UnicodeDecodeError):
+            continue
+        counts = token_counts.get(path.name)
+        if counts is None:
+            encoding = get_encoding(encoding_name)
+            counts = [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+        for text, count in zip(texts, counts):
+            ascii_chars = len(text.encode("ascii", "ignore"))
+            non_ascii = len(text) - ascii_chars
+            cjk = non_ascii and len(text) - len(_CJK.sub("", text))
+            ascii_tokens = count - (cjk * CJK_TOKENS_PER_CHAR + (non_ascii - cjk) * NON_ASCII_TOKENS_PER_CHAR)
+            if ascii_chars and ascii_tokens > 0:
+                samples.setdefault(language_for_path(path.name), []).append((ascii_chars, ascii_tokens))
+                samples["other"].append((ascii_chars, ascii_tokens))
+
+    ratios = {}
+    for language, measures in samples.items():
+        if not measures:
+            continue
+        ratio = round(sum(chars for chars, _ in measures) / sum(tokens for _, tokens in measures), 2)
+        error = max(abs(chars / ratio - tokens) / tokens for chars, tokens in measures)
+        ratios[language] = (ratio, math.ceil(error * 100) / 100)
+    return ratios
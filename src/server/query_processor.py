@@ -1,14 +1,24 @@
 """Process a query by parsing input, cloning a repository, and generating a summary."""
 
+from concurrent.futures import Future
 from functools import partial
+from typing import Iterator
 
 from fastapi import Request
 from starlette.templating import _TemplateResponse
 
 from gitingest.cloning import clone_repo
-from gitingest.ingestion import ingest_query
+from gitingest.ingestion import ingest_query_to_file
 from gitingest.query_parsing import IngestionQuery, parse_query
-from server.server_config import EXAMPLE_REPOS, MAX_DISPLAY_SIZE, templates
+from gitingest.utils.compression import COMPRESSION_SUFFIXES, open_digest_reader
+from gitingest.utils.tokens import count_tokens_in_background
+from server.server_config import (
+    DIGEST_COMPRESSION,
+    EXACT_TOKEN_COUNT_IN_BACKGROUND,
+    EXAMPLE_REPOS,
+    MAX_DISPLAY_SIZE,
+    templates,
+)
 from server.server_utils import Colors, log_slider_to_size
 
 
@@ -81,14 +91,25 @@ async def process_query(
             include_patterns=include_patterns,
             ignore_patterns=exclude_patterns,
         )
+        # The page only shows a rough token count, so the digest is not encoded before responding
+        query.token_count_mode = "approximate"
         if not query.url:
             raise ValueError("The 'url' parameter is required.")
 
         clone_config = query.extract_clone_config()
         await clone_repo(clone_config)
-        summary, tree, content = ingest_query(query)
-        with open(f"{clone_config.local_path}.txt", "w", encoding="utf-8") as f:
-            f.write(tree + "\n" + content)
+        digest_path = f"{clone_config.local_path}.txt"
+        if DIGEST_COMPRESSION:
+            # Stored digests are compressed; the download route serves them as is to clients accepting it
+            digest_path += COMPRESSION_SUFFIXES[DIGEST_COMPRESSION]
+        # The offset index written next to the digest lets the download routes serve single files with a seek
+        summary, tree = ingest_query_to_file(query, digest_path, write_index=True)
+        # Only the part of the content that is displayed is read back from the digest file
+        with open_digest_reader(digest_path) as f:
+            f.read(len(tree) + 1)
+            content = f.read(MAX_DISPLAY_SIZE + 1)
+        if EXACT_TOKEN_COUNT_IN_BACKGROUND:
+            _log_exact_token_count(query.url, digest_path)
     except Exception as exc:
         # hack to print error message when query is not defined
         if "query" in locals() and query is not None and isinstance(query, dict):
@@ -201,3 +222,43 @@ def _print_success(url: str, max_file_size: int, pattern_type: str, pattern: str
     print(f"{Colors.GREEN}INFO{Colors.END}: {Colors.GREEN}<-  {Colors.END}", end="")
     _print_query(url, max_file_size, pattern_type, pattern)
     print(f" | {Colors.PURPLE}{estimated_tokens}{Colors.END}")
+
+
+def _log_exact_token_count(url: str, digest_path: str) -> "Future[int]":
+    """
+    Count the tokens of a digest file exactly in the background, and log the count once it is known.
+
+    Parameters
+    ----------
+    url : str
+        The URL associated with the query.
+    digest_path : str
+        The path of the digest file to count the tokens of.
+
+    Returns
+    -------
+    Future[int]
+        A future resolved with the number of tokens of the digest.
+    """
+
+    def _read_digest() -> Iterator[str]:
+        with open_digest_reader(digest_path) as f:
+            while True:
+                # Blocks end on a line boundary, so that no token is split between two of them
+                block = f.read(1024 * 1024) + f.readline()
+                if not block:
+                    return
+                yield block
+
+    def _log(future: "Future[int]") -> None:
+        try:
+            tokens = future.result()
+        except (OSError, ValueError) as exc:
+            print(f"{Colors.BROWN}WARN{Colors.END}: {Colors.RED}<-  {Colors.END}{url} | {Colors.RED}{exc}{Colors.END}")
+            return
+        print(f"{Colors.GREEN}INFO{Colors.END}: {Colors.GREEN}<-  {Colors.END}", end="")
+        print(f"{Colors.WHITE}{url:<20}{Colors.END} | {Colors.PURPLE}exact tokens: {tokens:,}{Colors.END}")
+
+    future = count_tokens_in_background(_read_digest)
+    future.add_done_callback(_log)
+    return future
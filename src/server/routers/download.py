@@ -1,61 +1,302 @@
 """This module contains the FastAPI router for downloading a digest file."""
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import Response
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from gitingest.config import TMP_BASE_PATH
+from gitingest.digest_index import DigestIndex, index_path_for
+from gitingest.utils.compression import (
+    COMPRESSION_SUFFIXES,
+    CONTENT_ENCODINGS,
+    compression_for_path,
+    open_digest_reader,
+)
+from server.server_config import MAX_DIGEST_RANGE_SIZE
 
 router = APIRouter()
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # Characters sent per chunk when a digest is decompressed on the fly
+
 
 @router.get("/download/{digest_id}")
-async def download_ingest(digest_id: str) -> Response:
+async def download_ingest(request: Request, digest_id: str) -> Response:
     """
     Download a .txt file associated with a given digest ID.
 
-    This function searches for a `.txt` file in a directory corresponding to the provided
-    digest ID. If a file is found, it is read and returned as a downloadable attachment.
-    If no `.txt` file is found, an error is raised.
+    This function searches for a digest file (`.txt`, or `.txt.gz` / `.txt.zst` if it was stored compressed) in a
+    directory corresponding to the provided digest ID. A compressed digest is sent as is, with a `Content-Encoding`
+    header, to clients that accept its encoding, and decompressed on the fly for the others.
 
     Parameters
     ----------
+    request : Request
+        The incoming request, whose `Accept-Encoding` header is checked.
     digest_id : str
         The unique identifier for the digest. It is used to find the corresponding directory
-        and locate the .txt file within that directory.
+        and locate the digest file within that directory.
 
     Returns
     -------
     Response
-        A FastAPI Response object containing the content of the found `.txt` file. The file is
+        A FastAPI Response object streaming the content of the digest file. The file is
         sent with the appropriate media type (`text/plain`) and the correct `Content-Disposition`
         header to prompt a file download.
 
     Raises
     ------
     HTTPException
-        If the digest directory is not found or if no `.txt` file exists in the directory.
+        If the digest directory is not found or if no digest file exists in the directory.
     """
-    directory = TMP_BASE_PATH / digest_id
+    directory = Path(TMP_BASE_PATH) / digest_id
 
     try:
         if not directory.exists():
             raise FileNotFoundError("Directory not found")
 
-        txt_files = [f for f in directory.iterdir() if f.suffix == ".txt"]
-        if not txt_files:
+        digest_files = [f for f in directory.iterdir() if _digest_name(f) is not None]
+        if not digest_files:
             raise FileNotFoundError("No .txt file found")
 
     except FileNotFoundError as exc:
         raise HTTPException(status_code=404, detail="Digest not found") from exc
 
-    # Find the first .txt file in the directory
-    first_file = txt_files[0]
+    # Find the first digest file in the directory
+    first_file = digest_files[0]
+    headers = {"Content-Disposition": f"attachment; filename={_digest_name(first_file)}"}
+
+    compression = compression_for_path(first_file)
+    if compression is None:
+        return FileResponse(first_file, media_type="text/plain", headers=headers)
+
+    headers["Vary"] = "Accept-Encoding"
+    content_encoding = CONTENT_ENCODINGS[compression]
+    if _accepts_encoding(request.headers.get("accept-encoding", ""), content_encoding):
+        headers["Content-Encoding"] = content_encoding
+        return FileResponse(first_file, media_type="text/plain", headers=headers)
+
+    return StreamingResponse(_iter_decompressed(first_file), media_type="text/plain", headers=headers)
+
+
+@router.get("/download/{digest_id}/index")
+def download_index(digest_id: str) -> FileResponse:
+    """
+    Download the offset index of a digest.
 
-    with first_file.open(encoding="utf-8") as f:
-        content = f.read()
+    The index lists the byte offset, length, token count and content hash of the block of each file in the digest,
+    so clients can fetch single files or ranges, and reuse the token counts instead of encoding the digest again.
+
+    Parameters
+    ----------
+    digest_id : str
+        The unique identifier for the digest.
+
+    Returns
+    -------
+    FileResponse
+        The JSON index of the digest.
 
-    return Response(
-        content=content,
-        media_type="text/plain",
-        headers={"Content-Disposition": f"attachment; filename={first_file.name}"},
-    )
+    Raises
+    ------
+    HTTPException
+        If the digest or its index is not found.
+    """
+    digest_file = _find_digest_file(digest_id)
+    index_path = index_path_for(digest_file)
+    if not index_path.is_file():
+        raise HTTPException(status_code=404, detail="Digest index not found")
+    return FileResponse(index_path, media_type="application/json")
+
+
+@router.get("/download/{digest_id}/files/{file_path:path}")
+def download_digest_file(digest_id: str, file_path: str, block: bool = False) -> Response:
+    """
+    Download the content of a single file of a digest, read with a seek through the offset index of the digest.
+
+    Parameters
+    ----------
+    digest_id : str
+        The unique identifier for the digest.
+    file_path : str
+        The path of the file, as shown in the digest.
+    block : bool
+        Whether to return the whole block of the file, with its path header, instead of its content only.
+
+    Returns
+    -------
+    Response
+        The content of the file as plain text, with its token count in the `X-Token-Count` header when known.
+
+    Raises
+    ------
+    HTTPException
+        If the digest, its index or the file is not found.
+    """
+    digest_index, digest_file = _load_index(digest_id)
+    entry = digest_index.find(file_path)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="File not found in digest")
+
+    if block:
+        content = digest_index.read_range(digest_file, entry.offset, entry.length)
+    else:
+        content = digest_index.read_range(digest_file, entry.content_offset, entry.content_length)
+    headers = {"X-Token-Count": str(entry.token_count)} if entry.token_count is not None else None
+    return Response(content=content, media_type="text/plain; charset=utf-8", headers=headers)
+
+
+@router.get("/download/{digest_id}/range")
+def download_digest_range(
+    digest_id: str,
+    offset: int = Query(ge=0),
+    length: int = Query(gt=0, le=MAX_DIGEST_RANGE_SIZE),
+) -> Response:
+    """
+    Download a range of bytes of a digest, read with a seek through the offset index of the digest.
+
+    Parameters
+    ----------
+    digest_id : str
+        The unique identifier for the digest.
+    offset : int
+        The offset of the range in the (decompressed) digest.
+    length : int
+        The number of bytes to return, at most `MAX_DIGEST_RANGE_SIZE`.
+
+    Returns
+    -------
+    Response
+        The bytes of the range, fewer than `length` if the digest ends before.
+
+    Raises
+    ------
+    HTTPException
+        If the digest or its index is not found.
+    """
+    digest_index, digest_file = _load_index(digest_id)
+    content = digest_index.read_range(digest_file, offset, length)
+    return Response(content=content, media_type="text/plain; charset=utf-8")
+
+
+def _find_digest_file(digest_id: str) -> Path:
+    """
+    Find the digest file stored for a digest ID.
+
+    Parameters
+    ----------
+    digest_id : str
+        The unique identifier for the digest.
+
+    Returns
+    -------
+    Path
+        The path of the first digest file in the directory of the digest.
+
+    Raises
+    ------
+    HTTPException
+        If the digest directory is not found or if no digest file exists in the directory.
+    """
+    directory = Path(TMP_BASE_PATH) / digest_id
+    if not directory.is_dir():
+        raise HTTPException(status_code=404, detail="Digest not found")
+
+    digest_file = next((f for f in directory.iterdir() if _digest_name(f) is not None), None)
+    if digest_file is None:
+        raise HTTPException(status_code=404, detail="Digest not found")
+    return digest_file
+
+
+def _load_index(digest_id: str) -> Tuple[DigestIndex, Path]:
+    """
+    Load the offset index of the digest stored for a digest ID.
+
+    Parameters
+    ----------
+    digest_id : str
+        The unique identifier for the digest.
+
+    Returns
+    -------
+    Tuple[DigestIndex, Path]
+        The index of the digest and the path of the digest file.
+
+    Raises
+    ------
+    HTTPException
+        If the digest or its index is not found.
+    """
+    digest_file = _find_digest_file(digest_id)
+    try:
+        digest_index = DigestIndex.load(index_path_for(digest_file))
+    except (OSError, ValueError) as exc:
+        raise HTTPException(status_code=404, detail="Digest index not found") from exc
+    return digest_index, digest_file
+
+
+def _digest_name(path: Path) -> Optional[str]:
+    """
+    Return the name of the plain-text digest a file holds, or `None` if it is not a digest file.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the file.
+
+    Returns
+    -------
+    str, optional
+        The file name without its compression suffix (e.g. `repo.txt` for `repo.txt.gz`), or `None`.
+    """
+    compression = compression_for_path(path)
+    name = path.name[: -len(COMPRESSION_SUFFIXES[compression])] if compression else path.name
+    return name if name.endswith(".txt") else None
+
+
+def _accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """
+    Check whether an `Accept-Encoding` header value accepts a content encoding.
+
+    Parameters
+    ----------
+    accept_encoding : str
+        The value of the `Accept-Encoding` request header.
+    encoding : str
+        The content encoding, e.g. "gzip".
+
+    Returns
+    -------
+    bool
+        True if the encoding (or `*`) is listed without a zero quality value.
+    """
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() not in (encoding, "*"):
+            continue
+        quality = params.strip()
+        return not quality.startswith("q=") or quality[2:].strip() not in ("0", "0.0", "0.00", "0.000")
+    return False
+
+
+def _iter_decompressed(path: Path) -> Iterator[str]:
+    """
+    Yield the decompressed content of a digest file, one chunk at a time.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the compressed digest file.
+
+    Yields
+    ------
+    str
+        The next chunk of the digest.
+    """
+    with open_digest_reader(path) as f:
+        while True:
+            chunk = f.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
@@ -1,11 +1,15 @@
 """Configuration for the server."""
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from fastapi.templating import Jinja2Templates
 
 MAX_DISPLAY_SIZE: int = 300_000
 DELETE_REPO_AFTER: int = 60 * 60  # In seconds
+EXACT_TOKEN_COUNT_IN_BACKGROUND: bool = True  # Log the exact token count once the approximate result is served
+DIGEST_COMPRESSION: Optional[str] = "gzip"  # Compression of stored digests: "gzip", "zstd" or None
+MAX_DIGEST_RANGE_SIZE: int = 10 * 1024 * 1024  # Largest byte range of a stored digest served in one request
+TOKENIZER_WARMUP_ENCODINGS: Tuple[str, ...] = ("cl100k_base",)  # Encodings loaded at startup (empty to disable)
 
 
 EXAMPLE_REPOS: List[Dict[str, str]] = [
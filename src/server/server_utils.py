@@ -14,7 +14,8 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
 from gitingest.config import TMP_BASE_PATH
-from server.server_config import DELETE_REPO_AFTER
+from gitingest.utils.tokens import warm_up_encodings
+from server.server_config import DELETE_REPO_AFTER, TOKENIZER_WARMUP_ENCODINGS
 
 # Initialize a rate limiter
 limiter = Limiter(key_func=get_remote_address)
@@ -53,6 +54,9 @@ async def lifespan(_: FastAPI):
     """
     Lifecycle manager for handling startup and shutdown events for the FastAPI application.
 
+    On startup, the encodings listed in `TOKENIZER_WARMUP_ENCODINGS` are loaded, so the first request does not pay
+    for loading them.
+
     Parameters
     ----------
     _ : FastAPI
@@ -65,6 +69,13 @@ async def lifespan(_: FastAPI):
     """
     task = asyncio.create_task(_remove_old_repositories())
 
+    if TOKENIZER_WARMUP_ENCODINGS:
+        loop = asyncio.get_running_loop()
+        errors = await loop.run_in_executor(None, warm_up_encodings, TOKENIZER_WARMUP_ENCODINGS)
+        for encoding_name, error in errors.items():
+            if error:
+                print(f"{Colors.BROWN}WARN{Colors.END}: Could not load the {encoding_name} encoding: {error}")
+
     yield
     # Cancel the background task on shutdown
     task.cancel()
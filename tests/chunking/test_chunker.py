@@ -0,0 +1,127 @@
+import gzip
+import re
+
+import pytest
+import tiktoken
+
+from gitingest.chunking import Document, chunk_digest, chunk_documents, chunk_repo_context
+from gitingest.chunking.boundaries import split_segments
+from gitingest.schemas import FileImportance, FileNode, FileType, RepoContext
+from gitingest.schemas.filesystem_schema import SEPARATOR
+from gitingest.utils import tokens
+
+_BLOCK = re.compile(
+    re.escape(SEPARATOR) + r"\n(?:FILE|SYMLINK): (\S+)(?: \(lines? [\d-]+\))?[^\n]*\n" + re.escape(SEPARATOR) + r"\n"
+)
+
+@pytest.fixture
+def encoding(monkeypatch):
+    # Petit encodeur BPE réel (octets + quelques fusions), utilisable sans télécharger de fichier BPE
+    ranks = {bytes([i]): i for i in range(256)}
+    for merge in [b"th", b"he", b"the", b" t", b" the", b"in", b"ing", b"de", b"def", b"  ", b"()"]:
+        ranks[merge] = len(ranks)
+    pattern = r"""[^\r\n\p{L}\p{N}]?+\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]++[\r\n]*|\s*[\r\n]|\s+(?!\S)|\s+"""
+    tiny = tiktoken.Encoding("tiny", pat_str=pattern, mergeable_ranks=ranks, special_tokens={})
+    monkeypatch.setitem(tokens._encodings, "tiny", tiny)
+    return tiny
+
+def _contents(chunks):
+    # Reconstitue le contenu de chaque fichier à partir des blocs (entiers ou partiels) des chunks
+    contents = {}
+    for chunk in chunks:
+        body = chunk.text[chunk.text.index(SEPARATOR):]
+        matches = list(_BLOCK.finditer(body))
+        for match, following in zip(matches, matches[1:] + [None]):
+            block = body[match.end():following.start() if following else len(body)]
+            assert block.endswith("\n\n")
+            contents[match.group(1)] = contents.get(match.group(1), "") + block[:-2]
+    return contents
+
+def test_chunks_fit_budget_and_keep_every_file(encoding):
+    documents = [
+        Document("README.md", "# Projet\n\nDescription du projet.\n"),
+        Document("src/app/main.py", "def main():\n    return the_thing()\n" * 20),
+        Document("src/app/util.py", "x = 1\n"),
+        Document("src/lib/data.json", '{"key": "value"}\n' * 30),
+    ]
+    chunks = list(chunk_documents(documents, 300, encoding_name="tiny", title="demo"))
+
+    assert [chunk.index for chunk in chunks] == list(range(1, len(chunks) + 1))
+    for chunk in chunks:
+        assert chunk.token_count <= 300
+        assert chunk.token_count >= len(encoding.encode_ordinary(chunk.text))
+        assert chunk.text.startswith(f"Chunk {chunk.index} of demo\nDirectory excerpt:\n")
+    assert _contents(chunks) == {document.path: document.text for document in documents}
+
+def test_oversized_file_is_split_at_definitions(encoding):
+    source = "".join(f"@decorator\ndef func_{i}(a, b):\n    return a + b * {i}\n\n\n" for i in range(40))
+    chunks = list(chunk_documents([Document("src/big.py", source)], 400, encoding_name="tiny"))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.token_count <= 400
+        assert chunk.paths == ["src/big.py"]
+        content = chunk.text.split(f"{SEPARATOR}\n", 2)[2]
+        assert content.startswith("@decorator\ndef func_")
+    assert re.search(r"FILE: src/big\.py \(lines 1-\d+\)", chunks[0].text)
+    assert _contents(chunks) == {"src/big.py": source}
+
+def test_oversized_line_is_split_between_tokens(encoding):
+    source = "var été=1;" * 500 + "\n"
+    chunks = list(chunk_documents([Document("dist/app.min.js", source)], 200, encoding_name="tiny"))
+
+    assert len(chunks) > 1
+    assert all(chunk.token_count <= 200 for chunk in chunks)
+    assert _contents(chunks) == {"dist/app.min.js": source}
+
+def test_chunk_closes_at_directory_change_when_nearly_full(encoding):
+    documents = [Document("a/one.txt", "the " * 600), Document("b/two.txt", "small\n")]
+    chunks = list(chunk_documents(documents, 1000, encoding_name="tiny"))
+    assert [chunk.paths for chunk in chunks] == [["a/one.txt"], ["b/two.txt"]]
+
+    documents = [Document("a/one.txt", "the " * 20), Document("b/two.txt", "small\n")]
+    chunks = list(chunk_documents(documents, 1000, encoding_name="tiny"))
+    assert [chunk.paths for chunk in chunks] == [["a/one.txt", "b/two.txt"]]
+
+def test_chunk_header_is_bounded(encoding):
+    documents = [Document(f"dir_{i}/nested/file_{i}.txt", "x\n") for i in range(200)]
+    for chunk in chunk_documents(documents, 400, encoding_name="tiny"):
+        header = chunk.text[:chunk.text.index(SEPARATOR)]
+        assert len(encoding.encode_ordinary(header)) <= 100
+        assert chunk.token_count <= 400
+
+def test_chunk_repo_context_uses_read_contents(encoding):
+    files = [
+        FileNode("src/a.py", FileType.SOURCE, FileImportance.HIGH, 10, extra={"content": "a = 1\n"}),
+        FileNode("src/b.py", FileType.SOURCE, FileImportance.LOW, 10),
+    ]
+    chunks = list(chunk_repo_context(RepoContext(files=files, repo_name="repo"), 500, encoding_name="tiny"))
+    assert [chunk.paths for chunk in chunks] == [["src/a.py"]]
+    assert chunks[0].text.startswith("Chunk 1 of repo\n")
+
+def test_chunk_digest_streams_blocks(encoding, tmp_path):
+    digest = (
+        "Directory structure:\n└── repo/\n\n"
+        f"{SEPARATOR}\nFILE: src/a.py\n{SEPARATOR}\nprint('a')\n\n\n"
+        f"{SEPARATOR}\nSYMLINK: link -> src/a.py\n{SEPARATOR}\n\n\n\n"
+        f"{SEPARATOR}\nFILE: src/b.py\n{SEPARATOR}\nprint('b')\n\n"
+    )
+    path = tmp_path / "repo.txt.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(digest)
+
+    chunks = list(chunk_digest(path, 500, encoding_name="tiny"))
+    assert [chunk.paths for chunk in chunks] == [["src/a.py", "link", "src/b.py"]]
+    assert chunks[0].text.startswith("Chunk 1 of repo\n")
+    assert "SYMLINK: link -> src/a.py" in chunks[0].text
+    assert _contents(chunks) == {"src/a.py": "print('a')", "link": "", "src/b.py": "print('b')"}
+
+def test_chunk_documents_rejects_tiny_budget(encoding):
+    with pytest.raises(ValueError):
+        list(chunk_documents([Document("a.txt", "word " * 100)], 8, encoding_name="tiny"))
+
+def test_split_segments_keeps_decorators_and_comments_with_definitions():
+    lines = ["import os\n", "\n", "# Aide\n", "@cache\n", "def f():\n", "    pass\n", "class A:\n", "    x = 1\n"]
+    assert split_segments(lines, "mod.py") == [(0, 2), (2, 6), (6, 8)]
+    lines = ["# Titre\n", "texte\n", "## Section\n", "suite\n"]
+    assert split_segments(lines, "README.md") == [(0, 2), (2, 4)]
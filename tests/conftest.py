@@ -1,19 +1,43 @@
 """
 Fixtures for tests.
 
-This file provides shared fixtures for creating sample queries, a temporary directory structure, and a helper function
-to write `.ipynb` notebooks for testing notebook utilities.
+This file provides shared fixtures for creating sample queries, a temporary directory structure, a helper function
+to write `.ipynb` notebooks for testing notebook utilities, a helper function to build the file system tree of a
+directory, and a stand-in tokenizer for digest token counts.
 """
 
 import json
 from pathlib import Path
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, List
 
 import pytest
 
+from gitingest import output_formatters
+from gitingest.ingestion import _process_node
 from gitingest.query_parsing import IngestionQuery
+from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats
+from gitingest.utils import token_cache
 
 WriteNotebookFunc = Callable[[str, Dict[str, Any]], Path]
+BuildTreeFunc = Callable[[Path, IngestionQuery], FileSystemNode]
+
+
+class WhitespaceEncoding:
+    """Stand-in for a tiktoken encoding, counting one token per whitespace-separated word."""
+
+    def encode_ordinary_batch(self, texts: List[str], num_threads: int = 8) -> List[List[str]]:
+        return [text.split() for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def isolated_token_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Disable the persistent token-count cache, so tests neither read nor fill the cache of the user.
+
+    Tests of the cache install their own `TokenCountCache` with `monkeypatch.setattr`.
+    """
+    monkeypatch.setattr(token_cache, "_default_cache", None)
+    monkeypatch.setattr(token_cache, "_default_checked", True)
 
 
 @pytest.fixture
@@ -129,3 +153,44 @@ def write_notebook(tmp_path: Path) -> WriteNotebookFunc:
         return notebook_path
 
     return _write_notebook
+
+
+@pytest.fixture
+def build_tree() -> BuildTreeFunc:
+    """
+    Provide a helper function to build the file system tree of a directory, as ingestion does.
+
+    Returns
+    -------
+    BuildTreeFunc
+        A callable that accepts a directory and a query, points the query at the directory, and returns the root
+        node of its tree.
+    """
+
+    def _build_tree(directory: Path, query: IngestionQuery) -> FileSystemNode:
+        query.local_path = directory
+        root = FileSystemNode(name=directory.name, type=FileSystemNodeType.DIRECTORY, path_str="", path=directory)
+        _process_node(node=root, query=query, stats=FileSystemStats())
+        return root
+
+    return _build_tree
+
+
+@pytest.fixture
+def whitespace_encoding(monkeypatch: pytest.MonkeyPatch) -> WhitespaceEncoding:
+    """
+    Count digest tokens with a `WhitespaceEncoding` instead of a tiktoken encoding, which may not be available.
+
+    Parameters
+    ----------
+    monkeypatch : pytest.MonkeyPatch
+        The monkeypatch fixture, used to replace the tokenizer of `output_formatters`.
+
+    Returns
+    -------
+    WhitespaceEncoding
+        The encoding used for every digest written by the test.
+    """
+    encoding = WhitespaceEncoding()
+    monkeypatch.setattr(output_formatters, "get_encoding", lambda name: encoding)
+    return encoding
@@ -1,15 +1,15 @@
 import pytest
-from gitingest.extraction.extractor import extract_repo_context
+from gitingest.extraction.extractor import extract_repo_context, select_files_for_budget
 from gitingest.schemas.filesystem_schema import FileSystemNode, FileSystemNodeType
 from gitingest.config.model_config import LLMModelConfig
-from gitingest.schemas import FileType
+from gitingest.schemas import FileImportance, FileNode, FileType
 import tempfile
 from pathlib import Path
 
 @pytest.fixture
 def dummy_model_config():
     return LLMModelConfig(
-        max_tokens=50,  # volontairement petit pour tester le tronquage
+        max_tokens=10_000,  # assez grand pour que le budget de tokens ne retienne que les fichiers testés ici
         max_file_size=1000,
         important_file_types=[".py"],
         config_files_priority=["pyproject.toml"]
@@ -67,4 +67,66 @@ def test_extract_repo_context_file_too_big(dummy_model_config):
         node = make_file_node(file_path, size=2000)  # taille > max_file_size
         dir_node = make_dir_node([node])
         ctx = extract_repo_context(dir_node, dummy_model_config, repo_name="fake_repo")
-        assert len(ctx.files) == 0 
\ No newline at end of file
+        assert len(ctx.files) == 0 
+
+def test_extract_repo_context_skips_binaries(dummy_model_config):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        image = Path(tmpdir) / "logo.png"
+        image.write_bytes(b"\x89PNG\r\n\x1a\n")
+        blob = Path(tmpdir) / "blob.dat"
+        blob.write_bytes(b"\x7fELF" + b"A" * 50)
+        source = Path(tmpdir) / "main.py"
+        source.write_text("print('ok')\n")
+        dir_node = make_dir_node([make_file_node(image), make_file_node(blob), make_file_node(source)])
+        ctx = extract_repo_context(dir_node, dummy_model_config, repo_name="fake_repo")
+        assert [Path(f.path).name for f in ctx.files] == ["main.py"]
+
+def test_extract_repo_context_generated_files(dummy_model_config):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        generated = Path(tmpdir) / "api_pb2.py"
+        generated.write_text("# Generated by the protocol buffer compiler.  DO NOT EDIT!\nx = 1\n")
+        source = Path(tmpdir) / "main.py"
+        source.write_text("print('ok')\n")
+        dir_node = make_dir_node([make_file_node(generated), make_file_node(source)])
+        kept = extract_repo_context(dir_node, dummy_model_config, repo_name="fake_repo")
+        skipped = extract_repo_context(
+            dir_node, dummy_model_config, repo_name="fake_repo", generated_file_policy="skip"
+        )
+        assert sorted(Path(f.path).name for f in kept.files) == ["api_pb2.py", "main.py"]
+        assert [Path(f.path).name for f in skipped.files] == ["main.py"]
+
+
+def test_select_files_for_budget_by_density():
+    config = FileNode(path="pyproject.toml", file_type=FileType.CONFIG, importance=FileImportance.HIGH, size=0)
+    huge = FileNode(path="src/huge.py", file_type=FileType.SOURCE, importance=FileImportance.HIGH, size=0)
+    small = FileNode(path="src/small.py", file_type=FileType.SOURCE, importance=FileImportance.MEDIUM, size=0)
+    other = FileNode(path="notes.bin", file_type=FileType.OTHER, importance=FileImportance.LOW, size=0)
+    estimates = {"pyproject.toml": 100, "src/huge.py": 5000, "src/small.py": 200, "notes.bin": 300}
+    selected, skipped = select_files_for_budget([config, huge, small, other], estimates, budget=1500)
+    # Le gros fichier ne tient pas : il est tronqué au reste du budget, les autres sont lus en entier
+    assert [(f.path, limit) for f, limit in selected] == [
+        ("pyproject.toml", None),
+        ("src/huge.py", 1500 - 140 - 240 - 340 - 40),
+        ("src/small.py", None),
+        ("notes.bin", None),
+    ]
+    assert skipped == []
+    selected, skipped = select_files_for_budget([config, huge, small, other], estimates, budget=400)
+    assert [f.path for f, _ in selected] == ["pyproject.toml", "src/small.py"]
+    assert [f.path for f in skipped] == ["src/huge.py", "notes.bin"]
+
+
+def test_extract_repo_context_token_budget(dummy_model_config):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        nodes = []
+        for i in range(20):
+            file_path = Path(tmpdir) / f"module_{i}.py"
+            file_path.write_text(f"VALUE_{i} = {i}\n" * 60)
+            nodes.append(make_file_node(file_path, size=file_path.stat().st_size))
+        ctx = extract_repo_context(make_dir_node(nodes), dummy_model_config, repo_name="fake_repo", token_budget=1500)
+        # Seuls les fichiers retenus sont lus, et le contenu extrait tient dans le budget
+        assert 0 < len(ctx.files) < 20
+        assert ctx.extra["total_tokens"] <= 1500
+        assert len(ctx.extra["budget_skipped"]) + len(ctx.files) == 20
+        unlimited = extract_repo_context(make_dir_node(nodes), dummy_model_config, token_budget=0)
+        assert len(unlimited.files) == 20
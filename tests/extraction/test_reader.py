@@ -0,0 +1,55 @@
+import threading
+import time
+
+from gitingest.extraction.reader import AdaptiveReader
+
+def test_results_come_back_in_order():
+    reader = AdaptiveReader(min_workers=4, max_workers=8, adjust_interval=8)
+    def _read(i):
+        time.sleep(0.001 * ((i * 7) % 5))
+        return i * i
+    assert list(reader.map(_read, range(100))) == [i * i for i in range(100)]
+
+def test_in_flight_reads_stay_within_limit():
+    reader = AdaptiveReader(min_workers=3, max_workers=3)
+    lock = threading.Lock()
+    running = [0, 0]
+    def _read(i):
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        time.sleep(0.002)
+        with lock:
+            running[0] -= 1
+        return i
+    assert list(reader.map(_read, range(30))) == list(range(30))
+    assert running[1] <= 3
+
+def test_limit_grows_when_reads_wait_on_io():
+    # Des lectures qui attendent (NFS, disque lent) font monter la concurrence jusqu'au maximum
+    reader = AdaptiveReader(min_workers=2, max_workers=16, adjust_interval=4)
+    list(reader.map(lambda i: time.sleep(0.005), range(128)))
+    assert reader.peak_limit == 16
+    assert reader.io_wait_ratio > 1
+
+def test_limit_stays_low_for_cpu_bound_reads():
+    # Du calcul sous GIL ressemble à de l'attente, mais plus de threads n'augmente pas le débit
+    reader = AdaptiveReader(min_workers=2, max_workers=16, adjust_interval=8)
+    def _compute(i):
+        deadline = time.thread_time() + 0.001
+        while time.thread_time() < deadline:
+            pass
+    list(reader.map(_compute, range(200)))
+    assert reader.limit <= 4
+
+def test_stopping_early_cancels_pending_reads():
+    reader = AdaptiveReader(min_workers=2, max_workers=2)
+    started = []
+    def _read(i):
+        started.append(i)
+        time.sleep(0.005)
+        return i
+    stream = reader.map(_read, range(1000))
+    assert next(stream) == 0
+    stream.close()
+    assert len(started) < 10
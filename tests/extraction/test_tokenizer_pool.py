@@ -0,0 +1,62 @@
+import tempfile
+from pathlib import Path
+
+from gitingest.config.model_config import LLMModelConfig
+from gitingest.extraction.extractor import extract_repo_context
+from gitingest.extraction.tokenizer_pool import TokenizerPool
+from gitingest.utils import tokens
+from gitingest.utils.tokens import count_tokens, truncate_content
+from tests.extraction.test_extractor import make_dir_node, make_file_node
+from tests.utils.test_tokens import _tiny_encoding
+
+
+def test_tokenizer_pool_matches_local_counts(monkeypatch):
+    # L'encodeur "tiny" n'est pas enregistré dans tiktoken : il est transmis aux processus avec ses rangs BPE
+    monkeypatch.setitem(tokens._encodings, "tiny", _tiny_encoding())
+    texts = [f"def thing_{i}():\n    return 'the {i}'\n" * (i + 1) for i in range(40)]
+    limits = [None if i % 3 else 25 for i in range(40)]
+    with TokenizerPool("tiny", processes=2, batch_chars=500) as pool:
+        for i, (text, limit) in enumerate(zip(texts, limits)):
+            pool.submit(i, text, limit)
+        measures = list(pool.results())
+
+    assert [key for key, _, _ in measures] == list(range(40))
+    for (i, count, cut), text, limit in zip(measures, texts, limits):
+        kept = text if limit is None else truncate_content(text, limit, encoding_name="tiny")
+        assert cut == (None if kept == text else len(kept))
+        assert count == count_tokens(kept, encoding_name="tiny")
+
+
+def test_extract_repo_context_with_tokenizer_processes(monkeypatch):
+    monkeypatch.setitem(tokens._encodings, "tiny", _tiny_encoding())
+    model_config = LLMModelConfig(max_tokens=10_000, max_file_size=100_000, encoding_name="tiny")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        nodes = []
+        for i in range(12):
+            file_path = Path(tmpdir) / f"module_{i}.py"
+            file_path.write_text(f"def the_thing_{i}():\n    return {i}\n" * 40)
+            nodes.append(make_file_node(file_path, size=file_path.stat().st_size))
+
+        def extract(processes):
+            ctx = extract_repo_context(
+                make_dir_node(nodes), model_config, token_budget=1500, tokenizer_processes=processes
+            )
+            return [(f.path, f.extra["content"], f.extra.get("truncated")) for f in ctx.files], ctx.extra
+
+        local, local_extra = extract(0)
+        pooled, pooled_extra = extract(2)
+    # Le pool compte et tronque les fichiers comme les threads de lecture
+    assert pooled == local
+    assert pooled_extra["total_tokens"] == local_extra["total_tokens"] <= 1500
+    assert pooled_extra["tokenizer_processes"] == 2
+    assert local_extra["tokenizer_processes"] == 0
+
+
+def test_tokenizer_pool_close_cancels_pending_batches(monkeypatch):
+    monkeypatch.setitem(tokens._encodings, "tiny", _tiny_encoding())
+    pool = TokenizerPool("tiny", processes=1, batch_chars=1)
+    for i in range(20):
+        pool.submit(i, f"the {i}\n" * 50)
+    # Les lots envoyés mais pas encore commencés sont annulés, sans attendre leur mesure
+    pool.close()
+    assert list(pool.results()) == []
@@ -0,0 +1,136 @@
+"""
+Tests for the `digest_container` module.
+
+These tests validate that indexed digest containers give back each file by path, and convert to and from the text
+digest format without loss.
+"""
+
+import io
+from pathlib import Path
+
+import pytest
+
+from gitingest.digest_container import (
+    DigestContainer,
+    DigestContainerWriter,
+    container_to_text,
+    text_to_container,
+)
+from gitingest.entrypoint import ingest
+from gitingest.output_formatters import write_digest, write_digest_container
+from gitingest.query_parsing import IngestionQuery
+from tests.conftest import BuildTreeFunc, WhitespaceEncoding
+
+
+def test_container_random_access(tmp_path: Path) -> None:
+    """
+    Test that files are found by path in a container, with their metadata.
+
+    Given a container holding many files, a duplicate and a symlink:
+    When files are looked up by path,
+    Then their content and metadata should be returned, and unknown paths should raise `KeyError`.
+    """
+    path = tmp_path / "digest.gidx"
+    with DigestContainerWriter(path) as writer:
+        for i in range(1000):
+            writer.add(f"src/module_{i}.py", f"VALUE = {i}\n", token_count=i)
+        writer.add("src/é.txt", "contenu", content_hash="00112233445566778899aabbccddeeff")
+        writer.add_duplicate("copy/module_7.py", "src/module_7.py")
+        writer.add("link", "", symlink_target="src")
+        writer.finish(summary="Files analyzed: 1003", tree="Directory structure:\n")
+
+    with DigestContainer(path) as container:
+        assert len(container) == 1003
+        assert container.read("src/module_42.py") == "VALUE = 42\n"
+        assert container.entry("src/module_42.py").token_count == 42
+        assert container.entry("src/é.txt").content_hash == "00112233445566778899aabbccddeeff"
+        assert container.read("copy/module_7.py") == "VALUE = 7\n"
+        assert container.entry("copy/module_7.py").duplicate_of == "src/module_7.py"
+        assert container.entry("link").symlink_target == "src"
+        assert "src/missing.py" not in container
+        with pytest.raises(KeyError):
+            container.read("src/missing.py")
+        assert container.summary == "Files analyzed: 1003"
+        assert list(container)[:2] == ["src/module_0.py", "src/module_1.py"]
+
+
+def test_container_rejects_unfinished_file(tmp_path: Path) -> None:
+    """
+    Test that a container closed before its index was written cannot be opened.
+
+    Given a container writer closed without calling `finish`:
+    When the file is opened as a container,
+    Then a `ValueError` should be raised.
+    """
+    path = tmp_path / "digest.gidx"
+    with DigestContainerWriter(path) as writer:
+        writer.add("a.txt", "a" * 100)
+
+    with pytest.raises(ValueError):
+        DigestContainer(path)
+
+
+def test_write_digest_container_matches_text_digest(
+    temp_directory: Path,
+    sample_query: IngestionQuery,
+    tmp_path: Path,
+    build_tree: BuildTreeFunc,
+    whitespace_encoding: WhitespaceEncoding,
+) -> None:
+    """
+    Test that a container written from a tree converts back to the text digest.
+
+    Given a directory tree with a duplicated file:
+    When it is written to a container and converted to text, and the text is converted back to a container,
+    Then the text should be the digest written by `write_digest`, and both containers should hold the same files.
+    """
+    (temp_directory / "dir2" / "copy.py").write_text("x = 1\n" * 100)
+    (temp_directory / "dir1" / "copy.py").write_text("x = 1\n" * 100)
+    root = build_tree(temp_directory, sample_query)
+    text = io.StringIO()
+    text_summary, _ = write_digest(root, sample_query, text)
+
+    container_path = tmp_path / "digest.gidx"
+    summary, _ = write_digest_container(build_tree(temp_directory, sample_query), sample_query, container_path)
+    output = io.StringIO()
+    container_to_text(container_path, output)
+
+    assert summary == text_summary
+    assert output.getvalue() == text.getvalue()
+    with DigestContainer(container_path) as container:
+        assert container.read("src/subdir/file_subdir.py") == "print('Hello from subdir')"
+        assert container.entry("dir2/copy.py").duplicate_of == "dir1/copy.py"
+        assert all(entry.token_count for entry in container.entries())
+        tree = container.tree
+
+    text_path = tmp_path / "digest.txt"
+    text_path.write_text(text.getvalue(), encoding="utf-8")
+    assert text_to_container(text_path, tmp_path / "converted.gidx") == 10
+    with DigestContainer(tmp_path / "converted.gidx") as converted:
+        assert converted.tree == tree
+        assert converted.read("file1.txt") == "Hello World"
+        assert converted.read("dir2/copy.py") == "x = 1\n" * 100
+        assert converted.entry("dir2/copy.py").duplicate_of == "dir1/copy.py"
+    round_trip = io.StringIO()
+    container_to_text(tmp_path / "converted.gidx", round_trip)
+    assert round_trip.getvalue() == text.getvalue()
+
+
+def test_ingest_writes_container_for_gidx_output(
+    temp_directory: Path, tmp_path: Path, whitespace_encoding: WhitespaceEncoding
+) -> None:
+    """
+    Test that `ingest` writes a digest container when the output path ends with `.gidx`.
+
+    Given a directory tree:
+    When it is ingested with an output path ending with `.gidx`,
+    Then the output should open as a container, and the returned digest should match a plain ingestion.
+    """
+    container_path = tmp_path / "digest.gidx"
+    summary, tree, content = ingest(str(temp_directory), output=str(container_path))
+
+    assert (summary, tree, content) == ingest(str(temp_directory))
+    with DigestContainer(container_path) as container:
+        assert container.summary == summary
+        assert container.tree == tree
+        assert container.read("src/subdir/file_subdir.py") == "print('Hello from subdir')"
@@ -0,0 +1,86 @@
+"""
+Tests for the `digest_index` module.
+
+These tests validate that the offset index written alongside a text digest locates the block of each file, and that
+files are read back from plain and compressed digests without reading them from the start.
+"""
+
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from gitingest.digest_index import DigestIndex, index_path_for
+from gitingest.ingestion import ingest_query_to_file
+from gitingest.query_parsing import IngestionQuery
+from gitingest.utils import compression
+from tests.conftest import WhitespaceEncoding
+
+
+def test_index_path_for() -> None:
+    """
+    Test that the index of a digest is stored next to it, whatever its compression.
+
+    Given the paths of plain and compressed digests:
+    When the path of their index is computed,
+    Then it should be `<name>.index.json` in the same directory.
+    """
+    assert index_path_for("out/repo.txt") == Path("out/repo.index.json")
+    assert index_path_for("out/repo.txt.gz") == Path("out/repo.index.json")
+    assert index_path_for("repo.md") == Path("repo.md.index.json")
+
+
+@pytest.mark.parametrize("name", ["digest.txt", "digest.txt.gz"])
+def test_index_locates_file_blocks(
+    temp_directory: Path,
+    sample_query: IngestionQuery,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    name: str,
+    whitespace_encoding: WhitespaceEncoding,
+) -> None:
+    """
+    Test that the index written with a digest gives the offsets, token counts and hashes of each file block.
+
+    Given a directory tree with non-ASCII content, ingested to a plain or gzip digest split in many members:
+    When the digest is written with its index,
+    Then every block and content range of the index should match the digest, and files should be read by path.
+    """
+    monkeypatch.setattr(compression, "COMPRESSION_THREADS", 2)
+    monkeypatch.setattr(compression, "COMPRESSION_BLOCK_SIZE", 64)
+    (temp_directory / "dir1" / "été.txt").write_text("Café crème — ünïcode\n" * 20, encoding="utf-8")
+    sample_query.local_path = temp_directory
+    path = tmp_path / name
+
+    summary, tree = ingest_query_to_file(sample_query, path, write_index=True)
+
+    index = DigestIndex.load(tmp_path / "digest.index.json")
+    data = gzip.decompress(path.read_bytes()) if name.endswith(".gz") else path.read_bytes()
+    assert index.summary == summary
+    assert data[index.tree_offset : index.tree_offset + index.tree_length].decode("utf-8") == tree
+    assert bool(index.member_offsets) == name.endswith(".gz")
+    assert index.blocks[-1].offset + index.blocks[-1].length == len(data)
+    for block in index.blocks:
+        assert data[block.offset : block.offset + block.length].decode("utf-8").startswith("=" * 48)
+        assert block.token_count
+    assert index.read(path, "dir1/été.txt") == "Café crème — ünïcode\n" * 20
+    assert index.read(path, "file1.txt", content_only=False).startswith("=" * 48 + "\nFILE: file1.txt\n")
+    assert index.find("file1.txt").content_hash is not None
+    assert index.find("missing.txt") is None
+    with pytest.raises(KeyError):
+        index.read(path, "missing.txt")
+
+
+def test_load_rejects_unknown_version(tmp_path: Path) -> None:
+    """
+    Test that an index written by another version of the format is rejected.
+
+    Given an index file with an unknown version:
+    When it is loaded,
+    Then a `ValueError` should be raised.
+    """
+    path = tmp_path / "digest.index.json"
+    path.write_text(json.dumps({"version": 99}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        DigestIndex.load(path)
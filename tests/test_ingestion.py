@@ -180,3 +180,23 @@ ignore_patterns = ["*.py", "*.md"]
     apply_gitingest_file(d, q)
     assert "*.py" in q.ignore_patterns
     assert "*.md" in q.ignore_patterns
+
+def test_large_file_sampled(base_query, temp_dir):
+    from gitingest.ingestion import _process_node
+    from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats
+
+    (temp_dir / "big.log").write_text("".join(f"line {i}\n" for i in range(100_000)))
+
+    def process() -> FileSystemNode:
+        root = FileSystemNode(name="repo", type=FileSystemNodeType.DIRECTORY, path_str="", path=temp_dir)
+        _process_node(node=root, query=base_query, stats=FileSystemStats())
+        return root
+
+    assert "big.log" not in [child.name for child in process().children]
+
+    base_query.large_file_policy = "sample"
+    big = next(child for child in process().children if child.name == "big.log")
+    assert big.size == (temp_dir / "big.log").stat().st_size
+    assert big.content.startswith("line 0\n")
+    assert big.content.endswith("line 99999\n")
+    assert "bytes omitted ...]" in big.content_string
@@ -8,6 +8,7 @@ empty cells, outputs, etc.) are handled appropriately.
 
 import pytest
 
+from gitingest.schemas import FileSystemNode, FileSystemNodeType, ReadOptions
 from gitingest.utils.notebook_utils import process_notebook
 from tests.conftest import WriteNotebookFunc
 
@@ -292,3 +293,91 @@ def test_process_notebook_with_output(write_notebook: WriteNotebookFunc) -> None
 
     assert with_output == expected_combined, "Should include source code and comment-ified output."
     assert without_output == expected_source, "Should include only the source code without output."
+
+
+def test_process_notebook_skips_rich_outputs(write_notebook: WriteNotebookFunc) -> None:
+    """
+    Test that rich output payloads are skipped and long text outputs are capped.
+
+    Given a code cell whose outputs hold a large base64 image next to its plain-text repr, and a long stream output,
+    When `process_notebook` is called with a small `max_output_chars`,
+    Then the image payload should not appear, the text repr should be kept, and the stream should be truncated.
+    """
+    notebook_content = {
+        "cells": [
+            {
+                "cell_type": "code",
+                "source": ["plot()"],
+                "outputs": [
+                    {
+                        "output_type": "display_data",
+                        "data": {"image/png": "iVBORw0KGgo" * 10_000, "text/plain": ["<Figure>"]},
+                        "metadata": {"needs_background": "light"},
+                    },
+                    {"output_type": "stream", "text": ["x" * 500]},
+                ],
+            }
+        ]
+    }
+    nb_path = write_notebook("rich_output.ipynb", notebook_content)
+    result = process_notebook(nb_path, max_output_chars=100)
+
+    assert "iVBORw0KGgo" not in result
+    assert "#   <Figure>" in result
+    assert "x" * 100 in result
+    assert "x" * 101 not in result
+    assert "[... output truncated to 100 characters]" in result
+
+
+def test_process_notebook_split_across_reads(write_notebook: WriteNotebookFunc, monkeypatch) -> None:
+    """
+    Test that notebooks are parsed correctly when tokens straddle read boundaries.
+
+    Given a notebook with escaped strings and numbers,
+    When `process_notebook` reads it a few bytes at a time,
+    Then the result should match the one obtained with the default read size.
+    """
+    notebook_content = {
+        "cells": [
+            {"cell_type": "markdown", "source": ["Café \"quoted\"\n", "tab\tand \\ backslash"]},
+            {"cell_type": "code", "execution_count": 2500, "source": ["x = 1.5e-3"], "outputs": []},
+        ],
+        "nbformat": 4,
+    }
+    nb_path = write_notebook("split.ipynb", notebook_content)
+    expected = process_notebook(nb_path)
+
+    monkeypatch.setattr("gitingest.utils.notebook_utils.NOTEBOOK_READ_CHUNK_SIZE", 3)
+    assert process_notebook(nb_path) == expected
+
+
+def test_node_notebook_output_option(write_notebook: WriteNotebookFunc) -> None:
+    """
+    Test that file nodes honour the notebook output option of their read options.
+
+    Given one notebook read through two nodes with different `ReadOptions`,
+    When their content is accessed,
+    Then only the node including notebook outputs should show them, despite the shared content cache.
+    """
+    notebook_content = {
+        "cells": [
+            {
+                "cell_type": "code",
+                "source": ["1 + 1"],
+                "outputs": [{"output_type": "execute_result", "data": {"text/plain": ["2"]}}],
+            }
+        ]
+    }
+    nb_path = write_notebook("node.ipynb", notebook_content)
+
+    def make_node(options: ReadOptions) -> FileSystemNode:
+        return FileSystemNode(
+            name=nb_path.name,
+            type=FileSystemNodeType.FILE,
+            path_str=nb_path.name,
+            path=nb_path,
+            read_options=options,
+        )
+
+    assert "#   2" in make_node(ReadOptions()).content
+    assert "#   2" not in make_node(ReadOptions(include_notebook_output=False)).content
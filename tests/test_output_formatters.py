@@ -0,0 +1,276 @@
+"""
+Tests for the `output_formatters` module.
+
+These tests validate that the digest content produced from a file system tree is complete and stable.
+"""
+
+import io
+from pathlib import Path
+
+import pytest
+
+from gitingest import output_formatters
+from gitingest.output_formatters import (
+    _create_tree_structure,
+    _Deduplicator,
+    _gather_file_contents,
+    _prefetch_file_contents,
+    write_digest,
+)
+from gitingest.query_parsing import IngestionQuery
+from gitingest.schemas import FileSystemNode, FileSystemNodeType
+from gitingest.utils import token_cache
+from tests.conftest import BuildTreeFunc, WhitespaceEncoding
+
+
+def _sequential_contents(node: FileSystemNode) -> str:
+    if node.type != FileSystemNodeType.DIRECTORY:
+        return node.content_string
+    return "\n".join(_sequential_contents(child) for child in node.children)
+
+
+def test_gather_file_contents_matches_sequential_read(
+    temp_directory: Path, sample_query: IngestionQuery, build_tree: BuildTreeFunc
+) -> None:
+    """
+    Test that prefetching file contents produces the same output as a sequential read.
+
+    Given a directory tree containing nested directories and an empty directory:
+    When `_gather_file_contents` is called,
+    Then the result should be byte-identical to a sequential, depth-first concatenation.
+    """
+    (temp_directory / "empty_dir").mkdir()
+    root = build_tree(temp_directory, sample_query)
+
+    assert _gather_file_contents(root) == _sequential_contents(root)
+
+
+def test_prefetch_file_contents_bounded_window(
+    temp_directory: Path, sample_query: IngestionQuery, build_tree: BuildTreeFunc
+) -> None:
+    """
+    Test that the prefetch pipeline yields every file in tree order with a small read-ahead window.
+
+    Given a directory tree with eight files:
+    When `_prefetch_file_contents` is consumed with a read-ahead of two files,
+    Then every file should be yielded exactly once, in tree order.
+    """
+    root = build_tree(temp_directory, sample_query)
+
+    contents = list(_prefetch_file_contents(root, max_workers=2, read_ahead=2))
+
+    assert len(contents) == 8
+    assert "\n".join(contents) == _sequential_contents(root)
+
+
+def test_gather_file_contents_deduplicates_identical_files(
+    tmp_path: Path, sample_query: IngestionQuery, build_tree: BuildTreeFunc
+) -> None:
+    """
+    Test that byte-identical files are emitted once and then referenced.
+
+    Given a tree with two copies of a large file and two copies of a tiny file:
+    When `_gather_file_contents` is called with a deduplicator,
+    Then the second large copy should be a reference to the first one, the tiny copies should both be emitted,
+    and the deduplicator should count one duplicate.
+    """
+    vendored = "def helper():\n    return 42\n" * 20
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "helper.py").write_text(vendored)
+        (tmp_path / directory / "tiny.txt").write_text("same")
+    root = build_tree(tmp_path, sample_query)
+
+    deduplicator = _Deduplicator()
+    content = _gather_file_contents(root, deduplicator)
+
+    assert content.count(vendored) == 1
+    assert "[Duplicate of a/helper.py]" in content
+    assert content.count("\nsame\n") == 2
+    assert deduplicator.duplicates == 1
+    assert deduplicator.saved_bytes == len(vendored)
+
+
+def test_write_digest_matches_in_memory_digest(
+    temp_directory: Path, sample_query: IngestionQuery, monkeypatch: pytest.MonkeyPatch, build_tree: BuildTreeFunc
+) -> None:
+    """
+    Test that streaming the digest writes the same text as the in-memory digest.
+
+    Given a directory tree:
+    When `write_digest` writes it to a stream,
+    Then the stream should hold the directory structure, a newline and the file contents, and the returned summary
+    should count the analyzed files.
+    """
+
+    def _no_tokenizer(name: str):
+        raise ValueError(f"{name} is not available")
+
+    monkeypatch.setattr(output_formatters, "get_encoding", _no_tokenizer)
+    root = build_tree(temp_directory, sample_query)
+    expected_tree = "Directory structure:\n" + _create_tree_structure(sample_query, root)
+    expected_content = _gather_file_contents(root, _Deduplicator())
+
+    output = io.StringIO()
+    summary, tree = write_digest(root, sample_query, output)
+
+    assert tree == expected_tree
+    assert output.getvalue() == expected_tree + "\n" + expected_content
+    assert "Files analyzed: 8" in summary
+    assert "Estimated tokens" not in summary
+
+
+def test_create_tree_structure_collapses_large_directories(
+    tmp_path: Path, sample_query: IngestionQuery, build_tree: BuildTreeFunc
+) -> None:
+    """
+    Test that directories with many children are collapsed in the tree.
+
+    Given a directory with ten files and a sub-directory holding two files:
+    When the tree is rendered with at most three children per directory,
+    Then only the first three children should be listed, followed by a line counting the hidden ones.
+    """
+    for i in range(10):
+        (tmp_path / f"file{i}.txt").write_text("x")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.txt").write_text("a")
+    (tmp_path / "sub" / "b.txt").write_text("b")
+    root = build_tree(tmp_path, sample_query)
+
+    sample_query.tree_max_children = 3
+    lines = _create_tree_structure(sample_query, root).splitlines()
+
+    assert lines[1:] == [
+        "    ├── file0.txt",
+        "    ├── file1.txt",
+        "    ├── file2.txt",
+        "    └── ... 8 more entries (9 files)",
+    ]
+
+    sample_query.tree_max_children = 10
+    assert _create_tree_structure(sample_query, root).splitlines()[-1] == "    └── ... 1 more entry (2 files)"
+
+    (tmp_path / "sub" / "a.txt").unlink()
+    (tmp_path / "sub" / "b.txt").unlink()
+    (tmp_path / "sub").rmdir()
+    root = build_tree(tmp_path, sample_query)
+    sample_query.tree_max_children = 9
+    assert _create_tree_structure(sample_query, root).splitlines()[-1] == "    └── ... 1 more file"
+
+
+def test_create_tree_structure_max_depth(
+    tmp_path: Path, sample_query: IngestionQuery, build_tree: BuildTreeFunc
+) -> None:
+    """
+    Test that the tree stops at the maximum rendered depth.
+
+    Given nested directories `a/b/c` holding a file:
+    When the tree is rendered with a maximum depth of one,
+    Then `a/` should be listed with a line counting its files instead of its content.
+    """
+    (tmp_path / "a" / "b" / "c").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "c" / "deep.txt").write_text("deep")
+    root = build_tree(tmp_path, sample_query)
+
+    sample_query.tree_max_depth = 1
+    lines = _create_tree_structure(sample_query, root).splitlines()
+
+    assert lines[1:] == ["    └── a/", "        └── ... 1 file"]
+
+
+def test_write_digest_counts_tokens_per_file(
+    temp_directory: Path,
+    sample_query: IngestionQuery,
+    monkeypatch: pytest.MonkeyPatch,
+    build_tree: BuildTreeFunc,
+    whitespace_encoding: WhitespaceEncoding,
+) -> None:
+    """
+    Test that token counts are computed per file and summed into the summary.
+
+    Given a directory tree and a tokenizer counting words:
+    When `write_digest` writes the digest with a batch size smaller than the number of files,
+    Then each file node should hold the token count of its content string, and the summary should report the sum
+    of the file and directory structure counts.
+    """
+    monkeypatch.setattr(output_formatters, "TOKEN_BATCH_FILES", 3)
+    root = build_tree(temp_directory, sample_query)
+
+    summary, tree = write_digest(root, sample_query, io.StringIO())
+
+    file_nodes = list(output_formatters._iter_file_nodes(root))
+    assert all(n.token_count == len(n.content_string.split()) for n in file_nodes)
+    expected = len(tree.split()) + sum(n.token_count for n in file_nodes)
+    assert summary.endswith(f"Estimated tokens: {expected}")
+
+
+def test_write_digest_approximate_token_count(
+    temp_directory: Path, sample_query: IngestionQuery, monkeypatch: pytest.MonkeyPatch, build_tree: BuildTreeFunc
+) -> None:
+    """
+    Test that the approximate token count mode estimates tokens without encoding the digest.
+
+    Given a directory tree and a query in approximate token count mode:
+    When `write_digest` writes the digest,
+    Then no tokenizer should be loaded, each file node should hold an estimate, and the summary should report the
+    estimate with its error bound.
+    """
+
+    def _fail(name):
+        raise AssertionError("The digest should not be encoded")
+
+    monkeypatch.setattr(output_formatters, "get_encoding", _fail)
+    sample_query.token_count_mode = "approximate"
+    root = build_tree(temp_directory, sample_query)
+
+    summary, _ = write_digest(root, sample_query, io.StringIO())
+
+    assert all(n.token_count for n in output_formatters._iter_file_nodes(root))
+    assert "Estimated tokens: " in summary
+    assert summary.endswith(")") and "(±" in summary
+
+
+def test_write_digest_reuses_cached_token_counts(
+    tmp_path: Path,
+    sample_query: IngestionQuery,
+    monkeypatch: pytest.MonkeyPatch,
+    build_tree: BuildTreeFunc,
+    whitespace_encoding: WhitespaceEncoding,
+) -> None:
+    """
+    Test that the content of large files is only encoded once across digests sharing the token-count cache.
+
+    Given two repositories holding the same large file under different paths, and a persistent token-count cache:
+    When a digest is written for each of them,
+    Then the second digest should only encode the path line of the large file, and report the same counts as a
+    digest written without the cache.
+    """
+    encoded = []
+    encode_ordinary_batch = whitespace_encoding.encode_ordinary_batch
+
+    def _recording_batch(texts, num_threads=8):
+        encoded.extend(texts)
+        return encode_ordinary_batch(texts, num_threads)
+
+    monkeypatch.setattr(whitespace_encoding, "encode_ordinary_batch", _recording_batch)
+    large = "def thing():\n    return 42\n" * 200
+    for name in ("first", "second"):
+        (tmp_path / name / "src").mkdir(parents=True)
+        (tmp_path / name / "src" / f"{name}.py").write_text(large, encoding="utf-8")
+        (tmp_path / name / "small.txt").write_text(f"small {name}\n", encoding="utf-8")
+
+    root = build_tree(tmp_path / "first", sample_query)
+    uncached_summary, _ = write_digest(root, sample_query, io.StringIO())
+
+    monkeypatch.setattr(token_cache, "_default_cache", token_cache.TokenCountCache(tmp_path / "tokens.sqlite3"))
+    root = build_tree(tmp_path / "first", sample_query)
+    assert write_digest(root, sample_query, io.StringIO())[0] == uncached_summary
+
+    encoded.clear()
+    root = build_tree(tmp_path / "second", sample_query)
+    summary, tree = write_digest(root, sample_query, io.StringIO())
+
+    file_nodes = list(output_formatters._iter_file_nodes(root))
+    assert not any(large in text for text in encoded)
+    assert all(n.token_count == len(n.content_string.split()) for n in file_nodes)
+    assert summary.endswith(f"Estimated tokens: {len(tree.split()) + sum(n.token_count for n in file_nodes)}")
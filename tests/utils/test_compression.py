@@ -0,0 +1,87 @@
+import gzip
+
+import pytest
+
+from gitingest.utils import compression
+from gitingest.utils.compression import (
+    compression_for_path,
+    gzip_member_offsets,
+    open_digest_reader,
+    open_digest_writer,
+    read_digest_range,
+)
+
+TEXT = "".join(f"FILE: src/module_{i}.py — ligne\n" for i in range(5000))
+
+
+def test_compression_for_path():
+    assert compression_for_path("digest.txt.gz") == "gzip"
+    assert compression_for_path("digest.txt.zst") == "zstd"
+    assert compression_for_path("digest.txt") is None
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_gzip_round_trip(tmp_path, monkeypatch, threads):
+    # Des blocs plus petits que le texte, pour écrire plusieurs membres gzip en parallèle
+    monkeypatch.setattr(compression, "COMPRESSION_THREADS", threads)
+    monkeypatch.setattr(compression, "COMPRESSION_BLOCK_SIZE", 4096)
+    path = tmp_path / "digest.txt.gz"
+
+    with open_digest_writer(path) as f:
+        for line in TEXT.splitlines(keepends=True):
+            f.write(line)
+
+    assert gzip.decompress(path.read_bytes()).decode("utf-8") == TEXT
+    with open_digest_reader(path) as f:
+        assert f.read() == TEXT
+    assert path.stat().st_size < len(TEXT.encode("utf-8")) / 5
+
+
+def test_gzip_empty_digest(tmp_path):
+    path = tmp_path / "digest.txt.gz"
+    open_digest_writer(path).close()
+    assert gzip.decompress(path.read_bytes()) == b""
+
+
+def test_zstd_round_trip(tmp_path):
+    pytest.importorskip("zstandard")
+    path = tmp_path / "digest.txt.zst"
+    with open_digest_writer(path) as f:
+        f.write(TEXT)
+    with open_digest_reader(path) as f:
+        assert f.read() == TEXT
+
+
+@pytest.mark.parametrize("name", ["digest.txt", "digest.txt.gz", "digest.txt.zst"])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_writer_keeps_newlines_untranslated(tmp_path, monkeypatch, name, threads):
+    # Les offsets de l'index comptent un octet par "\n" : aucune traduction en "\r\n", même sous Windows
+    if name.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    monkeypatch.setattr(compression, "COMPRESSION_THREADS", threads)
+    path = tmp_path / name
+    with open_digest_writer(path) as f:
+        f.write("a\nb\n\nc")
+    with open_digest_reader(path, newline="") as f:
+        assert f.read() == "a\nb\n\nc"
+    if name.endswith(".gz"):
+        assert gzip.decompress(path.read_bytes()) == b"a\nb\n\nc"
+    elif name.endswith(".txt"):
+        assert path.read_bytes() == b"a\nb\n\nc"
+
+
+@pytest.mark.parametrize("name", ["digest.txt", "digest.txt.gz"])
+def test_read_digest_range_with_seek_table(tmp_path, monkeypatch, name):
+    monkeypatch.setattr(compression, "COMPRESSION_THREADS", 4)
+    monkeypatch.setattr(compression, "COMPRESSION_BLOCK_SIZE", 4096)
+    path = tmp_path / name
+    with open_digest_writer(path) as f:
+        f.write(TEXT)
+    member_offsets = gzip_member_offsets(f)
+
+    data = TEXT.encode("utf-8")
+    assert (member_offsets is not None) == name.endswith(".gz")
+    for offset in (0, 4095, 4096, 100_000, len(data) - 10):
+        assert read_digest_range(path, offset, 300, member_offsets=member_offsets, block_size=4096) == (
+            data[offset : offset + 300]
+        )
@@ -0,0 +1,56 @@
+import os
+
+from gitingest.schemas.filesystem_schema import FileSystemNode, FileSystemNodeType
+from gitingest.utils.content_cache import ContentCache, get_content_cache
+from gitingest.utils.file_utils import FileContent, load_file
+
+def test_content_cache_hit_and_miss(tmp_path):
+    file = tmp_path / "a.txt"
+    file.write_text("hello")
+    cache = ContentCache(max_bytes=1024 * 1024)
+    calls = []
+    def loader():
+        calls.append(1)
+        return load_file(file)
+    assert cache.get_or_load(file, loader).text == "hello"
+    assert cache.get_or_load(file, loader).text == "hello"
+    assert len(calls) == 1
+    assert cache.hits == 1 and cache.misses == 1
+
+def test_content_cache_invalidated_on_change(tmp_path):
+    file = tmp_path / "a.txt"
+    file.write_text("hello")
+    cache = ContentCache()
+    cache.get_or_load(file, lambda: load_file(file))
+    file.write_text("hello world")
+    stat = file.stat()
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.get_or_load(file, lambda: load_file(file)).text == "hello world"
+    assert cache.misses == 2
+    assert len(cache) == 1
+
+def test_content_cache_evicts_lru(tmp_path):
+    files = []
+    for i in range(3):
+        f = tmp_path / f"f{i}.txt"
+        f.write_text("x" * 1000)
+        files.append(f)
+    cache = ContentCache(max_bytes=2500)
+    for f in files:
+        cache.get_or_load(f, lambda f=f: FileContent(text=f.read_text(), is_text=True))
+    # Le premier fichier a été évincé, la mémoire reste sous le plafond
+    assert len(cache) == 2
+    assert cache.current_bytes <= 2500
+    cache.get_or_load(files[0], lambda: FileContent(text="x" * 1000, is_text=True))
+    assert cache.stats()["misses"] == 4
+
+def test_node_content_read_once(tmp_path, monkeypatch):
+    file = tmp_path / "main.py"
+    file.write_text("print('ok')\n")
+    node = FileSystemNode(name="main.py", type=FileSystemNodeType.FILE, path_str="main.py", path=file, size=12)
+    get_content_cache().clear()
+    node.content_string
+    node.content
+    assert node.load().line_count == 1
+    assert get_content_cache().misses == 1
+    assert get_content_cache().hits == 2
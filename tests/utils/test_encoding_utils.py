@@ -0,0 +1,42 @@
+import codecs
+from pathlib import Path
+
+from gitingest.utils.encoding_utils import detect_encoding, detect_file_encoding
+from gitingest.utils.file_utils import load_file
+
+def test_detect_encoding_bom():
+    assert detect_encoding(codecs.BOM_UTF8 + b"abc") == "utf-8-sig"
+    assert detect_encoding("abc".encode("utf-16")) == "utf-16"
+    assert detect_encoding("abc".encode("utf-32")) == "utf-32"
+
+def test_detect_encoding_utf8_and_binary():
+    assert detect_encoding("héllo".encode("utf-8")) == "utf-8"
+    assert detect_encoding(b"") == "utf-8"
+    assert detect_encoding(b"\x89PNG\r\n\x1a\n\x00\x00") is None
+    # Les données binaires sans BOM ne doivent pas passer pour de l'UTF-16
+    assert detect_encoding(bytes(range(1, 32)) * 8) is None
+
+def test_detect_encoding_truncated_sample():
+    data = "é".encode("utf-8")
+    assert detect_encoding(data[:1], complete=False) == "utf-8"
+    assert detect_encoding(data[:1], complete=True) != "utf-8"
+
+def test_detect_encoding_legacy_fallback():
+    assert detect_encoding("café crème".encode("latin-1")) in ("latin-1", "cp1252")
+    assert detect_encoding("“guillemets”".encode("cp1252")) == "cp1252"
+    assert detect_encoding("café".encode("latin-1"), path=Path("script.nfo")) == "cp437"
+
+def test_detect_file_encoding_cached():
+    path = Path("/nonexistent/cached.txt")
+    assert detect_file_encoding(b"abc", path, (1, 3)) == "utf-8"
+    # Le verdict est réutilisé pour la même version du fichier
+    assert detect_file_encoding(b"\x00\x00", path, (1, 3)) == "utf-8"
+    assert detect_file_encoding(b"\x00\x00", path, (2, 2)) is None
+
+def test_load_file_utf16_with_bom(tmp_path):
+    file = tmp_path / "utf16.txt"
+    file.write_bytes("ligne 1\nligne 2\n".encode("utf-16"))
+    loaded = load_file(file)
+    assert loaded.is_text is True
+    assert loaded.text == "ligne 1\nligne 2\n"
+    assert loaded.line_count == 2
@@ -2,7 +2,8 @@ import platform
 from pathlib import Path
 import pytest
 
-from gitingest.utils.file_utils import get_preferred_encodings, is_text_file
+from gitingest.utils import file_utils
+from gitingest.utils.file_utils import get_preferred_encodings, hash_file, is_text_file, load_file, load_file_sample
 
 def test_get_preferred_encodings_contains_utf8():
     encodings = get_preferred_encodings()
@@ -44,4 +45,116 @@ def test_is_text_file_weird_encoding(tmp_path):
     # Texte en latin-1 avec caractères accentués
     file.write_bytes("café crème".encode("latin-1"))
     # Doit être détecté comme texte
-    assert is_text_file(file) is True 
\ No newline at end of file
+    assert is_text_file(file) is True 
+
+def test_load_file_text_metadata(tmp_path):
+    file = tmp_path / "text.txt"
+    file.write_bytes("ligne 1\nligne 2\nligne 3".encode("utf-8"))
+    loaded = load_file(file)
+    assert loaded.is_text is True
+    assert loaded.text == "ligne 1\nligne 2\nligne 3"
+    assert loaded.encoding == "utf-8"
+    assert loaded.size == 23
+    assert loaded.line_count == 3
+
+def test_load_file_normalizes_newlines(tmp_path, monkeypatch):
+    # Comme une lecture en mode texte : CRLF et CR seuls deviennent LF, sur tous les chemins de lecture
+    file = tmp_path / "windows.txt"
+    file.write_bytes(b"a\r\nb\r\nc\rd\r\n")
+    loaded = load_file(file)
+    assert loaded.text == "a\nb\nc\nd\n"
+    assert loaded.line_count == 4
+    assert loaded.size == 11
+    monkeypatch.setattr(file_utils, "MMAP_THRESHOLD", 1)
+    assert load_file(file).text == loaded.text
+    big = tmp_path / "big.txt"
+    big.write_bytes(b"".join(b"ligne %d\r\n" % i for i in range(2000)))
+    sample = load_file_sample(big, 300, 200)
+    assert sample.sampled
+    assert "\r" not in sample.text
+    assert sample.text.startswith("ligne 0\nligne 1\n")
+    assert sample.text.endswith("ligne 1999\n")
+
+def test_load_file_reads_once(tmp_path, monkeypatch):
+    file = tmp_path / "latin.txt"
+    file.write_bytes("café crème\n".encode("latin-1"))
+    calls = []
+    original_open = Path.open
+    def counting_open(self, *a, **kw):
+        calls.append(a)
+        return original_open(self, *a, **kw)
+    monkeypatch.setattr(Path, "open", counting_open)
+    loaded = load_file(file)
+    # Un seul accès disque, même quand le décodage UTF-8 échoue
+    assert len(calls) == 1
+    assert loaded.is_text is True
+    assert loaded.text == "café crème\n"
+
+def test_load_file_binary(tmp_path):
+    file = tmp_path / "bin.bin"
+    file.write_bytes(b"\x00\x01\x02\xff")
+    loaded = load_file(file)
+    assert loaded.is_text is False
+    assert loaded.text == "[Non-text file]"
+    assert loaded.size == 4
+
+def test_load_file_mmap_matches_read(tmp_path, monkeypatch):
+    file = tmp_path / "big.sql"
+    file.write_bytes("SELECT 'é';\n".encode("utf-8") * 2000 + b"-- fin")
+    small = load_file(file, hash_content=True)
+    # Force le chemin mmap pour ce fichier
+    monkeypatch.setattr(file_utils, "MMAP_THRESHOLD", 1024)
+    mapped = load_file(file, hash_content=True)
+    assert mapped.text == small.text
+    assert mapped.line_count == small.line_count == 2001
+    assert mapped.content_hash == small.content_hash == hash_file(file)
+    # Sans demande explicite, le contenu n'est pas haché
+    assert load_file(file).content_hash is None
+
+def test_load_file_known_binary_extension_not_opened(tmp_path, monkeypatch):
+    file = tmp_path / "font.woff2"
+    file.write_bytes(b"wOF2" + b"a" * 100)
+    def raise_oserror(*a, **kw):
+        raise OSError("ne doit pas être ouvert")
+    monkeypatch.setattr(Path, "open", raise_oserror)
+    loaded = load_file(file)
+    assert loaded.text == "[Non-text file]"
+    assert loaded.size == 104
+    assert is_text_file(file) is False
+
+def test_load_file_magic_number(tmp_path):
+    file = tmp_path / "archive.data"
+    file.write_bytes(b"PK\x03\x04" + b"texte apparemment lisible" * 10)
+    assert load_file(file).text == "[Non-text file]"
+    assert is_text_file(file) is False
+
+def test_load_file_sample_head_and_tail(tmp_path):
+    file = tmp_path / "big.sql"
+    lines = [f"INSERT INTO t VALUES ({i}, 'é');\n" for i in range(5000)]
+    file.write_text("".join(lines), encoding="utf-8")
+    result = load_file_sample(file, 1000, 500)
+    assert result.sampled and result.is_text
+    assert result.size == file.stat().st_size
+    assert result.content_hash is None
+    assert result.text.startswith(lines[0])
+    assert result.text.endswith(lines[-1])
+    assert "bytes omitted ...]" in result.text
+    assert "�" not in result.text
+    head, _, tail = result.text.partition("\n[... ")
+    assert all(line + "\n" in lines for line in head.splitlines(keepends=False))
+    assert all(line + "\n" in lines for line in tail.split("]\n\n", 1)[1].splitlines())
+
+def test_load_file_sample_utf16(tmp_path):
+    file = tmp_path / "big.txt"
+    file.write_text("".join(f"ligne {i}\n" for i in range(2000)), encoding="utf-16")
+    result = load_file_sample(file, 301, 201)
+    assert result.sampled
+    assert result.text.startswith("ligne 0\n")
+    assert result.text.endswith("ligne 1999\n")
+
+def test_load_file_sample_small_file_read_in_full(tmp_path):
+    file = tmp_path / "small.txt"
+    file.write_text("abc\n")
+    result = load_file_sample(file, 1000, 500)
+    assert not result.sampled
+    assert result.text == "abc\n"
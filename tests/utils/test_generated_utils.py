@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from gitingest.schemas import FileSystemNode, FileSystemNodeType, ReadOptions
+from gitingest.utils.generated_utils import detect_generated, detect_generated_file
+
+HAND_WRITTEN = b"".join(b"def f%d(x):\n    return x + %d\n\n" % (i, i) for i in range(200))
+
+def test_detect_generated_hand_written_code():
+    assert detect_generated(HAND_WRITTEN, Path("module.py")) is None
+
+def test_detect_generated_markers():
+    assert detect_generated(b"// Code generated by protoc-gen-go. DO NOT EDIT.\npackage api\n") == "generation marker"
+    assert detect_generated(b"/**\n * @generated\n */\nexport const x = 1;\n") == "generation marker"
+    assert detect_generated(b"# THIS IS AN AUTOGENERATED FILE.\n") == "generation marker"
+
+def test_detect_generated_marker_outside_comment():
+    assert detect_generated(b'MESSAGE = "do not edit"\n' + HAND_WRITTEN) is None
+
+def test_detect_generated_lockfile(tmp_path):
+    lockfile = tmp_path / "package-lock.json"
+    lockfile.write_text('{"name": "app"}\n')
+    assert detect_generated_file(lockfile) == "lockfile"
+
+def test_detect_generated_minified():
+    bundle = b"!function(e){" + b"var a=e.b,c=function(d){return d*2};" * 300 + b"}(window);"
+    assert detect_generated(bundle, Path("vendor.js")) == "minified"
+    assert detect_generated(bundle.replace(b";", b" "), Path("notes.md")) is None
+
+def test_detect_generated_high_entropy():
+    import base64
+    import random
+
+    random.seed(0)
+    blob = base64.b64encode(bytes(random.getrandbits(8) for _ in range(6000)))
+    wrapped = b"\n".join(blob[i : i + 76] for i in range(0, len(blob), 76))
+    assert detect_generated(wrapped, Path("fixture.txt")) == "high entropy"
+
+def test_detect_generated_non_latin_text():
+    text = "这是一个普通的中文文档，用于测试。\n".encode("utf-8") * 100
+    assert detect_generated(text, Path("readme.txt")) is None
+
+def test_node_generated_file_policy(tmp_path):
+    path = tmp_path / "api_pb2.py"
+    path.write_text("# Generated by the protocol buffer compiler.  DO NOT EDIT!\nx = 1\n")
+
+    def content(policy: str) -> str:
+        node = FileSystemNode(
+            name=path.name,
+            type=FileSystemNodeType.FILE,
+            path_str=path.name,
+            path=path,
+            read_options=ReadOptions(generated_file_policy=policy),
+        )
+        return node.content
+
+    assert "x = 1" in content("keep")
+    assert "x = 1" in content("sample")
+    assert content("skip") == "[Generated file skipped: generation marker]"
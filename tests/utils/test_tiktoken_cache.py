@@ -0,0 +1,56 @@
+import hashlib
+
+import pytest
+
+from gitingest.utils import tiktoken_cache
+from gitingest.utils.tiktoken_cache import cached_file_path, ensure_cached, seed_tiktoken_cache
+
+BPE = b"IQ== 0\nIg== 1\n"
+
+
+@pytest.fixture
+def fake_encoding(tmp_path, monkeypatch):
+    # Encodage fictif dont l'empreinte correspond au contenu BPE ci-dessus
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setitem(
+        tiktoken_cache.TIKTOKEN_FILES,
+        "fake_base",
+        ("https://example.com/fake_base.tiktoken", hashlib.sha256(BPE).hexdigest()),
+    )
+    seed_dir = tmp_path / "seed"
+    seed_dir.mkdir()
+    return seed_dir
+
+
+def test_seed_from_directory(fake_encoding):
+    (fake_encoding / "fake_base.tiktoken").write_bytes(BPE)
+
+    assert seed_tiktoken_cache(["fake_base"], seed_dir=fake_encoding, download=False) == {"fake_base": "seeded"}
+    # Le fichier est rangé sous le nom attendu par tiktoken
+    path = cached_file_path("fake_base")
+    assert path.name == hashlib.sha1(b"https://example.com/fake_base.tiktoken").hexdigest()
+    assert path.read_bytes() == BPE
+    assert ensure_cached("fake_base") == "cached"
+
+
+def test_corrupted_files_are_not_used(fake_encoding):
+    (fake_encoding / "fake_base.tiktoken").write_bytes(b"corrompu")
+    cached_file_path("fake_base").parent.mkdir(parents=True)
+    cached_file_path("fake_base").write_bytes(b"corrompu")
+
+    assert ensure_cached("fake_base", seed_dir=fake_encoding) == "missing"
+
+
+def test_unknown_encoding(fake_encoding):
+    assert ensure_cached("unknown_base") == "unknown"
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path):
+    class Unreadable:
+        def read(self, size=-1):
+            raise OSError("lecture impossible")
+
+    target = tmp_path / "cache" / "fichier"
+    with pytest.raises(OSError):
+        tiktoken_cache._write_atomic(target, Unreadable())
+    assert list(target.parent.iterdir()) == []
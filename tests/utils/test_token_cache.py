@@ -0,0 +1,61 @@
+import subprocess
+
+import pytest
+
+from gitingest.utils import token_cache
+from gitingest.utils.token_cache import CachedCount, TokenCountCache, git_blob_sha, text_blob_sha
+
+def test_git_blob_sha_matches_git_hash_object(tmp_path):
+    data = "print('héllo')\n".encode("utf-8")
+    path = tmp_path / "f.py"
+    path.write_bytes(data)
+    try:
+        expected = subprocess.run(["git", "hash-object", str(path)], capture_output=True, check=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip("git n'est pas disponible")
+    assert git_blob_sha(data) == expected.stdout.strip()
+    assert text_blob_sha("print('héllo')\n") == git_blob_sha(data)
+
+def test_counts_persist_across_instances(tmp_path):
+    path = tmp_path / "cache" / "tokens.sqlite3"
+    cache = TokenCountCache(path)
+    cache.put_many([("a" * 40, CachedCount(12, 3)), ("b" * 40, CachedCount(7, 1))], "cl100k_base")
+    cache.put("a" * 40, CachedCount(99, 9), "cl100k_base", framing="block")
+    cache.close()
+
+    reopened = TokenCountCache(path)
+    assert reopened.get_many(["a" * 40, "b" * 40, "c" * 40], "cl100k_base") == {
+        "a" * 40: CachedCount(12, 3),
+        "b" * 40: CachedCount(7, 1),
+    }
+    assert reopened.get("a" * 40, "cl100k_base", framing="block") == CachedCount(99, 9)
+    assert reopened.get("a" * 40, "o200k_base") is None
+    assert reopened.stats()["entries"] == 3
+
+def test_eviction_drops_least_recently_used_entries(tmp_path, monkeypatch):
+    now = [1_000_000]
+    monkeypatch.setattr(token_cache.time, "time", lambda: now[0])
+    cache = TokenCountCache(tmp_path / "tokens.sqlite3", max_entries=10)
+    old = [f"old{i}" for i in range(10)]
+    cache.put_many([(key, CachedCount(i, 1)) for i, key in enumerate(old)], "cl100k_base")
+
+    # Les cinq premières entrées sont relues deux jours plus tard, ce qui les date à nouveau
+    now[0] += 2 * 24 * 3600
+    assert len(cache.get_many(old[:5], "cl100k_base")) == 5
+
+    now[0] += 24 * 3600
+    new = [f"new{i}" for i in range(5)]
+    cache.put_many([(key, CachedCount(i, 1)) for i, key in enumerate(new)], "cl100k_base")
+
+    found = cache.get_many(old + new, "cl100k_base")
+    assert cache.stats()["entries"] == 9
+    assert all(key in found for key in new)
+    assert not any(key in found for key in old[5:])
+    assert sum(key in found for key in old[:5]) == 4
+
+def test_closed_cache_finds_nothing(tmp_path):
+    cache = TokenCountCache(tmp_path / "tokens.sqlite3")
+    cache.put("a" * 40, CachedCount(1, 1), "cl100k_base")
+    cache.close()
+    assert cache.get("a" * 40, "cl100k_base") is None
+    cache.put("b" * 40, CachedCount(1, 1), "cl100k_base")
@@ -1,5 +1,27 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import pytest
-from gitingest.utils.tokens import count_tokens, truncate_content, estimate_context_tokens
+import tiktoken
+
+from gitingest.utils import tokens
+from gitingest.utils.tokens import (
+    CALIBRATION_CORPUS_DIR,
+    TOKEN_RATIOS,
+    approximate_tokens,
+    calibrate_token_ratios,
+    calibration_samples,
+    count_tokens,
+    encoding_name_for_model,
+    estimate_context_tokens,
+    get_encoding,
+    language_for_path,
+    truncate_content,
+)
+
+# Nombres exacts de tokens du corpus intégré (fichiers entiers et échantillons de calibration), par encodage
+TOKEN_CORPUS_COUNTS = json.loads((Path(__file__).parent / "token_corpus_counts.json").read_text(encoding="utf-8"))
 
 @pytest.mark.parametrize("text,expected", [
     ("Hello world", 2),
@@ -29,7 +51,157 @@ def test_truncate_content_middle():
     # Doit contenir le début et la fin
     assert truncated.startswith("A B") and truncated.endswith("F G")
 
+def _tiny_encoding():
+    # Petit encodeur BPE réel (octets + quelques fusions), utilisable sans télécharger de fichier BPE
+    ranks = {bytes([i]): i for i in range(256)}
+    for merge in [b"th", b"he", b"the", b" t", b" the", b"in", b"ing", b"de", b"def", b"  ", b"()"]:
+        ranks[merge] = len(ranks)
+    pattern = r"""[^\r\n\p{L}\p{N}]?+\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]++[\r\n]*|\s*[\r\n]|\s+(?!\S)|\s+"""
+    return tiktoken.Encoding("tiny", pat_str=pattern, mergeable_ranks=ranks, special_tokens={})
+
+@pytest.mark.parametrize("strategy", ["end", "start", "middle"])
+@pytest.mark.parametrize("limit", [0, 3, 50, 10_000])
+def test_truncate_content_matches_full_encoding(monkeypatch, strategy, limit):
+    encoding = _tiny_encoding()
+    monkeypatch.setitem(tokens._encodings, "tiny", encoding)
+    text = " ".join(["the thing", "def ()", "été", "数据", "  ", "\n"] * 200)
+    full = encoding.encode(text, disallowed_special=())
+    half = limit // 2
+    expected = {
+        "end": full[:limit],
+        "start": full[len(full) - limit:],
+        "middle": full[:half] + full[len(full) - (limit - half):],
+    }[strategy]
+    truncated = truncate_content(text, limit, strategy, encoding_name="tiny")
+    assert truncated == (text if len(full) <= limit else encoding.decode(expected))
+
+def test_truncate_content_encodes_only_what_is_kept(monkeypatch):
+    # Tronquer un long texte à quelques tokens ne doit encoder qu'une petite partie du texte
+    encoding = _tiny_encoding()
+    encoded = []
+    class _RecordingEncoding:
+        def encode(self, text, disallowed_special=()):
+            encoded.append(len(text))
+            return encoding.encode(text, disallowed_special=disallowed_special)
+        def decode(self, ids):
+            return encoding.decode(ids)
+    monkeypatch.setitem(tokens._encodings, "tiny", _RecordingEncoding())
+    text = "def thing(): return the value\n" * 100_000
+    for strategy in ("end", "start", "middle"):
+        encoded.clear()
+        truncated = truncate_content(text, 100, strategy, encoding_name="tiny")
+        assert len(encoding.encode(truncated)) <= 100
+        assert sum(encoded) < 5_000
+
+def test_truncate_content_bytes():
+    text = "é" * 10 + "x" * 10
+    assert truncate_content(text, 7, "end", unit="bytes") == "ééé"
+    assert truncate_content(text, 7, "start", unit="bytes") == "x" * 7
+    assert truncate_content(text, 7, "middle", unit="bytes") == "é" + "x" * 4
+    assert truncate_content(text, 30, unit="bytes") == text
+    with pytest.raises(ValueError):
+        truncate_content(text, 7, unit="lines")
+
 def test_estimate_context_tokens():
     texts = ["A B C", "D E F"]
     total = estimate_context_tokens(texts, encoding_name="cl100k_base")
-    assert total == 6 
\ No newline at end of file
+    assert total == 6 
+
+def test_language_for_path():
+    assert language_for_path("src/app.py") == "python"
+    assert language_for_path("README.MD") == "markdown"
+    assert language_for_path("Makefile") == "other"
+
+def test_approximate_tokens_ascii():
+    text = "def add(a, b):\n    return a + b\n" * 100
+    estimate = approximate_tokens(text, "python")
+    # Ratio caractères/token calibré pour Python avec cl100k_base
+    assert estimate.tokens == round(len(text) / TOKEN_RATIOS["cl100k_base"]["python"][0])
+    assert 0 < estimate.error < estimate.tokens
+
+def test_approximate_tokens_cjk():
+    # Un idéogramme coûte environ un token
+    assert approximate_tokens("日本語" * 10).tokens == 30
+    assert approximate_tokens("").tokens == 0
+
+def _corpus_files():
+    return sorted(path for path in CALIBRATION_CORPUS_DIR.iterdir() if path.is_file())
+
+def test_calibration_corpus_covers_every_language(monkeypatch):
+    # Le corpus intégré a un fichier par langage de la table, et sert de corpus par défaut à la calibration
+    monkeypatch.setitem(tokens._encodings, "tiny", _tiny_encoding())
+    ratios = calibrate_token_ratios(encoding_name="tiny")
+    assert set(ratios) == set(TOKEN_RATIOS["cl100k_base"])
+
+def test_calibration_samples_split_on_lines():
+    text = "".join(f"ligne {i:03d} " * 10 + "\n" for i in range(30))
+    samples = calibration_samples(text)
+    assert "".join(samples) == text
+    assert all(sample.endswith("\n") for sample in samples)
+    assert len(samples) == len(text) // tokens.CALIBRATION_SAMPLE_CHARS
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "o200k_base"])
+def test_token_ratios_match_calibration(encoding_name):
+    # La table est celle que produit la calibration sur le corpus intégré, à partir des comptes enregistrés
+    counts = TOKEN_CORPUS_COUNTS[encoding_name]
+    assert sorted(counts) == [path.name for path in _corpus_files()]
+    samples = {name: file_counts["samples"] for name, file_counts in counts.items()}
+    assert calibrate_token_ratios(encoding_name=encoding_name, token_counts=samples) == TOKEN_RATIOS[encoding_name]
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "o200k_base"])
+def test_token_ratios_bound_builtin_corpus(encoding_name):
+    for path in _corpus_files():
+        text = path.read_text(encoding="utf-8")
+        exact = TOKEN_CORPUS_COUNTS[encoding_name][path.name]["tokens"]
+        estimate = approximate_tokens(text, language_for_path(path.name), encoding_name)
+        # La borne annoncée couvre l'écart à l'encodage réel (à l'arrondi près)
+        assert abs(estimate.tokens - exact) <= estimate.error + 1, path.name
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "o200k_base"])
+def test_token_corpus_counts_match_encoding(encoding_name):
+    try:
+        encoding = get_encoding(encoding_name)
+    except Exception as exc:  # Fichier BPE absent et pas d'accès réseau
+        pytest.skip(f"encodage {encoding_name} indisponible : {exc}")
+    # En cas d'échec (corpus modifié), régénérer token_corpus_counts.json puis TOKEN_RATIOS avec la calibration
+    for path in _corpus_files():
+        text = path.read_text(encoding="utf-8")
+        samples = [len(sample) for sample in encoding.encode_ordinary_batch(calibration_samples(text))]
+        expected = {"tokens": len(encoding.encode_ordinary(text)), "samples": samples}
+        assert TOKEN_CORPUS_COUNTS[encoding_name][path.name] == expected, path.name
+
+def test_get_encoding_is_cached(monkeypatch):
+    # L'encodeur n'est chargé qu'une fois, même depuis plusieurs threads
+    loaded = []
+    monkeypatch.setattr(tokens, "_encodings", {})
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: loaded.append(name) or object())
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        encodings = list(executor.map(lambda _: get_encoding("cl100k_base"), range(32)))
+    assert loaded == ["cl100k_base"]
+    assert all(encoding is encodings[0] for encoding in encodings)
+
+def test_encoding_name_for_model(monkeypatch):
+    monkeypatch.setattr(tokens, "_model_encoding_names", {})
+    # Preset LLMModelConfig, puis nom de modèle connu de tiktoken, puis encodage par défaut
+    assert encoding_name_for_model("o1") == "o200k_base"
+    assert encoding_name_for_model("gpt-3.5-turbo-0125") == "cl100k_base"
+    assert encoding_name_for_model("claude-3-opus") == "cl100k_base"
+
+
+def test_count_tokens_reuses_persistent_cache(monkeypatch, tmp_path):
+    # Un texte déjà compté n'est plus encodé, même par un autre processus partageant le cache
+    from gitingest.utils import token_cache
+    cache = token_cache.TokenCountCache(tmp_path / "tokens.sqlite3")
+    monkeypatch.setattr(token_cache, "_default_cache", cache)
+    monkeypatch.setitem(tokens._encodings, "tiny", _tiny_encoding())
+    text = "def thing(): return the value\n" * 200
+    expected = len(_tiny_encoding().encode_ordinary(text))
+    assert count_tokens(text, encoding_name="tiny") == expected
+
+    class _FailingEncoding:
+        def encode(self, text, disallowed_special=()):
+            raise AssertionError("texte encodé à nouveau")
+    monkeypatch.setitem(tokens._encodings, "tiny", _FailingEncoding())
+    assert count_tokens(text, encoding_name="tiny") == expected
+    assert estimate_context_tokens([text, text], encoding_name="tiny") == 2 * expected
+    assert cache.get(token_cache.text_blob_sha(text), "tiny") == token_cache.CachedCount(expected, 200)